@@ -1,12 +1,17 @@
 import streamlit as st
 import torch
-from transformers import T5ForConditionalGeneration, T5TokenizerFast
 import os
 import csv
 import json
 import glob
 import random
 from backend.config_loader import load_config
+from backend.streaming import iter_generate, streaming_generation_kwargs
+from backend.model_registry import ModelRegistry, default_model_specs, engine_options
+from backend.quantization import quantization_mode
+from backend.onnx_engine import engine_mode
+from backend.length_limits import length_limit_for
+from backend.thread_profile import apply_thread_settings, resolve_thread_settings
 
 # Set page configuration
 st.set_page_config(
@@ -187,15 +192,10 @@ except Exception:
 
 MODEL_CONFIG = CONFIG.get("model", {})
 GEN_CONFIG = CONFIG.get("generation", {})
+REGISTRY_CONFIG = CONFIG.get("registry", {})
 
-FORWARD_MODEL_PATH = os.environ.get("FORWARD_MODEL", "outputs/checkpoints/t5-small-forward-ep5-lr3e4-64")
-REVERSE_MODEL_PATH = os.environ.get("REVERSE_MODEL", "outputs/checkpoints/t5-small-reverse-ep5-lr3e4-64")
-HINGLISH_FORWARD_MODEL_PATH = os.environ.get("HINGLISH_FORWARD_MODEL", "outputs/checkpoints/t5-small-hinglish-forward-ep10-lr0.0002-64")
-HINGLISH_REVERSE_MODEL_PATH = os.environ.get("HINGLISH_REVERSE_MODEL", "outputs/checkpoints/t5-small-hinglish-reverse-ep10-lr0.0002-64")
-FORWARD_MODEL_ID = os.environ.get("FORWARD_MODEL_ID", None)
-REVERSE_MODEL_ID = os.environ.get("REVERSE_MODEL_ID", None)
-HINGLISH_FORWARD_MODEL_ID = os.environ.get("HINGLISH_FORWARD_MODEL_ID", None)
-HINGLISH_REVERSE_MODEL_ID = os.environ.get("HINGLISH_REVERSE_MODEL_ID", None)
+# Checkpoint paths and hub ids come from FORWARD_MODEL(_ID), REVERSE_MODEL(_ID),
+# HINGLISH_FORWARD_MODEL(_ID) and HINGLISH_REVERSE_MODEL(_ID); see backend/model_registry.py
 HF_TOKEN = os.environ.get("HF_TOKEN", None)
 try:
     if not HF_TOKEN:
@@ -320,36 +320,44 @@ def summarize_style(style_dict):
     slang_avg = sum(slangs) / len(slangs) if slangs else None
     return emoji_avg, slang_avg
 
+def attach_length_limit(entry):
+    """Fit the direction's input-length-aware generation cap once its tokenizer is loaded."""
+    entry.length_limit = length_limit_for(entry.tokenizer, entry.direction, CONFIG)
+
 @st.cache_resource
-def load_model(local_dir=None, hf_id=None, fallback=FALLBACK_MODEL):
-    if isinstance(local_dir, str) and os.path.isdir(local_dir):
-        try:
-            model = T5ForConditionalGeneration.from_pretrained(local_dir)
-            tokenizer = T5TokenizerFast.from_pretrained(local_dir)
-            return model, tokenizer, True
-        except Exception:
-            pass
-    if isinstance(hf_id, str) and len(hf_id) > 0:
-        try:
-            kw = {}
-            if HF_TOKEN:
-                kw["token"] = HF_TOKEN
-            model = T5ForConditionalGeneration.from_pretrained(hf_id, **kw)
-            tokenizer = T5TokenizerFast.from_pretrained(hf_id, **kw)
-            return model, tokenizer, True
-        except Exception:
-            pass
-    model = T5ForConditionalGeneration.from_pretrained(fallback)
-    tokenizer = T5TokenizerFast.from_pretrained(fallback)
-    return model, tokenizer, False
+def get_registry():
+    """One model registry per Streamlit server, shared by every session."""
+    apply_thread_settings(resolve_thread_settings(CONFIG))
+    return ModelRegistry(
+        default_model_specs(fallback=FALLBACK_MODEL),
+        memory_budget_mb=REGISTRY_CONFIG.get("memory_budget_mb", 0),
+        idle_unload_seconds=REGISTRY_CONFIG.get("idle_unload_seconds", 0),
+        hf_token=HF_TOKEN,
+        quantize=quantization_mode(CONFIG),
+        engine=engine_mode(CONFIG),
+        engine_options=engine_options(CONFIG, engine_mode(CONFIG)),
+        on_load=attach_length_limit,
+    )
+
+def registry_direction(language, direction):
+    return f"hinglish_{direction}" if language == "Hinglish" else direction
+
+def load_model(registry_key):
+    entry = get_registry().get(registry_key)
+    return entry.model, entry.tokenizer, entry.is_finetuned, entry.length_limit
+
+def target_length(inputs, length_limit=None, max_target_len=MAX_TARGET_LEN):
+    """Generation cap scaled to the input length when a limit was fitted, else max_target_len."""
+    return length_limit.for_batch(inputs.attention_mask) if length_limit is not None else max_target_len
 
-def translate_text(text, model, tokenizer, max_source_len=MAX_SOURCE_LEN, max_target_len=MAX_TARGET_LEN):
-    inputs = tokenizer(text, return_tensors="pt", max_length=max_source_len, padding="max_length", truncation=True)
+def translate_text(text, model, tokenizer, max_source_len=MAX_SOURCE_LEN, max_target_len=MAX_TARGET_LEN, length_limit=None):
+    inputs = tokenizer(text, return_tensors="pt", max_length=max_source_len, truncation=True)
     input_ids = inputs.input_ids.to(model.device)
     with torch.no_grad():
         outputs = model.generate(
             input_ids,
-            max_length=max_target_len,
+            attention_mask=inputs.attention_mask.to(model.device),
+            max_length=target_length(inputs, length_limit, max_target_len),
             num_beams=GEN_CONFIG.get("num_beams", 6),
             no_repeat_ngram_size=GEN_CONFIG.get("no_repeat_ngram_size", 3),
             length_penalty=GEN_CONFIG.get("length_penalty", 1.0),
@@ -362,9 +370,21 @@ def translate_text(text, model, tokenizer, max_source_len=MAX_SOURCE_LEN, max_ta
     translated_text = tokenizer.decode(outputs[0], skip_special_tokens=True)
     return translated_text
 
+def stream_translate_text(text, model, tokenizer, mode="greedy", max_source_len=MAX_SOURCE_LEN, max_target_len=MAX_TARGET_LEN, length_limit=None):
+    """Yield the translation in chunks as greedy/sampling decoding produces tokens."""
+    inputs = tokenizer(text, return_tensors="pt", max_length=max_source_len, truncation=True)
+    gen_kwargs = streaming_generation_kwargs(GEN_CONFIG, mode, target_length(inputs, length_limit, max_target_len))
+    yield from iter_generate(model, tokenizer, inputs, gen_kwargs)
+
 # --- UI Component ---
-def render_translation_ui(language, direction, model_path, model_id, use_prefix, style):
-    model, tokenizer, is_finetuned = load_model(model_path, model_id, fallback=FALLBACK_MODEL)
+DECODING_MODES = {
+    "Beam search": None,
+    "Greedy (streaming)": "greedy",
+    "Sampling (streaming)": "sampling",
+}
+
+def render_translation_ui(language, direction, use_prefix, style, decoding="Beam search"):
+    model, tokenizer, is_finetuned, length_limit = load_model(registry_direction(language, direction))
     
     if not is_finetuned and "Hinglish" in language:
          st.warning(f"⚠️ Using fallback model. Specific {language} model not found.")
@@ -426,7 +446,15 @@ def render_translation_ui(language, direction, model_path, model_id, use_prefix,
                 src = source_text
                 if use_prefix:
                     src = f"{build_prefix(language, direction, style)} {src}".strip()
-                translated = translate_text(src, model, tokenizer)
+                stream_mode = DECODING_MODES.get(decoding)
+                if stream_mode:
+                    translated = ""
+                    for chunk in stream_translate_text(src, model, tokenizer, mode=stream_mode, length_limit=length_limit):
+                        translated += chunk
+                        output_placeholder.markdown(f"<div class='output-box'>{translated}</div>", unsafe_allow_html=True)
+                    translated = translated.strip()
+                else:
+                    translated = translate_text(src, model, tokenizer, length_limit=length_limit)
                 safe_key = key_base.replace(" ", "_").lower()
                 output_placeholder.markdown(
                     f"""
@@ -554,6 +582,12 @@ def main():
         "Use Task Prefix",
         value=APPLY_TASK_PREFIX,
     )
+    decoding = st.sidebar.selectbox(
+        "Decoding",
+        list(DECODING_MODES.keys()),
+        index=0,
+        help="Streaming modes show the translation word by word; beam search waits for the full result.",
+    )
 
     show_metrics = st.sidebar.toggle(
         "Show developer metrics",
@@ -591,16 +625,16 @@ def main():
     if language == "English":
         tab1, tab2 = st.tabs(["🇺🇸 Slang ➡️ Std English", "🇺🇸 Std English ➡️ Slang"])
         with tab1:
-            render_translation_ui("English", "forward", FORWARD_MODEL_PATH, FORWARD_MODEL_ID, use_prefix, style)
+            render_translation_ui("English", "forward", use_prefix, style, decoding)
         with tab2:
-            render_translation_ui("English", "reverse", REVERSE_MODEL_PATH, REVERSE_MODEL_ID, use_prefix, style)
+            render_translation_ui("English", "reverse", use_prefix, style, decoding)
     
     else:  # Hinglish
         tab1, tab2 = st.tabs(["🇮🇳 Hinglish ➡️ Std English", "🇮🇳 Std English ➡️ Hinglish"])
         with tab1:
-            render_translation_ui("Hinglish", "forward", HINGLISH_FORWARD_MODEL_PATH, HINGLISH_FORWARD_MODEL_ID, use_prefix, style)
+            render_translation_ui("Hinglish", "forward", use_prefix, style, decoding)
         with tab2:
-            render_translation_ui("Hinglish", "reverse", HINGLISH_REVERSE_MODEL_PATH, HINGLISH_REVERSE_MODEL_ID, use_prefix, style)
+            render_translation_ui("Hinglish", "reverse", use_prefix, style, decoding)
 
     # Footer
     st.markdown("<div style='margin-bottom: 60px;'></div>", unsafe_allow_html=True)
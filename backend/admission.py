@@ -0,0 +1,119 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+
+class AdmissionController:
+    """Bounds the requests in flight (queued or decoding) for one direction.
+
+    ``try_acquire`` fails fast once ``max_in_flight`` is reached; every
+    admitted request must be paired with a ``release``. Completions feed a
+    drain-rate estimate over the last ``window_seconds``, which turns the
+    backlog into a ``Retry-After`` hint.
+    """
+
+    def __init__(self, max_in_flight: int, window_seconds: float = 10.0, max_retry_after: float = 60.0):
+        self.max_in_flight = int(max_in_flight or 0)
+        self.window_seconds = float(window_seconds)
+        self.max_retry_after = float(max_retry_after)
+        self.in_flight = 0
+        self.rejected = 0
+        self._completions = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._completions.append(now)
+            self._trim(now)
+
+    def _trim(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._completions and self._completions[0] < cutoff:
+            self._completions.popleft()
+
+    def drain_rate(self) -> Optional[float]:
+        """Requests completed per second over the recent window (None before any completion)."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if not self._completions:
+                return None
+            span = max(now - self._completions[0], 1e-3)
+            return len(self._completions) / span
+
+    def retry_after(self) -> int:
+        """Seconds to drain the work already in flight (ahead of the caller) at the current drain rate."""
+        rate = self.drain_rate()
+        if not rate:
+            return 1
+        with self._lock:
+            backlog = max(1, self.in_flight)
+        return int(min(self.max_retry_after, max(1, math.ceil(backlog / rate))))
+
+    def stats(self) -> dict:
+        rate = self.drain_rate()
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight or None,
+            "rejected": self.rejected,
+            "drain_rate_per_s": None if rate is None else round(rate, 2),
+        }
+
+
+class ClientRateLimiter:
+    """Per-client token buckets refilled at ``rate`` tokens/second up to ``burst``.
+
+    A request costs one token per text. A request costing more than
+    ``burst`` is charged a full bucket: it is admitted once the bucket has
+    refilled and empties it. The bucket never goes into debt, so neither a
+    single large request nor forgetting an evicted client (only the
+    ``max_clients`` most recently seen are tracked) is worth more than one
+    burst.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.max_clients = int(max_clients)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def try_acquire(self, client: str, cost: float = 1.0) -> Tuple[bool, int]:
+        """Charge ``cost`` tokens to ``client``; returns ``(admitted, retry_after_seconds)``."""
+        if not self.enabled:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            needed = min(cost, self.burst)
+            if tokens >= needed:
+                tokens -= needed
+                admitted, wait = True, 0
+            else:
+                self.rejected += 1
+                admitted, wait = False, max(1, math.ceil((needed - tokens) / self.rate))
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return admitted, wait
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "clients": len(self._buckets), "rejected": self.rejected}
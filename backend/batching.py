@@ -0,0 +1,140 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+
+def length_buckets(lengths: List[int], max_batch_size: int, max_batch_tokens: Optional[int] = None) -> List[List[int]]:
+    """Group item indices into batches of similar token length to minimise padding.
+
+    Indices are sorted by length and cut into consecutive runs of at most
+    ``max_batch_size`` items; when ``max_batch_tokens`` is set a run is also cut
+    once its padded size (items x longest item) would exceed that budget.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets: List[List[int]] = []
+    current: List[int] = []
+    for idx in order:
+        if current:
+            padded = (len(current) + 1) * lengths[idx]
+            if len(current) >= max_batch_size or (max_batch_tokens and padded > max_batch_tokens):
+                buckets.append(current)
+                current = []
+        current.append(idx)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+@dataclass
+class BatchResult:
+    """Translation for one request plus how it was scheduled."""
+    text: str
+    batch_size: int
+    queue_wait_ms: float
+    # Whatever the batch runner reported about how the batch was decoded
+    info: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _Pending:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class MicroBatcher:
+    """Gathers concurrent requests for one direction into a single generate call.
+
+    A batch is dispatched as soon as it holds ``max_batch_size`` items or the
+    oldest item has waited ``max_wait_ms``, whichever comes first.
+    ``run_batch`` returns one output per text, optionally paired with a dict
+    of batch-level details that is copied into every :class:`BatchResult`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[List[str]], Awaitable[Union[List[str], Tuple[List[str], Dict[str, Any]]]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+    ):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background batching loop on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._loop(), name=f"batcher-{self.name}")
+
+    async def stop(self):
+        """Cancel the batching loop and fail anything still queued."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if not item.future.done():
+                    item.future.set_exception(RuntimeError(f"Batcher '{self.name}' stopped"))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, text: str) -> BatchResult:
+        """Queue one text and wait for its slot in a batch to finish."""
+        if self._queue is None:
+            raise RuntimeError(f"Batcher '{self.name}' is not running")
+        loop = asyncio.get_running_loop()
+        item = _Pending(text=text, future=loop.create_future(), enqueued_at=time.perf_counter())
+        await self._queue.put(item)
+        return await item.future
+
+    async def _collect(self) -> List[_Pending]:
+        batch = [await self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                # Window closed; still take whatever is already waiting.
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _loop(self):
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            try:
+                outputs = await self.run_batch([item.text for item in batch])
+                info = {}
+                if isinstance(outputs, tuple):
+                    outputs, info = outputs
+            except Exception as e:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+            for item, output in zip(batch, outputs):
+                if item.future.done():
+                    continue
+                item.future.set_result(BatchResult(
+                    text=output,
+                    batch_size=len(batch),
+                    queue_wait_ms=(started - item.enqueued_at) * 1000.0,
+                    info=info,
+                ))
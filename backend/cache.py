@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Sequence, Tuple
+
+
+def canonicalize_text(text: str) -> str:
+    """Unicode-normalise (NFKC) and collapse whitespace so trivially different inputs share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def generation_config_hash(gen_cfg: dict) -> str:
+    """Stable short hash of the ``generation`` section of config.yaml."""
+    payload = json.dumps(gen_cfg or {}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def make_cache_key(text: str, direction: str, model_id: str, gen_hash: str) -> Tuple[str, str, str, str]:
+    """Build the ``(text, direction, model, generation config)`` key shared by the memory and disk caches."""
+    return (canonicalize_text(text), direction, model_id, gen_hash)
+
+
+class TranslationCache:
+    """Bounded in-process result cache with LRU eviction and per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self.get_first([key])[1]
+
+    def get_first(self, keys: Sequence[Hashable]) -> Tuple[Optional[int], Optional[Any]]:
+        """``(index, value)`` of the first of ``keys`` with a live entry, or ``(None, None)``.
+
+        Probing several keys counts as a single hit or miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for index, key in enumerate(keys):
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if self.ttl_seconds > 0 and expires_at <= now:
+                    del self._data[key]
+                    self.expirations += 1
+                    continue
+                self._data.move_to_end(key)
+                self.hits += 1
+                return index, value
+            self.misses += 1
+            return None, None
+
+    def put(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
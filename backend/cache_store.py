@@ -0,0 +1,132 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_text TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    model_fingerprint TEXT NOT NULL,
+    gen_hash TEXT NOT NULL,
+    translated_text TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 1,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (source_text, direction, model_fingerprint, gen_hash)
+)
+"""
+
+_UPSERT = """
+INSERT INTO translations (source_text, direction, model_fingerprint, gen_hash, translated_text, hits, updated_at)
+VALUES (?, ?, ?, ?, ?, 1, ?)
+ON CONFLICT (source_text, direction, model_fingerprint, gen_hash)
+DO UPDATE SET translated_text = excluded.translated_text, hits = hits + 1, updated_at = excluded.updated_at
+"""
+
+_TOUCH = """
+UPDATE translations SET hits = hits + 1, updated_at = ?
+WHERE source_text = ? AND direction = ? AND model_fingerprint = ? AND gen_hash = ?
+"""
+
+_STOP = object()
+
+
+class PersistentTranslationStore:
+    """SQLite-backed copy of the translation cache that survives restarts.
+
+    Writes are queued and applied by a background thread in small transactions,
+    so request handlers never wait on disk. Keys have the same shape as the
+    in-memory cache: ``(source_text, direction, model_fingerprint, gen_hash)``.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="cache-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def put(self, key: Tuple[str, str, str, str], translated_text: str):
+        """Queue an insert (or hit-count bump) for a freshly computed translation."""
+        self._queue.put((_UPSERT, (*key, translated_text, time.time())))
+
+    def touch(self, key: Tuple[str, str, str, str]):
+        """Queue a hit-count bump for a translation served from memory."""
+        self._queue.put((_TOUCH, (time.time(), *key)))
+
+    def invalidate_stale(self, direction: str, model_fingerprint: str, gen_hash: str) -> int:
+        """Drop rows for ``direction`` produced by another checkpoint or generation config."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM translations WHERE direction = ? AND (model_fingerprint != ? OR gen_hash != ?)",
+                (direction, model_fingerprint, gen_hash),
+            )
+            return cur.rowcount
+
+    def most_frequent(self, direction: str, model_fingerprint: str, gen_hash: str, limit: int) -> List[Tuple[int, str, str]]:
+        """Return up to ``limit`` ``(hits, source_text, translated_text)`` rows, most requested first."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT hits, source_text, translated_text FROM translations "
+                "WHERE direction = ? AND model_fingerprint = ? AND gen_hash = ? "
+                "ORDER BY hits DESC LIMIT ?",
+                (direction, model_fingerprint, gen_hash, int(limit)),
+            ).fetchall()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                pending = [item]
+                deadline = time.monotonic() + self.flush_interval
+                stop = False
+                while True:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        nxt = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if nxt is _STOP:
+                        stop = True
+                        break
+                    pending.append(nxt)
+                try:
+                    with conn:
+                        for sql, params in pending:
+                            conn.execute(sql, params)
+                except sqlite3.Error as e:
+                    print(f"Translation store write failed: {e}")
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+
+def open_store(path: Optional[str]) -> Optional[PersistentTranslationStore]:
+    """Open the persistent store, or return None (with a warning) if it cannot be used."""
+    if not path:
+        return None
+    try:
+        return PersistentTranslationStore(path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Persistent translation store disabled: {e}")
+        return None
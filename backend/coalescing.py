@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Runs one computation per key at a time and shares its result with every concurrent caller.
+
+    The first caller for a key starts ``fn`` as its own task; callers arriving
+    while it runs await that same task instead of starting another. The task
+    is shielded, so a caller that goes away (client disconnect) neither
+    cancels it for the others nor loses the result for the cache. Errors are
+    raised to every waiting caller. Keys are forgotten as soon as their task
+    finishes, so this never serves stale results: it is not a cache.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True for callers that joined another's computation."""
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the error as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    def stats(self) -> dict:
+        total = self.leaders + self.followers
+        return {
+            "in_flight": len(self._in_flight),
+            "computations": self.leaders,
+            "coalesced": self.followers,
+            "coalesced_ratio": round(self.followers / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,155 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class DecodingTier:
+    """One rung of the adaptive decoding ladder."""
+    name: str
+    num_beams: int
+
+
+def tier_name(num_beams: int) -> str:
+    return "greedy" if num_beams <= 1 else f"beam{num_beams}"
+
+
+def _percentile(values: Sequence[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class _DirectionState:
+    def __init__(self, window: int):
+        self.level = 0
+        # (monotonic timestamp, latency_ms)
+        self.latencies = deque(maxlen=window)
+        self.changed_at = 0.0
+        self.step_downs = 0
+        self.step_ups = 0
+
+
+class AdaptiveDecodingPolicy:
+    """Picks how many beams a batch gets from the current load of its direction.
+
+    Tiers run from ``num_beams`` (best quality) down to greedy. When the
+    requests still queued at dispatch reach ``step_down_queue_depth`` or the
+    p95 of recent request latencies reaches ``step_down_p95_ms`` the next
+    cheaper tier is used; once both drop below the ``step_up_*`` thresholds
+    the policy climbs back one tier at a time. At most one change happens per
+    ``cooldown_seconds``. The latency window holds the last ``window``
+    requests of the past ``window_seconds`` and restarts after each change, so
+    decisions are based on the tier actually in use and a finished burst
+    stops counting.
+    """
+
+    def __init__(
+        self,
+        num_beams: int,
+        beam_tiers: Sequence[int] = (6, 4, 2, 1),
+        enabled: bool = True,
+        step_down_queue_depth: int = 16,
+        step_down_p95_ms: float = 2000.0,
+        step_up_queue_depth: int = 2,
+        step_up_p95_ms: float = 800.0,
+        window: int = 100,
+        window_seconds: float = 30.0,
+        cooldown_seconds: float = 2.0,
+    ):
+        # The configured beam width is always the top tier; cheaper ones must be strictly narrower
+        beams = [int(num_beams)] + sorted({int(b) for b in beam_tiers if 1 <= int(b) < int(num_beams)}, reverse=True)
+        self.tiers: List[DecodingTier] = [DecodingTier(tier_name(b), b) for b in beams]
+        self.enabled = enabled and len(self.tiers) > 1
+        self.step_down_queue_depth = step_down_queue_depth
+        self.step_down_p95_ms = step_down_p95_ms
+        self.step_up_queue_depth = step_up_queue_depth
+        self.step_up_p95_ms = step_up_p95_ms
+        self.window = max(1, int(window))
+        self.window_seconds = float(window_seconds)
+        self.cooldown_seconds = float(cooldown_seconds)
+        self._states: Dict[str, _DirectionState] = {}
+
+    @classmethod
+    def from_config(cls, num_beams: int, cfg: dict) -> "AdaptiveDecodingPolicy":
+        cfg = cfg or {}
+        return cls(
+            num_beams,
+            beam_tiers=cfg.get("beam_tiers", (6, 4, 2, 1)),
+            enabled=cfg.get("enabled", True),
+            step_down_queue_depth=cfg.get("step_down_queue_depth", 16),
+            step_down_p95_ms=cfg.get("step_down_p95_ms", 2000.0),
+            step_up_queue_depth=cfg.get("step_up_queue_depth", 2),
+            step_up_p95_ms=cfg.get("step_up_p95_ms", 800.0),
+            window=cfg.get("window", 100),
+            window_seconds=cfg.get("window_seconds", 30.0),
+            cooldown_seconds=cfg.get("cooldown_seconds", 2.0),
+        )
+
+    @property
+    def top(self) -> DecodingTier:
+        return self.tiers[0]
+
+    def _state(self, direction: str) -> _DirectionState:
+        state = self._states.get(direction)
+        if state is None:
+            state = self._states[direction] = _DirectionState(self.window)
+        return state
+
+    def current(self, direction: str) -> DecodingTier:
+        """The tier in use for ``direction``, without re-evaluating the load."""
+        return self.tiers[self._state(direction).level]
+
+    def p95_ms(self, direction: str) -> Optional[float]:
+        cutoff = time.monotonic() - self.window_seconds
+        return _percentile([ms for at, ms in self._state(direction).latencies if at >= cutoff], 0.95)
+
+    def select(self, direction: str, queue_depth: int) -> DecodingTier:
+        """Re-evaluate the load of ``direction`` and return the tier for the batch about to run."""
+        state = self._state(direction)
+        if not self.enabled:
+            return self.tiers[state.level]
+        now = time.monotonic()
+        if now - state.changed_at >= self.cooldown_seconds:
+            p95 = self.p95_ms(direction)
+            overloaded = queue_depth >= self.step_down_queue_depth or (p95 is not None and p95 >= self.step_down_p95_ms)
+            relaxed = queue_depth <= self.step_up_queue_depth and (p95 is None or p95 <= self.step_up_p95_ms)
+            if overloaded and state.level < len(self.tiers) - 1:
+                state.level += 1
+                state.step_downs += 1
+                self._changed(state, now)
+            elif relaxed and not overloaded and state.level > 0:
+                state.level -= 1
+                state.step_ups += 1
+                self._changed(state, now)
+        return self.tiers[state.level]
+
+    @staticmethod
+    def _changed(state: _DirectionState, now: float):
+        state.changed_at = now
+        state.latencies.clear()
+
+    def record(self, direction: str, latency_ms: float):
+        """Feed the end-to-end latency of one finished request."""
+        self._state(direction).latencies.append((time.monotonic(), latency_ms))
+
+    @staticmethod
+    def _rounded(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value, 1)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "tiers": [t.name for t in self.tiers],
+            "directions": {
+                direction: {
+                    "tier": self.tiers[state.level].name,
+                    "p95_ms": self._rounded(self.p95_ms(direction)),
+                    "step_downs": state.step_downs,
+                    "step_ups": state.step_ups,
+                }
+                for direction, state in self._states.items()
+            },
+        }
@@ -0,0 +1,199 @@
+import math
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+import torch
+from transformers import BatchEncoding
+
+PAD_ID = 0
+EOS_ID = 1
+UNK_ID = 2
+_FIRST_WORD_ID = 3
+
+
+class FakeTokenizer:
+    """Whitespace tokenizer with the call/decode surface the backend uses from Hugging Face tokenizers.
+
+    Every word gets a stable id (a hash, so no vocabulary file is needed) and
+    decoding gives the words back, so outputs can be checked against inputs.
+    """
+
+    pad_token_id = PAD_ID
+    eos_token_id = EOS_ID
+    unk_token_id = UNK_ID
+
+    def __init__(self, vocab_size: int = 32000):
+        self.vocab_size = vocab_size
+        self._words: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.vocab_size
+
+    def _word_id(self, word: str) -> int:
+        word_id = _FIRST_WORD_ID + zlib.crc32(word.encode("utf-8")) % (self.vocab_size - _FIRST_WORD_ID)
+        if word_id not in self._words:
+            with self._lock:
+                self._words.setdefault(word_id, word)
+        return word_id
+
+    def encode(self, text: str, truncation: bool = False, max_length: Optional[int] = None, **kwargs) -> List[int]:
+        ids = [self._word_id(word) for word in str(text).split()]
+        if truncation and max_length:
+            ids = ids[:max_length - 1]
+        return ids + [EOS_ID]
+
+    def __call__(self, text=None, text_target=None, return_tensors=None, padding=False, truncation=False,
+                 max_length=None, **kwargs) -> BatchEncoding:
+        texts = text if text is not None else text_target
+        single = isinstance(texts, str)
+        rows = [self.encode(t, truncation, max_length) for t in ([texts] if single else texts)]
+        if padding or return_tensors == "pt":
+            width = max((len(r) for r in rows), default=0)
+            masks = [[1] * len(r) + [0] * (width - len(r)) for r in rows]
+            rows = [r + [PAD_ID] * (width - len(r)) for r in rows]
+        else:
+            masks = [[1] * len(r) for r in rows]
+        if single and return_tensors is None:
+            rows, masks = rows[0], masks[0]
+        return BatchEncoding({"input_ids": rows, "attention_mask": masks}, tensor_type=return_tensors)
+
+    def decode(self, ids, skip_special_tokens: bool = False, **kwargs) -> str:
+        if isinstance(ids, torch.Tensor):
+            ids = ids.tolist()
+        words = []
+        for i in ids:
+            if i in (PAD_ID, EOS_ID, UNK_ID):
+                if not skip_special_tokens:
+                    words.append({PAD_ID: "<pad>", EOS_ID: "</s>", UNK_ID: "<unk>"}[i])
+                continue
+            words.append(self._words.get(i, "<unk>"))
+        return " ".join(words)
+
+    def batch_decode(self, sequences, skip_special_tokens: bool = False, **kwargs) -> List[str]:
+        return [self.decode(seq, skip_special_tokens=skip_special_tokens) for seq in sequences]
+
+
+class FakeSeq2SeqModel:
+    """Stand-in for ``AutoModelForSeq2SeqLM`` that sleeps instead of computing.
+
+    ``generate`` copies each input (cycled to ``output_ratio`` times its
+    length) and takes as long as a real decode of that shape would under the
+    configured cost model:
+
+    ``base_ms + encoder_ms_per_token * input tokens + steps * per_token_ms * batch_cost(rows)``
+
+    where ``steps`` is the longest output in the batch (padded rows decode
+    until the longest finishes) and ``rows`` is batch size times beam width.
+    ``batch_cost`` is ``rows ** batch_exponent``, or a piecewise-linear
+    ``batch_curve`` of ``[rows, cost]`` points. Sleeping releases the GIL, so
+    the executors, batchers and admission control see realistic timing
+    without any real CPU load.
+    """
+
+    def __init__(
+        self,
+        per_token_ms: float = 2.0,
+        base_ms: float = 5.0,
+        encoder_ms_per_token: float = 0.05,
+        batch_exponent: float = 0.3,
+        batch_curve: Optional[Sequence[Sequence[float]]] = None,
+        output_ratio: float = 1.0,
+        resident_mb: float = 250.0,
+    ):
+        self.per_token_ms = float(per_token_ms)
+        self.base_ms = float(base_ms)
+        self.encoder_ms_per_token = float(encoder_ms_per_token)
+        self.batch_exponent = float(batch_exponent)
+        self.batch_curve = sorted((float(rows), float(cost)) for rows, cost in batch_curve) if batch_curve else None
+        self.output_ratio = float(output_ratio)
+        self.resident_mb = float(resident_mb)
+        self.device = torch.device("cpu")
+        self.calls = 0
+        self.rows = 0
+        self.simulated_seconds = 0.0
+
+    def eval(self):
+        return self
+
+    def resident_bytes(self) -> int:
+        # Lets registry.memory_budget_mb evictions be exercised without real weights
+        return int(self.resident_mb * 2**20)
+
+    def batch_cost(self, rows: int) -> float:
+        """Cost of one decoder step for ``rows`` sequences, relative to a single sequence."""
+        if not self.batch_curve:
+            return rows ** self.batch_exponent
+        points = self.batch_curve
+        if len(points) == 1:
+            return points[0][1] * rows / points[0][0]
+        # Interpolate between the surrounding points, extrapolate along the first/last segment
+        i = min(max(bisect_left([x for x, _ in points], rows), 1), len(points) - 1)
+        (x0, y0), (x1, y1) = points[i - 1], points[i]
+        return max(0.0, y0 + (y1 - y0) * (rows - x0) / (x1 - x0))
+
+    def generate(self, input_ids=None, attention_mask=None, max_length: int = 128, num_beams: int = 1,
+                 streamer=None, stopping_criteria=None, **kwargs) -> torch.Tensor:
+        if input_ids is None:
+            raise ValueError("FakeSeq2SeqModel.generate needs input_ids")
+        if attention_mask is None:
+            attention_mask = (input_ids != PAD_ID).long()
+        lengths = attention_mask.sum(dim=1).tolist()
+        sources = [row[:n - 1] if n > 1 else [] for row, n in zip(input_ids.tolist(), lengths)]
+        budget = max(1, int(max_length) - 1)  # max_length counts the decoder start token
+        outputs = []
+        for words in sources:
+            n = min(budget - 1, math.ceil(self.output_ratio * len(words))) if words else 0
+            outputs.append([words[i % len(words)] for i in range(n)] + [EOS_ID])
+        steps = max(len(out) for out in outputs)
+        rows = len(outputs) * max(1, int(num_beams or 1))
+        step_seconds = self.per_token_ms * self.batch_cost(rows) / 1000.0
+        setup_seconds = (self.base_ms + self.encoder_ms_per_token * sum(lengths)) / 1000.0
+
+        self.calls += 1
+        self.rows += len(outputs)
+        self.simulated_seconds += setup_seconds + steps * step_seconds
+        sequences = torch.full((len(outputs), steps + 1), PAD_ID, dtype=torch.long)
+        for i, out in enumerate(outputs):
+            sequences[i, 1:len(out) + 1] = torch.tensor(out, dtype=torch.long)
+
+        time.sleep(setup_seconds)
+        if streamer is None and stopping_criteria is None:
+            time.sleep(steps * step_seconds)
+            return sequences
+        if streamer is not None:
+            streamer.put(sequences[:, 0])
+        for step in range(1, steps + 1):
+            time.sleep(step_seconds)
+            if streamer is not None:
+                streamer.put(sequences[:, step])
+            if stopping_criteria is not None and any(bool(torch.as_tensor(c(sequences[:, :step + 1], None)).all()) for c in stopping_criteria):
+                sequences = sequences[:, :step + 1]
+                break
+        if streamer is not None:
+            streamer.end()
+        return sequences
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rows": self.rows,
+            "simulated_seconds": round(self.simulated_seconds, 3),
+        }
+
+
+def fake_model_options(config: dict) -> dict:
+    """Constructor arguments for ``FakeSeq2SeqModel`` from ``inference.fake`` in config.yaml."""
+    fake_cfg = (config.get("inference") or {}).get("fake") or {}
+    return {
+        "per_token_ms": fake_cfg.get("per_token_ms", 2.0),
+        "base_ms": fake_cfg.get("base_ms", 5.0),
+        "encoder_ms_per_token": fake_cfg.get("encoder_ms_per_token", 0.05),
+        "batch_exponent": fake_cfg.get("batch_exponent", 0.3),
+        "batch_curve": fake_cfg.get("batch_curve"),
+        "output_ratio": fake_cfg.get("output_ratio", 1.0),
+        "resident_mb": fake_cfg.get("resident_mb", 250.0),
+    }
@@ -0,0 +1,136 @@
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from backend.translation_memory import tm_key
+except ImportError:  # imported as a top-level module from inside backend/
+    from translation_memory import tm_key
+
+# Smallest prime above 2**32: shingle hashes are crc32 values, so a * x + b stays below 2**64
+_PRIME = np.uint64(4294967311)
+
+
+def shingles(text: str, n: int = 3) -> List[str]:
+    """Character n-grams of the translation memory key, padded so short texts still get a few."""
+    key = f" {tm_key(text)} "
+    if len(key) <= n:
+        return [key]
+    return sorted({key[i:i + n] for i in range(len(key) - n + 1)})
+
+
+def _hash_shingles(grams: List[str]) -> np.ndarray:
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class FuzzyIndex:
+    """MinHash/LSH index over the source side of the translation memory.
+
+    Each text is reduced to its character n-grams and a ``num_perm``-value
+    MinHash signature, split into ``bands`` buckets of ``num_perm // bands``
+    rows. A query only compares against entries sharing at least one bucket,
+    and candidates are ranked by their exact n-gram Jaccard similarity.
+    """
+
+    def __init__(self, num_perm: int = 96, bands: int = 32, ngram: int = 3, threshold: float = 0.6, seed: int = 42):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2**31, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, 2**31, size=(num_perm, 1), dtype=np.uint64)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self.threshold = threshold
+        # direction -> entry id -> (key, translation, shingle set)
+        self.entries: Dict[str, List[Tuple[str, str, frozenset]]] = defaultdict(list)
+        # direction -> band -> band signature bytes -> entry ids
+        self.buckets: Dict[str, List[Dict[bytes, List[int]]]] = {}
+        self.lookups = 0
+        self.hits = 0
+
+    @classmethod
+    def from_memory(cls, memory, **kwargs) -> "FuzzyIndex":
+        """Index every source text of a ``TranslationMemory``."""
+        index = cls(**kwargs)
+        for direction, pairs in memory.entries.items():
+            index.add_many(direction, list(pairs.items()))
+        return index
+
+    def _signatures(self, hashed: List[np.ndarray]) -> np.ndarray:
+        """MinHash signatures for several texts at once: one (num_perm,) row per text."""
+        lengths = np.array([len(h) for h in hashed])
+        flat = np.concatenate(hashed)
+        permuted = (self.a * flat[None, :] + self.b) % _PRIME
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        return np.minimum.reduceat(permuted, starts, axis=1).T
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add_many(self, direction: str, pairs: List[Tuple[str, str]]):
+        if not pairs:
+            return
+        grams = [shingles(key, self.ngram) for key, _ in pairs]
+        signatures = self._signatures([_hash_shingles(g) for g in grams])
+        entries = self.entries[direction]
+        buckets = self.buckets.setdefault(direction, [defaultdict(list) for _ in range(self.bands)])
+        for (key, translation), g, signature in zip(pairs, grams, signatures):
+            entry_id = len(entries)
+            entries.append((key, translation, frozenset(g)))
+            for band, band_key in zip(buckets, self._band_keys(signature)):
+                band[band_key].append(entry_id)
+
+    def lookup(self, text: str, direction: str) -> Optional[Tuple[str, str, float]]:
+        """Closest indexed ``(source, translation, similarity)`` at or above the threshold, or None."""
+        self.lookups += 1
+        buckets = self.buckets.get(direction)
+        if not buckets:
+            return None
+        grams = shingles(text, self.ngram)
+        signature = self._signatures([_hash_shingles(grams)])[0]
+        candidates = set()
+        for band, band_key in zip(buckets, self._band_keys(signature)):
+            candidates.update(band.get(band_key, ()))
+        if not candidates:
+            return None
+        query = set(grams)
+        entries = self.entries[direction]
+        best, best_score = None, 0.0
+        for entry_id in candidates:
+            key, translation, entry_grams = entries[entry_id]
+            score = len(query & entry_grams) / len(query | entry_grams)
+            if score > best_score:
+                best, best_score = (key, translation), score
+        if best is None or best_score < self.threshold:
+            return None
+        self.hits += 1
+        return best[0], best[1], round(best_score, 4)
+
+    def __len__(self):
+        return sum(len(e) for e in self.entries.values())
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "lookups": self.lookups,
+            "hits": self.hits,
+        }
+
+
+def build_fuzzy_index(memory, fuzzy_config: dict) -> FuzzyIndex:
+    index = FuzzyIndex.from_memory(
+        memory,
+        num_perm=fuzzy_config.get("num_perm", 96),
+        bands=fuzzy_config.get("bands", 32),
+        ngram=fuzzy_config.get("ngram", 3),
+        threshold=fuzzy_config.get("threshold", 0.6),
+    )
+    print(f"Fuzzy index: {len(index)} entries, Jaccard threshold {index.threshold}")
+    return index
@@ -0,0 +1,239 @@
+import csv
+import io
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+OUTPUT_COLUMN = "translated_text"
+SOURCE_COLUMN = "translation_source"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    text_column TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    total_rows INTEGER NOT NULL,
+    done_rows INTEGER NOT NULL DEFAULT 0,
+    output_bytes INTEGER NOT NULL DEFAULT 0,
+    owner_pid INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+_COLUMNS = (
+    "id", "status", "direction", "input_path", "text_column", "output_path",
+    "total_rows", "done_rows", "output_bytes", "owner_pid", "error", "created_at", "updated_at",
+)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        # Exists but belongs to someone else, or the platform cannot tell
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite record of batch translation jobs and their last committed chunk.
+
+    ``done_rows`` and ``output_bytes`` are only advanced after the chunk's
+    output has been flushed to disk, so a restarted server truncates the
+    output back to ``output_bytes`` and carries on from row ``done_rows``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _update(self, job_id: str, where: str = "", params: tuple = (), **fields) -> bool:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            cur = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?{where}", (*fields.values(), job_id, *params)
+            )
+            return cur.rowcount > 0
+
+    def create(self, direction: str, input_path: str, text_column: str, output_path: str, total_rows: int,
+               job_id: Optional[str] = None) -> dict:
+        now = time.time()
+        job_id = job_id or uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, direction, input_path, text_column, output_path, total_rows, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, direction, input_path, text_column, output_path, int(total_rows), now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def list(self, limit: int = 50) -> List[dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?", (int(limit),)
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def claim_next(self, pid: int) -> Optional[dict]:
+        """Mark the oldest queued job as running for process ``pid`` and return it."""
+        with self._connect() as conn:
+            for (job_id,) in conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall():
+                cur = conn.execute(
+                    "UPDATE jobs SET status = 'running', owner_pid = ?, updated_at = ? WHERE id = ? AND status = 'queued'",
+                    (pid, time.time(), job_id),
+                )
+                if cur.rowcount:
+                    conn.commit()
+                    return self.get(job_id)
+        return None
+
+    def requeue_orphans(self, pid: int, stale_seconds: float = 600.0) -> int:
+        """Queue again the running jobs whose process is gone (or is this one, freshly restarted).
+
+        A job whose owner has not renewed its lease (``heartbeat``) for
+        ``stale_seconds`` is taken over too, in case its pid was reused.
+        """
+        cutoff = time.time() - stale_seconds
+        requeued = 0
+        with self._connect() as conn:
+            running = conn.execute("SELECT id, owner_pid, updated_at FROM jobs WHERE status = 'running'").fetchall()
+        for job_id, owner_pid, updated_at in running:
+            if owner_pid == pid or not _pid_alive(owner_pid) or updated_at < cutoff:
+                requeued += self._update(job_id, " AND status = 'running'", status="queued", owner_pid=None)
+        return requeued
+
+    def heartbeat(self, job_id: str, pid: int) -> bool:
+        """Renew ``pid``'s lease on a running job; False once the job is no longer its to run."""
+        return self._update(job_id, " AND status = 'running' AND owner_pid = ?", (pid,))
+
+    def checkpoint(self, job_id: str, pid: int, done_rows: int, output_bytes: int) -> bool:
+        """Record a committed chunk; False (nothing recorded) once ``pid`` no longer runs the job."""
+        return self._update(
+            job_id, " AND status = 'running' AND owner_pid = ?", (pid,),
+            done_rows=int(done_rows), output_bytes=int(output_bytes),
+        )
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        self._update(job_id, " AND status = 'running'", status=status, error=error, owner_pid=None)
+
+    def cancel(self, job_id: str) -> bool:
+        return self._update(job_id, " AND status IN ('queued', 'running')", status="cancelled", owner_pid=None)
+
+    def requeue(self, job_id: str):
+        """Hand a running job back to the queue, e.g. on shutdown."""
+        self._update(job_id, " AND status = 'running'", status="queued", owner_pid=None)
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in JOB_STATUSES} | dict(rows)
+
+    def resume(self, job_id: str) -> bool:
+        """Queue a failed or cancelled job again; it continues from its last committed chunk."""
+        return self._update(job_id, " AND status IN ('failed', 'cancelled')", status="queued", error=None)
+
+
+def read_fieldnames(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return csv.DictReader(f).fieldnames or []
+
+
+def count_rows(path: str, text_column: str) -> Tuple[int, List[str]]:
+    """Number of data rows in the CSV at ``path`` and its header; raises ValueError if ``text_column`` is missing."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames or []
+        if text_column not in fieldnames:
+            raise ValueError(f"Column '{text_column}' not found in {os.path.basename(path)} (columns: {fieldnames})")
+        return sum(1 for _ in reader), fieldnames
+
+
+def iter_chunks(path: str, start: int, chunk_size: int) -> Iterator[List[Dict[str, str]]]:
+    """Rows of the CSV at ``path`` from row ``start`` on, ``chunk_size`` at a time."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        chunk = []
+        for i, row in enumerate(reader):
+            if i < start:
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def output_fieldnames(input_fieldnames: List[str]) -> List[str]:
+    return [name for name in input_fieldnames if name not in (OUTPUT_COLUMN, SOURCE_COLUMN)] + [OUTPUT_COLUMN, SOURCE_COLUMN]
+
+
+def append_output(path: str, committed_bytes: int, fieldnames: List[str], rows: List[Dict[str, str]]) -> int:
+    """Append ``rows`` to the output CSV after dropping anything past ``committed_bytes``; returns the new size.
+
+    The data is fsynced before returning, so the size can be checkpointed.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    if committed_bytes == 0:
+        writer.writeheader()
+    writer.writerows(rows)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as f:
+        # Rows written after the last checkpoint (before a crash) are redone
+        f.truncate(committed_bytes)
+        f.seek(committed_bytes)
+        f.write(buffer.getvalue().encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def read_committed(path: str, committed_bytes: int, block_size: int = 1 << 16) -> Iterator[bytes]:
+    """The checkpointed part of an output file, in blocks."""
+    if not os.path.exists(path):
+        return
+    remaining = committed_bytes
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def open_job_store(path: Optional[str]) -> Optional[JobStore]:
+    """Open the job database, or return None (with a warning) if it cannot be used."""
+    if not path:
+        return None
+    try:
+        return JobStore(path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Batch jobs disabled: {e}")
+        return None
@@ -0,0 +1,98 @@
+import csv
+import math
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+try:
+    from backend.translation_memory import DIRECTION_PAIRS, SOURCE_COLUMN, TARGET_COLUMN
+except ImportError:  # imported as a top-level module from inside backend/
+    from translation_memory import DIRECTION_PAIRS, SOURCE_COLUMN, TARGET_COLUMN
+
+DEFAULT_TRAIN_PATH = os.path.join("dataset", "processed", "train.csv")
+
+
+@dataclass(frozen=True)
+class LengthLimit:
+    """Generation cap proportional to the input: ``ceil(ratio * source tokens) + margin``, within [floor, cap].
+
+    Like ``generate``'s ``max_length``, the cap counts the decoder start token.
+    """
+    ratio: float
+    margin: int
+    floor: int
+    cap: int
+    coverage: float = 1.0  # share of training targets that fit under their limit
+
+    def max_length(self, source_tokens: int) -> int:
+        return max(self.floor, min(self.cap, math.ceil(self.ratio * source_tokens) + self.margin))
+
+    def for_batch(self, attention_mask) -> int:
+        """Limit for a padded batch: the one its longest input needs."""
+        return self.max_length(int(attention_mask.sum(dim=1).max()))
+
+
+def direction_pairs(path: str, direction: str) -> Tuple[List[str], List[str]]:
+    """(sources, targets) of the processed corpus at ``path`` as seen by ``direction``'s model."""
+    language, reverse = DIRECTION_PAIRS[direction]
+    sources, targets = [], []
+    if not os.path.isfile(path):
+        return sources, targets
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            src = (row.get(SOURCE_COLUMN) or "").strip()
+            tgt = (row.get(TARGET_COLUMN) or "").strip()
+            if not src or not tgt or row.get("Language", language) != language:
+                continue
+            sources.append(tgt if reverse else src)
+            targets.append(src if reverse else tgt)
+    return sources, targets
+
+
+def fit_length_limit(
+    tokenizer,
+    sources: List[str],
+    targets: List[str],
+    quantile: float = 0.99,
+    margin: int = 2,
+    floor: int = 8,
+    cap: int = 128,
+    max_source_length: Optional[int] = None,
+) -> Optional[LengthLimit]:
+    """Fit the length ratio to the ``quantile`` of needed/source token counts over training pairs."""
+    if not sources:
+        return None
+    src_lens = [len(ids) for ids in tokenizer(sources, truncation=True, max_length=max_source_length)["input_ids"]]
+    # Target ids end with </s>; generate also counts the decoder start token
+    needed = [len(ids) + 1 for ids in tokenizer(text_target=targets, truncation=True, max_length=cap)["input_ids"]]
+    ratios = sorted(n / max(1, s) for n, s in zip(needed, src_lens))
+    ratio = ratios[min(len(ratios) - 1, int(quantile * (len(ratios) - 1) + 0.5))]
+    limit = LengthLimit(round(ratio, 4), margin, floor, cap)
+    covered = sum(n <= limit.max_length(s) for n, s in zip(needed, src_lens))
+    return LengthLimit(limit.ratio, margin, floor, cap, round(covered / len(needed), 4))
+
+
+def length_limit_for(tokenizer, direction: str, config: dict, root: str = "") -> Optional[LengthLimit]:
+    """Fit ``direction``'s limit from ``generation.length_limits`` in config.yaml (None when disabled)."""
+    limits_cfg = (config.get("generation") or {}).get("length_limits") or {}
+    if not limits_cfg.get("enabled", True) or direction not in DIRECTION_PAIRS:
+        return None
+    path = limits_cfg.get("train_path", DEFAULT_TRAIN_PATH)
+    if root and not os.path.isabs(path):
+        path = os.path.join(root, path)
+    model_cfg = config.get("model") or {}
+    sources, targets = direction_pairs(path, direction)
+    limit = fit_length_limit(
+        tokenizer, sources, targets,
+        quantile=limits_cfg.get("quantile", 0.99),
+        margin=limits_cfg.get("margin", 2),
+        floor=limits_cfg.get("min_length", 8),
+        cap=model_cfg.get("max_target_length", 128),
+        max_source_length=model_cfg.get("max_source_length"),
+    )
+    if limit is None:
+        print(f"No training pairs for {direction} in {path}, generating up to max_target_length")
+    else:
+        print(f"Length limit for {direction}: {limit.ratio} x source tokens + {limit.margin} "
+              f"(covers {100 * limit.coverage:.1f}% of training targets)")
+    return limit
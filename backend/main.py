@@ -1,59 +1,704 @@
+import asyncio
+import csv
+import functools
+import gc
+import json
 import os
+import shutil
 import sys
+import threading
+import time
+import uuid
+import weakref
 import torch
+from collections import defaultdict
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Path, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 
 # Add current directory to sys.path to import config_loader
 sys.path.append(os.path.dirname(__file__))
 from config_loader import load_config
+from batching import BatchResult, MicroBatcher, length_buckets
+from executors import ModelExecutor, TokenizerPool
+from cache import TranslationCache, generation_config_hash, make_cache_key
+from cache_store import open_store
+from streaming import attach_streamer, streaming_generation_kwargs
+from model_registry import LoadedModel, ModelRegistry, checkpoint_fingerprint, default_model_specs, engine_options
+from quantization import quantization_mode
+from onnx_engine import engine_mode
+from decoding_policy import AdaptiveDecodingPolicy, DecodingTier
+from admission import AdmissionController, ClientRateLimiter
+from coalescing import SingleFlight
+from warmup import DIRECTION_COLUMNS, load_warmup_samples
+from jobs import OUTPUT_COLUMN, SOURCE_COLUMN, append_output, count_rows, iter_chunks, open_job_store, output_fieldnames, read_committed, read_fieldnames
+from translation_memory import build_translation_memory
+from fuzzy_index import build_fuzzy_index
+from length_limits import length_limit_for
+from profiling import open_profiler
+from metrics import BATCH_BUCKETS, TOKEN_BUCKETS, MetricsRegistry, process_rss_bytes
+from thread_profile import apply_thread_settings, resolve_thread_settings
 
 # --- Configuration ---
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 CONFIG_PATH = os.path.join(ROOT, "config.yaml")
 config = load_config(CONFIG_PATH)
 
-# Model paths (local checkpoints preferred, fallback to config model)
-FORWARD_MODEL_PATH = os.environ.get("FORWARD_MODEL", os.path.join(ROOT, "outputs", "checkpoints", "t5-small-forward-ep5-lr3e4-64"))
-REVERSE_MODEL_PATH = os.environ.get("REVERSE_MODEL", os.path.join(ROOT, "outputs", "checkpoints", "t5-small-reverse-ep5-lr3e4-64"))
+# Model paths come from FORWARD_MODEL / REVERSE_MODEL / HINGLISH_*_MODEL (local checkpoints preferred, fallback to config model)
 FALLBACK_MODEL = config["model"]["name"]
+SERVING_CONFIG = config.get("serving", {})
+REGISTRY_CONFIG = config.get("registry", {})
+CACHE_CONFIG = config.get("cache", {})
+ADMISSION_CONFIG = config.get("admission", {})
+WARMUP_CONFIG = config.get("warmup", {})
+TM_CONFIG = config.get("translation_memory", {})
+HOT_SWAP_CONFIG = config.get("hot_swap", {})
+PROFILING_CONFIG = config.get("profiling", {})
+JOBS_CONFIG = config.get("jobs", {})
+JOBS_DIR = JOBS_CONFIG.get("dir", os.path.join("results", "jobs"))
+JOBS_DIR = JOBS_DIR if os.path.isabs(JOBS_DIR) else os.path.join(ROOT, JOBS_DIR)
+FUZZY_CONFIG = TM_CONFIG.get("fuzzy", {})
 
-# Global state to hold models and tokenizers
-models = {}
+# Torch thread counts and batch size from the scripts/tune_threads.py profile, applied before any model loads
+THREAD_SETTINGS = apply_thread_settings(resolve_thread_settings(config, ROOT))
+MAX_BATCH_SIZE = THREAD_SETTINGS["max_batch_size"] or SERVING_CONFIG.get("max_batch_size", 8)
+GENERATION_HASH = generation_config_hash(config.get("generation", {}))
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Load models and tokenizers once at startup."""
-    print("Loading models into memory...")
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    
-    # Load Forward Model (Slang -> English)
+# Beam width steps down towards greedy while a direction is overloaded (adaptive_decoding in config.yaml)
+decoding_policy = AdaptiveDecodingPolicy.from_config(config["generation"]["num_beams"], config.get("adaptive_decoding", {}))
+# Each tier caches under its own generation hash; the top tier's is GENERATION_HASH
+TIER_HASHES = {
+    tier.name: generation_config_hash({**config.get("generation", {}), "num_beams": tier.num_beams})
+    for tier in decoding_policy.tiers
+}
+
+DIRECTION_PATTERN = "^(forward|reverse|hinglish_forward|hinglish_reverse)$"
+DIRECTION_HELP = "Translation direction: 'forward' / 'hinglish_forward' (Slang -> Std) or 'reverse' / 'hinglish_reverse' (Std -> Slang)"
+
+def attach_executor(entry: LoadedModel):
+    # The executor's thread exits on its own once an evicted model is garbage collected
+    entry.executor = ModelExecutor(entry.direction)
+    # Fitted with the model's own tokenizer, so the ratio is in the tokens generate counts
+    entry.length_limit = length_limit_for(entry.tokenizer, entry.direction, config, ROOT)
+
+# Models are loaded on first use and evicted to stay within registry.memory_budget_mb
+registry = ModelRegistry(
+    default_model_specs(ROOT, FALLBACK_MODEL),
+    memory_budget_mb=REGISTRY_CONFIG.get("memory_budget_mb", 0),
+    idle_unload_seconds=REGISTRY_CONFIG.get("idle_unload_seconds", 0),
+    hf_token=os.environ.get("HF_TOKEN"),
+    quantize=quantization_mode(config),
+    engine=engine_mode(config),
+    engine_options=engine_options(config, engine_mode(config)),
+    on_load=attach_executor,
+)
+# One micro-batcher per direction
+batchers = {}
+# Bounded number of /translate and /translate/stream requests in flight per direction
+admission = {
+    direction: AdmissionController(
+        ADMISSION_CONFIG.get("max_in_flight", 64),
+        max_retry_after=ADMISSION_CONFIG.get("max_retry_after_seconds", 60),
+    )
+    for direction in registry.directions()
+}
+# Optional per-client token buckets (one token per translated text)
+client_limiter = ClientRateLimiter(
+    ADMISSION_CONFIG.get("client_rate_per_second", 0),
+    ADMISSION_CONFIG.get("client_burst", 20),
+)
+# /translate/batch items and /jobs rows draw on a separate bucket, so bulk work cannot lock a client out of /translate
+bulk_limiter = ClientRateLimiter(
+    ADMISSION_CONFIG.get("bulk_rate_per_second") or ADMISSION_CONFIG.get("client_rate_per_second", 0),
+    ADMISSION_CONFIG.get("bulk_burst", 5000),
+)
+# Shared thread pool for tokenization/detokenization (inference runs on each model's own executor)
+tokenizer_pool = None
+# Translation result cache (None when disabled in config.yaml)
+result_cache = TranslationCache(
+    max_entries=CACHE_CONFIG.get("max_entries", 10000),
+    ttl_seconds=CACHE_CONFIG.get("ttl_seconds", 3600),
+) if CACHE_CONFIG.get("enabled", True) else None
+# Identical concurrent /translate requests share one decode, with or without the result cache
+inflight = SingleFlight() if SERVING_CONFIG.get("coalesce", True) else None
+# Write-through on-disk copy of the result cache, opened in lifespan
+result_store = None
+# Batch translation jobs (jobs: in config.yaml), opened in lifespan; the worker waits on job_wakeup
+job_store = None
+job_wakeup = None
+# Curated translations from the parallel corpus, checked before the cache and the model
+translation_memory = build_translation_memory(
+    TM_CONFIG.get("sources", [os.path.join("dataset", "processed", "normalized_slang_dataset.csv")]), ROOT
+) if TM_CONFIG.get("enabled", True) else None
+# Near-duplicates of the same inputs ("bruhh that exam was lit" -> "bruh that exam was lit 🔥")
+fuzzy_index = build_fuzzy_index(translation_memory, FUZZY_CONFIG) if (
+    translation_memory is not None and FUZZY_CONFIG.get("enabled", True)
+) else None
+# Opt-in per-request traces (profiling: in config.yaml); None while disabled, the default
+profiler = open_profiler(config, ROOT)
+# Reported by /ready; becomes "ready" once startup warmup has finished
+warmup_state = {"status": "starting", "seconds": None, "directions": {}}
+# Last hot swap per direction (loading -> warming -> swapped / failed) and the tasks still running
+swap_state = {}
+swap_tasks = {}
+
+# --- Metrics (served by /metrics) ---
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram(
+    "translator_stage_seconds", "Time per pipeline stage of one batch (tokenization, encoder, decode, detokenization)",
+    ["direction", "stage"]
+)
+REQUEST_SECONDS = metrics.histogram(
+    "translator_request_seconds", "End-to-end /translate latency by where the answer came from (model, coalesced, cache, tm, tm_fuzzy)",
+    ["direction", "source"]
+)
+JOB_ROWS = metrics.counter("translator_job_rows_total", "CSV rows translated and checkpointed by batch jobs", ["direction"])
+COALESCED = metrics.counter(
+    "translator_coalesced_total", "/translate requests that shared an identical in-flight decode", ["direction"]
+)
+TM_HITS = metrics.counter("translator_tm_hits_total", "Requests answered from the translation memory", ["direction", "match"])
+INPUT_TOKENS = metrics.histogram("translator_input_tokens", "Source tokens per translated text", ["direction"], TOKEN_BUCKETS)
+OUTPUT_TOKENS = metrics.histogram("translator_output_tokens", "Generated tokens per translated text", ["direction"], TOKEN_BUCKETS)
+BATCH_SIZE = metrics.histogram("translator_batch_size", "Texts per generate call", ["direction"], BATCH_BUCKETS)
+REJECTED = metrics.counter("translator_rejected_total", "Requests turned away with 429", ["endpoint", "reason"])
+TRANSLATIONS = metrics.counter("translator_translations_total", "Texts translated by a model, per decoding tier", ["direction", "tier"])
+metrics.gauge(
+    "translator_queue_depth", "Requests waiting for a batch slot",
+    lambda: [((d,), b.queue_depth) for d, b in batchers.items()], ["direction"]
+)
+metrics.gauge(
+    "translator_in_flight", "Admitted /translate and /translate/stream requests not yet finished",
+    lambda: [((d,), c.in_flight) for d, c in admission.items()], ["direction"]
+)
+metrics.gauge(
+    "translator_cache_hit_ratio", "Result cache hit ratio since startup",
+    lambda: [((), result_cache.stats()["hit_ratio"])] if result_cache is not None else []
+)
+metrics.gauge(
+    "translator_cache_entries", "Entries in the in-memory result cache",
+    lambda: [((), len(result_cache))] if result_cache is not None else []
+)
+metrics.gauge(
+    "translator_decoding_beams", "Beam width currently used per direction (1 = greedy)",
+    lambda: [((d,), decoding_policy.current(d).num_beams) for d in batchers], ["direction"]
+)
+metrics.gauge("translator_model_resident_bytes", "Weights held by resident models", lambda: [((), registry.resident_bytes())])
+metrics.gauge("process_resident_memory_bytes", "Resident set size of the API process", lambda: [((), process_rss_bytes())])
+
+def generation_kwargs(num_beams: int = None, max_length: int = None) -> dict:
+    """Decoding arguments shared by every generate call, taken from config.yaml."""
+    gen_cfg = config["generation"]
+    model_cfg = config["model"]
+    kwargs = {
+        "max_length": max_length or model_cfg["max_target_length"],
+        "num_beams": gen_cfg["num_beams"] if num_beams is None else num_beams,
+        "no_repeat_ngram_size": gen_cfg["no_repeat_ngram_size"],
+        "length_penalty": gen_cfg["length_penalty"],
+        "temperature": gen_cfg["temperature"],
+        "top_p": gen_cfg["top_p"],
+        "repetition_penalty": gen_cfg["repetition_penalty"],
+        "early_stopping": True,
+    }
+    if kwargs["num_beams"] == 1:
+        # Beam-only options just trigger generate() warnings when decoding greedily
+        del kwargs["length_penalty"], kwargs["early_stopping"]
+    return kwargs
+
+def _encode(model_data: LoadedModel, texts):
+    # Padded to the longest text in the batch only, never to max_source_length
+    with model_data.tokenizer_lock:
+        return model_data.tokenizer(
+            texts, return_tensors="pt", padding=True, truncation=True, max_length=config["model"]["max_source_length"]
+        )
+
+def _decode(model_data: LoadedModel, output_ids):
+    with model_data.tokenizer_lock:
+        return model_data.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+
+def _token_lengths(model_data: LoadedModel, texts):
+    with model_data.tokenizer_lock:
+        return [len(ids) for ids in model_data.tokenizer(texts, truncation=True, max_length=config["model"]["max_source_length"])["input_ids"]]
+
+def max_length_for(model_data: LoadedModel, inputs) -> int:
+    """Generation cap for a tokenized batch: scaled to its longest input, or max_target_length."""
+    if model_data.length_limit is None:
+        return config["model"]["max_target_length"]
+    return model_data.length_limit.for_batch(inputs["attention_mask"])
+
+def _run_encoder(model, inputs):
+    """Encoder pass on its own so it can be timed apart from decoding (None for engines without one)."""
+    if not hasattr(model, "get_encoder"):
+        return None
+    with torch.no_grad():
+        inputs = inputs.to(model.device)
+        return model.get_encoder()(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"], return_dict=True)
+
+def _generate(model, inputs, gen_kwargs, encoder_outputs=None):
+    # no_grad is thread-local, so it has to be entered on the inference thread
+    with torch.no_grad():
+        inputs = inputs.to(model.device)
+        if encoder_outputs is not None:
+            return model.generate(attention_mask=inputs["attention_mask"], encoder_outputs=encoder_outputs, **gen_kwargs)
+        return model.generate(**inputs, **gen_kwargs)
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+async def acquire_model(direction: str) -> LoadedModel:
+    """Fetch the model for ``direction`` from the registry, loading it off the event loop if needed."""
+    loop = asyncio.get_running_loop()
     try:
-        path = FORWARD_MODEL_PATH if os.path.isdir(FORWARD_MODEL_PATH) else FALLBACK_MODEL
-        models["forward"] = {
-            "model": AutoModelForSeq2SeqLM.from_pretrained(path).to(device),
-            "tokenizer": AutoTokenizer.from_pretrained(path)
-        }
-        print(f"Forward model loaded from {path}")
+        return await loop.run_in_executor(None, registry.get, direction)
     except Exception as e:
-        print(f"Error loading forward model: {e}")
+        raise HTTPException(status_code=503, detail=f"Model for direction '{direction}' could not be loaded: {e}")
+
+def model_label(direction: str) -> str:
+    """Checkpoint serving ``direction`` (or the one that would be loaded next)."""
+    entry = registry.peek(direction)
+    return entry.source if entry is not None else registry.specs[direction].expected_source()
+
+def cache_key(text: str, direction: str, tier: DecodingTier = None, fingerprint: str = None):
+    gen_hash = GENERATION_HASH if tier is None else TIER_HASHES[tier.name]
+    return make_cache_key(text, direction, fingerprint or registry.fingerprint(direction), gen_hash)
+
+def cache_lookup(keys):
+    """Return ``(index, translation)`` for the first of ``keys`` cached in memory, and record the hit for the disk store.
+
+    The probes together count as one cache lookup.
+    """
+    if result_cache is None:
+        return None, None
+    index, cached_text = result_cache.get_first(keys)
+    if index is not None and result_store is not None:
+        result_store.touch(keys[index])
+    return index, cached_text
+
+def cache_save(key, translated_text: str, persist: bool = True):
+    if result_cache is None:
+        return
+    result_cache.put(key, translated_text)
+    if persist and result_store is not None:
+        result_store.put(key, translated_text)
+
+TM_MODEL_LABEL = "translation_memory"
+
+def tm_lookup(text: str, direction: str):
+    """Curated reference translation for ``text`` as ``(translated_text, source)``, or ``(None, None)``.
+
+    ``source`` is ``"tm"`` for an exact match and ``"tm_fuzzy"`` for a near-duplicate
+    from the fuzzy index.
+    """
+    if translation_memory is None:
+        return None, None
+    hit = translation_memory.lookup(text, direction)
+    if hit is not None:
+        TM_HITS.inc(direction=direction, match="exact")
+        return hit, "tm"
+    if fuzzy_index is not None:
+        match = fuzzy_index.lookup(text, direction)
+        if match is not None:
+            TM_HITS.inc(direction=direction, match="fuzzy")
+            return match[1], "tm_fuzzy"
+    return None, None
+
+def cached_translation(text: str, direction: str):
+    """Look up ``text`` at full quality, or at the tier ``direction`` is degraded to right now.
 
-    # Load Reverse Model (English -> Slang)
+    Returns ``(translated_text, tier)``, or ``(None, None)`` on a miss.
+    """
+    tiers = [decoding_policy.top]
+    if decoding_policy.current(direction) != decoding_policy.top:
+        tiers.append(decoding_policy.current(direction))
+    index, cached_text = cache_lookup([cache_key(text, direction, tier) for tier in tiers])
+    if index is None:
+        return None, None
+    return cached_text, tiers[index]
+
+def save_translation(text: str, direction: str, tier: DecodingTier, translated_text: str, fingerprint: str = None):
+    # Degraded results stay in memory only so they never outlive the overload on disk
+    # The fingerprint is the model's that decoded it, which is no longer the current one if a hot swap happened meanwhile
+    cache_save(cache_key(text, direction, tier, fingerprint), translated_text, persist=tier == decoding_policy.top)
+
+def warm_cache_from_store():
+    """Drop stale disk entries, then preload the most requested ones into memory."""
+    limit = CACHE_CONFIG.get("warm_entries", 1000)
+    rows = []
+    for direction in registry.directions():
+        fingerprint = registry.fingerprint(direction)
+        removed = result_store.invalidate_stale(direction, fingerprint, GENERATION_HASH)
+        if removed:
+            print(f"Invalidated {removed} stale cached translations for '{direction}'")
+        rows.extend(
+            (hits, (text, direction, fingerprint, GENERATION_HASH), translated)
+            for hits, text, translated in result_store.most_frequent(direction, fingerprint, GENERATION_HASH, limit)
+        )
+    rows.sort(key=lambda r: r[0], reverse=True)
+    # Insert least frequent first so the hottest entries end up most recently used
+    for _hits, key, translated in reversed(rows[:limit]):
+        result_cache.put(key, translated)
+    print(f"Warmed result cache with {min(len(rows), limit)} entries from {result_store.path}")
+
+async def translate_texts(
+    direction: str, texts: List[str], tier: DecodingTier = None, observe: bool = True, model_data: LoadedModel = None
+) -> List[str]:
+    """Translate one padded batch: tokenize, generate on the model's executor, detokenize.
+
+    The whole batch runs on one model: ``model_data`` if given, else the one serving ``direction`` now.
+    """
+    model_data = model_data or await acquire_model(direction)
+    stages = {}
+    inputs, stages["tokenization"] = await tokenizer_pool.run(_timed, _encode, model_data, texts)
+    encoder_outputs, seconds = await model_data.executor.run(_timed, _run_encoder, model_data.model, inputs)
+    if encoder_outputs is not None:
+        stages["encoder"] = seconds
+    num_beams = None if tier is None else tier.num_beams
+    gen_kwargs = generation_kwargs(num_beams, max_length_for(model_data, inputs))
+    outputs, stages["decode"] = await model_data.executor.run(
+        _timed, _generate, model_data.model, inputs, gen_kwargs, encoder_outputs
+    )
+    decoded, stages["detokenization"] = await tokenizer_pool.run(_timed, _decode, model_data, outputs)
+    if observe:
+        observe_batch(direction, model_data, inputs, outputs, tier, stages)
+    return [t.strip() for t in decoded]
+
+def observe_batch(direction: str, model_data: LoadedModel, inputs, outputs, tier: DecodingTier, stages: dict):
+    for stage, seconds in stages.items():
+        STAGE_SECONDS.observe(seconds, direction=direction, stage=stage)
+    BATCH_SIZE.observe(len(outputs), direction=direction)
+    TRANSLATIONS.inc(len(outputs), direction=direction, tier=(tier or decoding_policy.top).name)
+    for n in inputs["attention_mask"].sum(dim=1).tolist():
+        INPUT_TOKENS.observe(n, direction=direction)
+    # Position 0 is the decoder start token; padding fills rows that finished early
+    for n in (outputs[:, 1:] != model_data.tokenizer.pad_token_id).sum(dim=1).tolist():
+        OUTPUT_TOKENS.observe(n, direction=direction)
+
+def make_batch_runner(direction: str):
+    """Build the callable a batcher uses to translate a padded batch of texts."""
+    async def run_batch(texts):
+        # The tier is chosen per batch, from the load at dispatch time
+        tier = decoding_policy.select(direction, batchers[direction].queue_depth)
+        model_data = await acquire_model(direction)
+        outputs = await translate_texts(direction, texts, tier, model_data=model_data)
+        return outputs, {"decoding_tier": tier, "fingerprint": model_data.fingerprint}
+    return run_batch
+
+def client_id(http_request: Request) -> str:
+    """The caller's address, or the client header when admission.trust_client_header is set (behind a trusted proxy)."""
+    peer = http_request.client.host if http_request.client else "unknown"
+    if not ADMISSION_CONFIG.get("trust_client_header", False):
+        return peer
+    return http_request.headers.get(ADMISSION_CONFIG.get("client_header", "X-Client-Id")) or peer
+
+def check_client_rate(http_request: Request, endpoint: str, cost: int = 1, bulk: bool = False):
+    """Charge ``cost`` texts to the caller's interactive (or bulk) token bucket, or reject with 429."""
+    limiter = bulk_limiter if bulk else client_limiter
+    admitted, wait = limiter.try_acquire(client_id(http_request), cost)
+    if not admitted:
+        REJECTED.inc(endpoint=endpoint, reason="client_rate")
+        raise HTTPException(status_code=429, detail="Rate limit exceeded for this client", headers={"Retry-After": str(wait)})
+
+def admit(direction: str, endpoint: str):
+    """Take an in-flight slot for ``direction``, or reject with 429 and a Retry-After from the drain rate."""
+    controller = admission[direction]
+    if not controller.try_acquire():
+        REJECTED.inc(endpoint=endpoint, reason="queue_full")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many requests in flight for '{direction}', retry later",
+            headers={"Retry-After": str(controller.retry_after())}
+        )
+
+async def warmup_samples(directions: List[str]):
+    data_path = WARMUP_CONFIG.get("data_path", os.path.join("dataset", "processed", "test.csv"))
+    data_path = data_path if os.path.isabs(data_path) else os.path.join(ROOT, data_path)
+    return await asyncio.get_running_loop().run_in_executor(
+        None, load_warmup_samples, data_path, directions, WARMUP_CONFIG.get("samples", 8)
+    )
+
+async def warm_model(direction: str, texts: List[str], model_data: LoadedModel = None):
+    for _ in range(WARMUP_CONFIG.get("rounds", 2)):
+        # A mixed-length padded batch, then the shortest and longest input on their own
+        await translate_texts(direction, texts, observe=False, model_data=model_data)
+        await translate_texts(direction, texts[:1], observe=False, model_data=model_data)
+        await translate_texts(direction, texts[-1:], observe=False, model_data=model_data)
+
+async def run_warmup():
+    """Replay representative inputs of typical lengths through every loaded direction, then report ready."""
+    started = time.perf_counter()
+    warmup_state["status"] = "warming"
+    directions = registry.loaded_directions()
+    samples = await warmup_samples(directions)
+    for direction in directions:
+        direction_started = time.perf_counter()
+        try:
+            await warm_model(direction, samples[direction])
+            warmup_state["directions"][direction] = round(time.perf_counter() - direction_started, 2)
+        except Exception as e:
+            print(f"Warmup failed for {direction}: {e}")
+            warmup_state["directions"][direction] = None
+    warmup_state["seconds"] = round(time.perf_counter() - started, 2)
+    warmup_state["status"] = "ready"
+    print(f"Warmup finished in {warmup_state['seconds']}s for {', '.join(directions) or 'no models'}")
+
+# --- Hot swap ---
+async def hot_swap(direction: str, local_dir: str = None):
+    """Load a new checkpoint for ``direction`` next to the serving one, warm it up, then switch traffic to it.
+
+    Requests keep being served by the old model until the swap; batches already
+    running on it finish there, and its weights are freed once they are done.
+    """
+    started = time.perf_counter()
+    state = swap_state[direction]
+    loop = asyncio.get_running_loop()
     try:
-        path = REVERSE_MODEL_PATH if os.path.isdir(REVERSE_MODEL_PATH) else FALLBACK_MODEL
-        models["reverse"] = {
-            "model": AutoModelForSeq2SeqLM.from_pretrained(path).to(device),
-            "tokenizer": AutoTokenizer.from_pretrained(path)
-        }
-        print(f"Reverse model loaded from {path}")
+        entry = await loop.run_in_executor(None, registry.load_version, direction, local_dir)
+        state["status"] = "warming"
+        samples = await warmup_samples([direction])
+        # Runs on the new model's own executor, so the serving model is not held up
+        await warm_model(direction, samples[direction], model_data=entry)
+        old = registry.swap(entry, local_dir)
     except Exception as e:
-        print(f"Error loading reverse model: {e}")
+        state.update(status="failed", error=str(e), seconds=round(time.perf_counter() - started, 2))
+        print(f"Hot swap of {direction} failed, still serving the previous model: {e}")
+        return
+    state.update(status="swapped", fingerprint=entry.fingerprint, seconds=round(time.perf_counter() - started, 2))
+    if old is not None:
+        # Only the release coroutine may keep a reference, or the old weights would outlive it
+        release = release_retired(old)
+        del old, entry
+        await release
+
+async def release_retired(old: LoadedModel):
+    """Wait for the batches still running on a swapped-out model, then free its weights."""
+    direction = old.direction
+    # The executor runs calls in order, so this returns once the work already queued on it is done
+    await old.executor.run(lambda: None)
+    model_ref = weakref.ref(old.model)
+    del old
+    deadline = time.monotonic() + HOT_SWAP_CONFIG.get("release_timeout_seconds", 300)
+    while model_ref() is not None and time.monotonic() < deadline:
+        gc.collect()
+        await asyncio.sleep(0.5)
+    if model_ref() is not None:
+        print(f"Previous {direction} model is still referenced, its memory will be freed when released")
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    print(f"Freed previous {direction} model")
+
+def start_swap(direction: str, local_dir: str = None):
+    """Run :func:`hot_swap` in the background; at most one swap per direction at a time."""
+    task = swap_tasks.get(direction)
+    if task is not None and not task.done():
+        raise HTTPException(status_code=409, detail=f"A hot swap of '{direction}' is already in progress")
+    # Set before the task starts, so the caller's response already shows it
+    swap_state[direction] = {
+        "status": "loading",
+        "checkpoint": local_dir or registry.specs[direction].expected_source(),
+        "started_at": time.time(),
+        "seconds": None,
+        "error": None,
+    }
+    swap_tasks[direction] = asyncio.create_task(hot_swap(direction, local_dir))
+
+async def watch_checkpoints():
+    """Hot swap a loaded direction once its checkpoint directory has changed on disk and stopped changing."""
+    interval = HOT_SWAP_CONFIG.get("watch_seconds", 30)
+    loop = asyncio.get_running_loop()
+    # direction -> on-disk fingerprint seen at the previous poll, so half-written checkpoints are left alone
+    changed = {}
+    while True:
+        await asyncio.sleep(interval)
+        for direction in registry.loaded_directions():
+            task = swap_tasks.get(direction)
+            if (task is not None and not task.done()) or not await loop.run_in_executor(None, registry.checkpoint_changed, direction):
+                changed.pop(direction, None)
+                continue
+            entry = registry.peek(direction)
+            if entry is None:
+                continue
+            fingerprint = await loop.run_in_executor(None, checkpoint_fingerprint, entry.source)
+            if changed.get(direction) == fingerprint:
+                print(f"Checkpoint for {direction} changed on disk, hot swapping")
+                changed.pop(direction)
+                start_swap(direction)
+            else:
+                changed[direction] = fingerprint
+
+async def unload_idle_models():
+    """Periodically drop models that have not served a request for registry.idle_unload_seconds."""
+    interval = max(1.0, registry.idle_unload_seconds / 2)
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        await loop.run_in_executor(None, registry.unload_idle)
+
+async def jobs_call(fn, *args, **kwargs):
+    """Run a blocking JobStore (SQLite) or job file call in the default executor, off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+async def renew_job_lease(job_id: str, pid: int):
+    """Keep a running job's lease fresh while it decodes, however long a chunk takes."""
+    interval = JOBS_CONFIG.get("heartbeat_seconds", 30)
+    while True:
+        await asyncio.sleep(interval)
+        await jobs_call(job_store.heartbeat, job_id, pid)
+
+async def run_job(job: dict):
+    """Translate a job's CSV chunk by chunk, checkpointing after every chunk written to its output."""
+    loop = asyncio.get_running_loop()
+    job_id, direction = job["id"], job["direction"]
+    fieldnames = output_fieldnames(await loop.run_in_executor(None, read_fieldnames, job["input_path"]))
+    done_rows, output_bytes = job["done_rows"], job["output_bytes"]
+    chunks = iter_chunks(job["input_path"], done_rows, JOBS_CONFIG.get("chunk_size", 256))
+    print(f"Batch job {job_id}: {direction}, starting at row {done_rows} of {job['total_rows']}")
+    while True:
+        rows = await loop.run_in_executor(None, next, chunks, None)
+        if rows is None:
+            break
+        current = await jobs_call(job_store.get, job_id)
+        if current["status"] != "running" or current["owner_pid"] != job["owner_pid"]:
+            print(f"Batch job {job_id} stopped at row {done_rows}: {current['status']}")
+            return
+        texts = [(row.get(job["text_column"]) or "").strip() for row in rows]
+        filled = [i for i, text in enumerate(texts) if text]
+        outputs, _tiers, sources, _batches = await translate_many(direction, [texts[i] for i in filled])
+        for row in rows:
+            row[OUTPUT_COLUMN], row[SOURCE_COLUMN] = "", "empty"
+        for i, output, source in zip(filled, outputs, sources):
+            rows[i][OUTPUT_COLUMN], rows[i][SOURCE_COLUMN] = output, source
+        # Cancelled, or taken over by another worker while this chunk decoded: leave the output to the new owner
+        if not await jobs_call(job_store.heartbeat, job_id, job["owner_pid"]):
+            print(f"Batch job {job_id} stopped at row {done_rows}: no longer owned by this worker")
+            return
+        output_bytes = await loop.run_in_executor(None, append_output, job["output_path"], output_bytes, fieldnames, rows)
+        done_rows += len(rows)
+        if not await jobs_call(job_store.checkpoint, job_id, job["owner_pid"], done_rows, output_bytes):
+            print(f"Batch job {job_id} stopped at row {done_rows - len(rows)}: no longer owned by this worker")
+            return
+        JOB_ROWS.inc(len(rows), direction=direction)
+    await jobs_call(job_store.finish, job_id, "completed")
+    print(f"Batch job {job_id} completed: {done_rows} rows in {job['output_path']}")
+
+async def job_worker():
+    """Run queued batch jobs one at a time, alongside interactive traffic."""
+    pid = os.getpid()
+    while True:
+        job = await jobs_call(job_store.claim_next, pid)
+        if job is None:
+            job_wakeup.clear()
+            # Not wait_for: on Python 3.11 it drops a shutdown cancel that arrives together with a wakeup
+            waiter = asyncio.ensure_future(job_wakeup.wait())
+            try:
+                done, _ = await asyncio.wait({waiter}, timeout=JOBS_CONFIG.get("poll_seconds", 5))
+            finally:
+                waiter.cancel()
+            if not done:
+                # Picks up jobs left behind by a crashed sibling worker process (or whose lease ran out)
+                await jobs_call(job_store.requeue_orphans, pid, JOBS_CONFIG.get("stale_seconds", 600))
+            continue
+        lease = asyncio.create_task(renew_job_lease(job["id"], pid))
+        try:
+            await run_job(job)
+        except asyncio.CancelledError:
+            await jobs_call(job_store.requeue, job["id"])
+            raise
+        except Exception as e:
+            print(f"Batch job {job['id']} failed: {e}")
+            await jobs_call(job_store.finish, job["id"], "failed", str(e))
+        finally:
+            lease.cancel()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Preload the configured models and start the serving machinery."""
+    global tokenizer_pool, result_store, job_store, job_wakeup
+    print("Loading models into memory...")
+    tokenizer_pool = TokenizerPool(SERVING_CONFIG.get("tokenizer_workers", 2))
+
+    # Other directions are loaded lazily on their first request
+    for direction in REGISTRY_CONFIG.get("preload", ["forward", "reverse"]):
+        try:
+            registry.get(direction)
+        except Exception as e:
+            print(f"Error loading {direction} model: {e}")
+    # Fingerprint the lazily loaded directions now, so cache keys for them never stat checkpoints on the event loop
+    for direction in registry.directions():
+        registry.fingerprint(direction)
+
+    if result_cache is not None and CACHE_CONFIG.get("persist", False):
+        store_path = CACHE_CONFIG.get("persist_path", os.path.join("outputs", "cache", "translations.sqlite3"))
+        result_store = open_store(store_path if os.path.isabs(store_path) else os.path.join(ROOT, store_path))
+        if result_store is not None:
+            warm_cache_from_store()
+
+    for direction in registry.directions():
+        batchers[direction] = MicroBatcher(
+            direction,
+            make_batch_runner(direction),
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait_ms=SERVING_CONFIG.get("max_wait_ms", 10),
+        )
+        batchers[direction].start()
+
+    idle_task = None
+    if registry.idle_unload_seconds:
+        idle_task = asyncio.create_task(unload_idle_models())
+
+    # Jobs interrupted by the last shutdown or crash resume from their last committed chunk
+    job_task = None
+    if JOBS_CONFIG.get("enabled", True):
+        job_store = open_job_store(os.path.join(JOBS_DIR, "jobs.sqlite3"))
+        if job_store is not None:
+            resumed = job_store.requeue_orphans(os.getpid(), JOBS_CONFIG.get("stale_seconds", 600))
+            if resumed:
+                print(f"Resuming {resumed} interrupted batch job(s)")
+            job_wakeup = asyncio.Event()
+            job_task = asyncio.create_task(job_worker())
+
+    # Warm up in the background so /health answers while /ready still reports 503
+    warmup_task = None
+    if WARMUP_CONFIG.get("enabled", True):
+        warmup_task = asyncio.create_task(run_warmup())
+    else:
+        warmup_state["status"] = "ready"
+
+    watch_task = None
+    if HOT_SWAP_CONFIG.get("watch", False):
+        watch_task = asyncio.create_task(watch_checkpoints())
 
     yield
     # Cleanup
-    models.clear()
+    if idle_task is not None:
+        idle_task.cancel()
+    if watch_task is not None:
+        watch_task.cancel()
+    for task in swap_tasks.values():
+        task.cancel()
+    await asyncio.gather(*swap_tasks.values(), return_exceptions=True)
+    swap_tasks.clear()
+    if warmup_task is not None:
+        warmup_task.cancel()
+    warmup_state["status"] = "stopping"
+    if job_task is not None:
+        # The running job goes back to the queue and resumes on the next start
+        job_task.cancel()
+        await asyncio.gather(job_task, return_exceptions=True)
+    for batcher in batchers.values():
+        await batcher.stop()
+    batchers.clear()
+    for direction in registry.loaded_directions():
+        registry.peek(direction).executor.shutdown()
+    registry.clear()
+    tokenizer_pool.shutdown()
+    if result_store is not None:
+        result_store.close()
+        result_store = None
     print("Models cleared from memory.")
 
 app = FastAPI(
@@ -66,63 +711,586 @@ app = FastAPI(
 # --- Schemas ---
 class TranslationRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=500, description="The text to translate")
-    direction: str = Field("forward", pattern="^(forward|reverse)$", description="Translation direction: 'forward' (Slang -> Std) or 'reverse' (Std -> Slang)")
+    direction: str = Field("forward", pattern=DIRECTION_PATTERN, description=DIRECTION_HELP)
 
 class TranslationResponse(BaseModel):
     input_text: str
     translated_text: str
     direction: str
     model_used: str
+    batch_size: int = Field(1, description="Number of requests decoded together with this one (0 when served from cache)")
+    queue_wait_ms: float = Field(0.0, description="Time spent waiting for a batch slot, in milliseconds")
+    cached: bool = Field(False, description="Whether the translation was served from the result cache")
+    coalesced: bool = Field(False, description="Whether this request shared the decode of an identical request already in flight")
+    decoding_tier: Optional[str] = Field(None, description="Decoding used: 'beamN' or 'greedy'; lower than the configured beam width under load (None for tm)")
+    source: str = Field("model", description="Where the translation came from: 'model', 'cache', 'tm' (curated translation memory) or 'tm_fuzzy' (near-duplicate of a curated input)")
+    profile_id: Optional[str] = Field(None, description="Trace id under profiling.dir when this request was profiled (see GET /profiles/{profile_id})")
+
+class StreamTranslationRequest(TranslationRequest):
+    mode: str = Field("greedy", pattern="^(greedy|sampling)$", description="Decoding mode; beam search cannot be streamed")
+
+class BatchItem(BaseModel):
+    text: str = Field(..., min_length=1, max_length=500, description="The text to translate")
+    direction: str = Field("forward", pattern=DIRECTION_PATTERN, description=DIRECTION_HELP)
+
+class BatchTranslationRequest(BaseModel):
+    items: List[BatchItem] = Field(..., min_length=1, description="Texts to translate, each with its own direction")
+
+class BatchItemResult(BaseModel):
+    input_text: str
+    translated_text: str
+    direction: str
+    model_used: str
+    decoding_tier: Optional[str] = None
+    source: str = "model"
+
+class BatchTranslationResponse(BaseModel):
+    results: List[BatchItemResult]
+    num_batches: int = Field(..., description="Number of generate calls used for the whole request")
+
+class ReloadRequest(BaseModel):
+    checkpoint: Optional[str] = Field(None, description="Checkpoint directory to serve, inside one of hot_swap.checkpoint_dirs; defaults to the direction's current one (reloaded from disk)")
+
+class JobRequest(BaseModel):
+    input_path: str = Field(..., description="CSV file on the server, inside one of jobs.input_dirs (relative paths are from the repository root)")
+    direction: str = Field("forward", pattern=DIRECTION_PATTERN, description=DIRECTION_HELP)
+    column: Optional[str] = Field(None, description="Column holding the texts; defaults to the direction's source column in the processed dataset")
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="'queued', 'running', 'completed', 'failed' or 'cancelled'")
+    direction: str
+    text_column: str
+    total_rows: int
+    done_rows: int = Field(..., description="Rows translated and committed to the output so far")
+    progress: float = Field(..., description="done_rows / total_rows")
+    output_path: str = Field(..., description="Output CSV: the input columns plus translated_text and translation_source")
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
 
 # --- Endpoints ---
 @app.get("/health")
 async def health_check():
     """Health check endpoint to verify API and model status."""
+    job_counts = await jobs_call(job_store.counts) if job_store is not None else None
     return {
         "status": "healthy",
-        "models_loaded": list(models.keys()),
-        "device": "cuda" if torch.cuda.is_available() else "cpu"
+        "models_loaded": registry.loaded_directions(),
+        "models": registry.stats(),
+        "device": registry.device,
+        "threads": {**THREAD_SETTINGS, "max_batch_size": MAX_BATCH_SIZE},
+        "cache": result_cache.stats() if result_cache is not None else None,
+        "decoding": decoding_policy.stats(),
+        "admission": {d: c.stats() for d, c in admission.items()},
+        "client_limits": client_limiter.stats(),
+        "bulk_limits": bulk_limiter.stats(),
+        "coalescing": inflight.stats() if inflight is not None else None,
+        "jobs": job_counts,
+        "hot_swap": swap_state,
+        "profiling": profiler.stats() if profiler is not None else None,
+        "translation_memory": translation_memory.stats() if translation_memory is not None else None,
+        "fuzzy_index": fuzzy_index.stats() if fuzzy_index is not None else None
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until startup warmup has finished, separate from the /health liveness check."""
+    status_code = 200 if warmup_state["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=warmup_state)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text-format metrics: per-stage latencies, token counts, batch sizes, queue depth, cache and memory."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/translate", response_model=TranslationResponse)
-async def translate(request: TranslationRequest):
+async def translate(
+    request: TranslationRequest, http_request: Request, response: Response,
+    profile: bool = Query(False, description="Profile this request (also X-Profile: 1); needs profiling.enabled, rate-limited")
+):
     """Main translation endpoint."""
-    if request.direction not in models:
-        raise HTTPException(status_code=503, detail=f"Model for direction '{request.direction}' is not loaded.")
+    check_client_rate(http_request, "translate")
+    started = time.perf_counter()
+    profile_status = profiling_status(http_request, profile)
+    if profile_status is not None:
+        response.headers["X-Profile-Status"] = profile_status
+    if profile_status == "recorded":
+        return await translate_profiled(request)
+    tm_text, tm_source = tm_lookup(request.text, request.direction)
+    if tm_text is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, direction=request.direction, source=tm_source)
+        return TranslationResponse(
+            input_text=request.text,
+            translated_text=tm_text,
+            direction=request.direction,
+            model_used=TM_MODEL_LABEL,
+            batch_size=0,
+            source=tm_source
+        )
 
-    model_data = models[request.direction]
-    model = model_data["model"]
-    tokenizer = model_data["tokenizer"]
-    
-    gen_cfg = config["generation"]
-    model_cfg = config["model"]
-    
-    try:
-        inputs = tokenizer(request.text, return_tensors="pt", truncation=True).input_ids.to(model.device)
-        with torch.no_grad():
-            outputs = model.generate(
-                inputs,
-                max_length=model_cfg["max_target_length"],
-                num_beams=gen_cfg["num_beams"],
-                no_repeat_ngram_size=gen_cfg["no_repeat_ngram_size"],
-                length_penalty=gen_cfg["length_penalty"],
-                temperature=gen_cfg["temperature"],
-                top_p=gen_cfg["top_p"],
-                repetition_penalty=gen_cfg["repetition_penalty"],
-                early_stopping=True
-            )
-        
-        translated_text = tokenizer.decode(outputs[0], skip_special_tokens=True).strip()
-        
+    text = cache_key(request.text, request.direction)[0]
+    cached_text, tier = cached_translation(text, request.direction)
+    if cached_text is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, direction=request.direction, source="cache")
         return TranslationResponse(
             input_text=request.text,
-            translated_text=translated_text,
+            translated_text=cached_text,
             direction=request.direction,
-            model_used=model.config._name_or_path
+            model_used=model_label(request.direction),
+            batch_size=0,
+            cached=True,
+            decoding_tier=tier.name,
+            source="cache"
+        )
+
+    try:
+        if inflight is None:
+            result, shared = await translate_with_model(request.direction, text), False
+        else:
+            result, shared = await inflight.run(
+                cache_key(text, request.direction), lambda: translate_with_model(request.direction, text)
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Translation error: {str(e)}")
+    REQUEST_SECONDS.observe(time.perf_counter() - started, direction=request.direction, source="coalesced" if shared else "model")
+    if shared:
+        COALESCED.inc(direction=request.direction)
+    tier = result.info.get("decoding_tier", decoding_policy.top)
+    return TranslationResponse(
+        input_text=request.text,
+        translated_text=result.text,
+        direction=request.direction,
+        model_used=model_label(request.direction),
+        batch_size=result.batch_size,
+        queue_wait_ms=round(result.queue_wait_ms, 3),
+        decoding_tier=tier.name,
+        coalesced=shared
+    )
+
+# --- Request profiling ---
+def profiling_status(http_request: Request, requested: bool) -> Optional[str]:
+    """None when the request did not ask to be profiled, else whether it will be: 'recorded', 'disabled',
+    'unauthorized' (an admin token is configured and was not sent) or 'rate_limited'."""
+    header = http_request.headers.get(PROFILING_CONFIG.get("header", "X-Profile"), "")
+    if not requested and header.strip().lower() not in ("1", "true", "yes"):
+        return None
+    if profiler is None:
+        return "disabled"
+    if not admin_authorized(http_request):
+        return "unauthorized"
+    return "recorded" if profiler.try_acquire() else "rate_limited"
+
+def _profiled_translation(model_data: LoadedModel, text: str) -> dict:
+    """One text through every stage on the calling thread, each stage labelled in the torch trace."""
+    stages = {}
+    with torch.profiler.record_function("tokenization"):
+        inputs, stages["tokenization"] = _timed(_encode, model_data, [text])
+    gen_kwargs = generation_kwargs(None, max_length_for(model_data, inputs))
+    with torch.profiler.record_function("encoder"):
+        encoder_outputs, seconds = _timed(_run_encoder, model_data.model, inputs)
+    if encoder_outputs is not None:
+        stages["encoder"] = seconds
+    with torch.profiler.record_function("decode"):
+        outputs, stages["decode"] = _timed(_generate, model_data.model, inputs, gen_kwargs, encoder_outputs)
+    with torch.profiler.record_function("detokenization"):
+        decoded, stages["detokenization"] = _timed(_decode, model_data, outputs)
+    return {
+        "translated_text": decoded[0].strip(),
+        "stages_ms": {stage: round(1000.0 * seconds, 3) for stage, seconds in stages.items()},
+        "input_tokens": int(inputs["attention_mask"].sum()),
+        "output_tokens": int((outputs[0, 1:] != model_data.tokenizer.pad_token_id).sum()),
+        "generation": {k: v for k, v in gen_kwargs.items() if isinstance(v, (int, float, bool, str))},
+    }
+
+async def translate_profiled(request: TranslationRequest) -> TranslationResponse:
+    """Decode one text on its own under torch.profiler and cProfile.
+
+    Skips the translation memory, cache, coalescing and micro-batching so the
+    trace covers this input alone; it runs on the model's executor like any batch.
+    """
+    direction = request.direction
+    admit(direction, "translate")
+    try:
+        model_data = await acquire_model(direction)
+        meta = {"direction": direction, "input_text": request.text, "model": model_data.source, "engine": registry.engine}
+        try:
+            result, trace_id = await model_data.executor.run(profiler.run, _profiled_translation, model_data, request.text, meta=meta)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Translation error: {str(e)}")
+        # meta.json is rewritten off the event loop, like the trace files themselves
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(profiler.update, trace_id, **result))
+    finally:
+        admission[direction].release()
+    print(f"Profiled {direction} request in {sum(result['stages_ms'].values()):.1f} ms: trace {trace_id}")
+    return TranslationResponse(
+        input_text=request.text,
+        translated_text=result["translated_text"],
+        direction=direction,
+        model_used=model_data.source,
+        decoding_tier=decoding_policy.top.name,
+        profile_id=trace_id
+    )
+
+async def translate_with_model(direction: str, text: str) -> BatchResult:
+    """Admit one text, decode it through the direction's micro-batcher and cache the result."""
+    admit(direction, "translate")
+    try:
+        started = time.perf_counter()
+        result = await batchers[direction].submit(text)
+        decoding_policy.record(direction, (time.perf_counter() - started) * 1000.0)
+        save_translation(
+            text, direction, result.info.get("decoding_tier", decoding_policy.top), result.text, result.info.get("fingerprint")
+        )
+        return result
+    finally:
+        admission[direction].release()
+
+def _sse(payload: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+async def stream_translation(direction: str, text: str, mode: str):
+    """Yield Server-Sent Events carrying text chunks as the model decodes them."""
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    cancel = threading.Event()
+    done = object()
+
+    def on_text(chunk, _stream_end):
+        if chunk:
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+    pieces = []
+    try:
+        model_data = await acquire_model(direction)
+        inputs = await tokenizer_pool.run(_encode, model_data, [text])
+        gen_kwargs = attach_streamer(
+            streaming_generation_kwargs(config["generation"], mode, max_length_for(model_data, inputs)),
+            model_data.tokenizer, on_text, cancel
+        )
+        # Runs on the model's own executor, so it queues behind batched requests instead of racing them
+        task = asyncio.ensure_future(model_data.executor.run(_generate, model_data.model, inputs, gen_kwargs))
+        task.add_done_callback(lambda _: chunks.put_nowait(done))
+        while True:
+            chunk = await chunks.get()
+            if chunk is done:
+                break
+            pieces.append(chunk)
+            yield _sse({"text": chunk})
+        await task
+        yield _sse({"translated_text": "".join(pieces).strip(), "direction": direction, "mode": mode, "source": "model"}, event="done")
+    except HTTPException as e:
+        yield _sse({"detail": e.detail}, event="error")
+    except Exception as e:
+        yield _sse({"detail": f"Translation error: {str(e)}"}, event="error")
+    finally:
+        # Client went away or decode finished: either way stop at the next token
+        cancel.set()
+
+async def stream_from_memory(direction: str, translated_text: str, mode: str, source: str):
+    """A translation memory hit, sent as a single chunk in the same event format as a decode."""
+    yield _sse({"text": translated_text})
+    yield _sse({"translated_text": translated_text, "direction": direction, "mode": mode, "source": source}, event="done")
+
+@app.post("/translate/stream")
+async def translate_stream(request: StreamTranslationRequest, http_request: Request):
+    """Streaming translation endpoint (Server-Sent Events) for greedy and sampling decoding."""
+    check_client_rate(http_request, "stream")
+    tm_text, tm_source = tm_lookup(request.text, request.direction)
+    if tm_text is not None:
+        return StreamingResponse(
+            stream_from_memory(request.direction, tm_text, request.mode, tm_source),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"}
         )
+    admit(request.direction, "stream")
+    return StreamingResponse(
+        stream_translation(request.direction, cache_key(request.text, request.direction)[0], request.mode),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+        # Runs once the stream has finished or the client has disconnected
+        background=BackgroundTask(admission[request.direction].release)
+    )
+
+async def translate_many(direction: str, texts: List[str]):
+    """Translate many texts of one direction: translation memory, then cache, then length-sorted model batches.
+
+    Returns ``(translations, tiers, sources, num_batches)``, each in the order of ``texts``.
+    """
+    translations = [None] * len(texts)
+    tiers = [None] * len(texts)
+    sources = ["model"] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        tm_text, tm_source = tm_lookup(text, direction)
+        if tm_text is not None:
+            translations[i], sources[i] = tm_text, tm_source
+            continue
+        cached_text, tier = cached_translation(cache_key(text, direction)[0], direction)
+        if cached_text is None:
+            pending.append(i)
+        else:
+            translations[i], tiers[i], sources[i] = cached_text, tier, "cache"
+    if not pending:
+        return translations, tiers, sources, 0
+    keys = [cache_key(texts[i], direction)[0] for i in pending]
+    lengths = await tokenizer_pool.run(_token_lengths, await acquire_model(direction), keys)
+    buckets = length_buckets(
+        lengths,
+        max_batch_size=SERVING_CONFIG.get("bulk_batch_size", 32),
+        max_batch_tokens=SERVING_CONFIG.get("bulk_max_batch_tokens"),
+    )
+    for bucket in buckets:
+        # Bulk work degrades with interactive load, like the micro-batched requests
+        tier = decoding_policy.select(direction, batchers[direction].queue_depth)
+        model_data = await acquire_model(direction)
+        outputs = await translate_texts(direction, [keys[j] for j in bucket], tier, model_data=model_data)
+        for j, output in zip(bucket, outputs):
+            translations[pending[j]], tiers[pending[j]] = output, tier
+            save_translation(keys[j], direction, tier, output, model_data.fingerprint)
+    return translations, tiers, sources, len(buckets)
+
+@app.post("/translate/batch", response_model=BatchTranslationResponse)
+async def translate_batch(request: BatchTranslationRequest, http_request: Request):
+    """Bulk translation endpoint: groups items by direction and decodes them in length-sorted batches."""
+    max_items = SERVING_CONFIG.get("max_bulk_items", 5000)
+    if len(request.items) > max_items:
+        raise HTTPException(status_code=413, detail=f"At most {max_items} items are accepted per batch request.")
+    # Bulk callers pay per item (from their bulk bucket) so they cannot starve interactive clients
+    check_client_rate(http_request, "batch", cost=len(request.items), bulk=True)
+
+    by_direction = defaultdict(list)
+    for idx, item in enumerate(request.items):
+        by_direction[item.direction].append(idx)
+
+    translations = [None] * len(request.items)
+    tiers = [None] * len(request.items)
+    sources = ["model"] * len(request.items)
+    num_batches = 0
+    try:
+        for direction, indices in by_direction.items():
+            outputs, output_tiers, output_sources, batches = await translate_many(
+                direction, [request.items[i].text for i in indices]
+            )
+            for i, output, tier, source in zip(indices, outputs, output_tiers, output_sources):
+                translations[i], tiers[i], sources[i] = output, tier, source
+            num_batches += batches
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Translation error: {str(e)}")
 
+    return BatchTranslationResponse(
+        results=[
+            BatchItemResult(
+                input_text=item.text,
+                translated_text=translations[i],
+                direction=item.direction,
+                model_used=TM_MODEL_LABEL if sources[i].startswith("tm") else model_label(item.direction),
+                decoding_tier=tiers[i].name if tiers[i] is not None else None,
+                source=sources[i]
+            )
+            for i, item in enumerate(request.items)
+        ],
+        num_batches=num_batches
+    )
+
+# --- Admin ---
+def admin_authorized(http_request: Request) -> bool:
+    """Whether X-Admin-Token matches the variable named by hot_swap.admin_token_env (always true when it is unset)."""
+    token = os.environ.get(HOT_SWAP_CONFIG.get("admin_token_env", "ADMIN_TOKEN"))
+    return not token or http_request.headers.get("X-Admin-Token") == token
+
+def require_admin(http_request: Request):
+    if not admin_authorized(http_request):
+        raise HTTPException(status_code=401, detail="Missing or wrong X-Admin-Token")
+
+def resolve_checkpoint(path: str) -> str:
+    """Absolute path of a checkpoint directory, refusing anything outside hot_swap.checkpoint_dirs."""
+    full = os.path.realpath(path if os.path.isabs(path) else os.path.join(ROOT, path))
+    allowed = [
+        os.path.realpath(d if os.path.isabs(d) else os.path.join(ROOT, d))
+        for d in HOT_SWAP_CONFIG.get("checkpoint_dirs", [os.path.join("outputs", "checkpoints")])
+    ]
+    if not any(full.startswith(d + os.sep) for d in allowed):
+        raise HTTPException(status_code=403, detail="checkpoint must be inside one of hot_swap.checkpoint_dirs")
+    if not os.path.isdir(full):
+        raise HTTPException(status_code=404, detail=f"Checkpoint directory {path} not found")
+    return full
+
+def model_status(direction: str) -> dict:
+    entry = registry.peek(direction)
+    return {
+        "serving": entry.source if entry is not None else None,
+        "fingerprint": entry.fingerprint if entry is not None else None,
+        "loaded_at": entry.loaded_at if entry is not None else None,
+        "swap": swap_state.get(direction),
+    }
+
+@app.get("/admin/models")
+async def list_models(http_request: Request):
+    """The checkpoint serving each direction and the state of its last hot swap."""
+    require_admin(http_request)
+    return {
+        "models": {direction: model_status(direction) for direction in registry.directions()},
+        "retired_alive": registry.retired_alive(),
+    }
+
+@app.post("/admin/models/{direction}/reload", status_code=202)
+async def reload_model(
+    request: ReloadRequest, http_request: Request,
+    direction: str = Path(..., pattern=DIRECTION_PATTERN, description=DIRECTION_HELP)
+):
+    """Hot swap ``direction`` to a new checkpoint without a restart; poll /admin/models for progress."""
+    require_admin(http_request)
+    local_dir = resolve_checkpoint(request.checkpoint) if request.checkpoint else None
+    start_swap(direction, local_dir)
+    return model_status(direction)
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, http_request: Request):
+    """Summary of a recorded trace: stage timings, token counts and the files written next to it."""
+    require_admin(http_request)
+    if profiler is None:
+        raise HTTPException(status_code=503, detail="Request profiling is disabled")
+    record = await asyncio.get_running_loop().run_in_executor(None, profiler.load, profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No profile '{profile_id}'")
+    return {**record, "path": os.path.join(profiler.directory, profile_id)}
+
+# --- Batch jobs ---
+def job_response(job: dict) -> JobResponse:
+    return JobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        direction=job["direction"],
+        text_column=job["text_column"],
+        total_rows=job["total_rows"],
+        done_rows=job["done_rows"],
+        progress=round(job["done_rows"] / job["total_rows"], 4) if job["total_rows"] else 1.0,
+        output_path=job["output_path"],
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
+
+def require_job_store():
+    if job_store is None:
+        raise HTTPException(status_code=503, detail="Batch jobs are disabled")
+    return job_store
+
+async def get_job_or_404(job_id: str) -> dict:
+    job = await jobs_call(require_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job '{job_id}'")
+    return job
+
+def resolve_job_input(path: str) -> str:
+    """Absolute path of a server-side input CSV, refusing anything outside jobs.input_dirs."""
+    full = os.path.realpath(path if os.path.isabs(path) else os.path.join(ROOT, path))
+    allowed = [
+        os.path.realpath(d if os.path.isabs(d) else os.path.join(ROOT, d))
+        for d in JOBS_CONFIG.get("input_dirs", ["dataset", JOBS_DIR])
+    ]
+    if not any(full == d or full.startswith(d + os.sep) for d in allowed):
+        raise HTTPException(status_code=403, detail="input_path must be inside one of jobs.input_dirs")
+    if not os.path.isfile(full):
+        raise HTTPException(status_code=404, detail=f"Input file {path} not found")
+    return full
+
+async def submit_job(http_request: Request, direction: str, input_path: str, column: Optional[str], job_id: str = None) -> JobResponse:
+    store = require_job_store()
+    column = column or DIRECTION_COLUMNS[direction][0]
+    try:
+        total_rows, _ = await asyncio.get_running_loop().run_in_executor(None, count_rows, input_path, column)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable input CSV: {e}")
+    # Jobs pay one token per row like bulk requests, so they cannot be used to skip the client limiter
+    check_client_rate(http_request, "jobs", cost=max(1, total_rows), bulk=True)
+    job_id = job_id or uuid.uuid4().hex
+    output_path = os.path.join(JOBS_DIR, job_id, "output.csv")
+    job = await jobs_call(store.create, direction, input_path, column, output_path, total_rows, job_id=job_id)
+    job_wakeup.set()
+    return job_response(job)
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(request: JobRequest, http_request: Request):
+    """Queue a batch translation of a CSV already on the server; poll /jobs/{job_id} for progress."""
+    require_job_store()
+    return await submit_job(http_request, request.direction, resolve_job_input(request.input_path), request.column)
+
+@app.post("/jobs/upload", response_model=JobResponse, status_code=202)
+async def upload_job(
+    http_request: Request,
+    direction: str = Query("forward", pattern=DIRECTION_PATTERN, description=DIRECTION_HELP),
+    column: Optional[str] = Query(None, description="Column holding the texts")
+):
+    """Queue a batch translation of the CSV sent as the raw request body (Content-Type: text/csv)."""
+    require_job_store()
+    max_bytes = int(JOBS_CONFIG.get("max_upload_mb", 50) * 1024 * 1024)
+    job_id = uuid.uuid4().hex
+    input_path = os.path.join(JOBS_DIR, job_id, "input.csv")
+    await jobs_call(os.makedirs, os.path.dirname(input_path), exist_ok=True)
+    try:
+        size = 0
+        f = await jobs_call(open, input_path, "wb")
+        try:
+            async for block in http_request.stream():
+                size += len(block)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Uploads are limited to {JOBS_CONFIG.get('max_upload_mb', 50)} MB")
+                await jobs_call(f.write, block)
+        finally:
+            await jobs_call(f.close)
+        return await submit_job(http_request, direction, input_path, column, job_id=job_id)
+    except BaseException:
+        # Rejected or failed uploads (too large, bad CSV, rate limited, client gone) leave nothing behind
+        await jobs_call(shutil.rmtree, os.path.dirname(input_path), ignore_errors=True)
+        raise
+
+@app.get("/jobs", response_model=List[JobResponse])
+async def list_jobs(limit: int = Query(50, ge=1, le=1000)):
+    return [job_response(job) for job in await jobs_call(require_job_store().list, limit)]
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    return job_response(await get_job_or_404(job_id))
+
+@app.get("/jobs/{job_id}/output")
+async def get_job_output(job_id: str):
+    """The output CSV up to the last committed chunk (complete once the job has completed)."""
+    job = await get_job_or_404(job_id)
+    return StreamingResponse(
+        read_committed(job["output_path"], job["output_bytes"]),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{job_id}.csv"', "X-Job-Status": job["status"]}
+    )
+
+@app.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Stop a queued or running job after its current chunk; its output so far is kept."""
+    await get_job_or_404(job_id)
+    if not await jobs_call(job_store.cancel, job_id):
+        raise HTTPException(status_code=409, detail="Only queued or running jobs can be cancelled")
+    return job_response(await jobs_call(job_store.get, job_id))
+
+@app.post("/jobs/{job_id}/resume", response_model=JobResponse)
+async def resume_job(job_id: str):
+    """Queue a failed or cancelled job again; it continues from its last committed chunk."""
+    await get_job_or_404(job_id)
+    if not await jobs_call(job_store.resume, job_id):
+        raise HTTPException(status_code=409, detail="Only failed or cancelled jobs can be resumed")
+    job_wakeup.set()
+    return job_response(await jobs_call(job_store.get, job_id))
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = THREAD_SETTINGS["workers"]
+    if workers > 1:
+        # Multiple workers need an import string; each one applies the thread profile on import
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers, app_dir=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
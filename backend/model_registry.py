@@ -0,0 +1,435 @@
+import gc
+import hashlib
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+try:
+    from backend.fake_model import FakeSeq2SeqModel, FakeTokenizer, fake_model_options
+    from backend.onnx_engine import OnnxSeq2SeqEngine, has_onnx_export, onnx_dir_for
+    from backend.quantization import load_cached, quantize_model, save_cached
+    from backend.speculative import SpeculativeSeq2SeqEngine, speculative_options
+except ImportError:  # imported as a top-level module from inside backend/
+    from fake_model import FakeSeq2SeqModel, FakeTokenizer, fake_model_options
+    from onnx_engine import OnnxSeq2SeqEngine, has_onnx_export, onnx_dir_for
+    from quantization import load_cached, quantize_model, save_cached
+    from speculative import SpeculativeSeq2SeqEngine, speculative_options
+
+# direction -> (local checkpoint env var, default local checkpoint, hub id env var)
+DEFAULT_DIRECTIONS = {
+    "forward": ("FORWARD_MODEL", os.path.join("outputs", "checkpoints", "t5-small-forward-ep5-lr3e4-64"), "FORWARD_MODEL_ID"),
+    "reverse": ("REVERSE_MODEL", os.path.join("outputs", "checkpoints", "t5-small-reverse-ep5-lr3e4-64"), "REVERSE_MODEL_ID"),
+    "hinglish_forward": ("HINGLISH_FORWARD_MODEL", os.path.join("outputs", "checkpoints", "t5-small-hinglish-forward-ep10-lr0.0002-64"), "HINGLISH_FORWARD_MODEL_ID"),
+    "hinglish_reverse": ("HINGLISH_REVERSE_MODEL", os.path.join("outputs", "checkpoints", "t5-small-hinglish-reverse-ep10-lr0.0002-64"), "HINGLISH_REVERSE_MODEL_ID"),
+}
+
+
+def checkpoint_fingerprint(path: str) -> str:
+    """Identify a checkpoint by its files' names, sizes and mtimes.
+
+    Hub model ids (no local directory) are identified by the id itself.
+    """
+    if not os.path.isdir(path):
+        return path
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        if os.path.isfile(full):
+            st = os.stat(full)
+            digest.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+    return f"{os.path.basename(os.path.normpath(path))}@{digest.hexdigest()[:16]}"
+
+
+@dataclass
+class ModelSpec:
+    """Where to find the checkpoint for one translation direction."""
+    direction: str
+    local_dir: Optional[str] = None
+    hub_id: Optional[str] = None
+    fallback: str = "google/flan-t5-small"
+
+    def expected_source(self) -> str:
+        """The checkpoint a load would try first, without touching the network."""
+        if self.local_dir and os.path.isdir(self.local_dir):
+            return self.local_dir
+        return self.hub_id or self.fallback
+
+
+@dataclass
+class LoadedModel:
+    """A resident model/tokenizer pair and its bookkeeping."""
+    direction: str
+    model: Any
+    tokenizer: Any
+    source: str
+    is_finetuned: bool
+    fingerprint: str
+    resident_bytes: int
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.monotonic)
+    # Fast tokenizers are not safe to call from several threads at once
+    tokenizer_lock: threading.Lock = field(default_factory=threading.Lock)
+    # Per-model inference executor, attached by the serving layer when it needs one
+    executor: Any = None
+    # Input-length-aware generation cap (backend/length_limits.py), attached the same way
+    length_limit: Any = None
+
+
+def default_model_specs(root: str = "", fallback: str = "google/flan-t5-small") -> Dict[str, ModelSpec]:
+    """Build specs for all four directions from the usual env vars and checkpoint paths."""
+    specs = {}
+    for direction, (path_env, default_path, id_env) in DEFAULT_DIRECTIONS.items():
+        local_dir = os.environ.get(path_env, default_path)
+        if root and not os.path.isabs(local_dir):
+            local_dir = os.path.join(root, local_dir)
+        specs[direction] = ModelSpec(
+            direction=direction,
+            local_dir=local_dir,
+            hub_id=os.environ.get(id_env) or None,
+            fallback=fallback,
+        )
+    return specs
+
+
+def engine_options(config: dict, engine: str) -> dict:
+    """Constructor arguments for ``engine``'s model wrapper: the fake model's cost curves or speculative decoding's."""
+    return fake_model_options(config) if engine == "fake" else speculative_options(config)
+
+
+def model_resident_bytes(model) -> int:
+    """Bytes held by a model's weights, including packed (quantized) ones."""
+    seen = set()
+
+    def nbytes(value):
+        if isinstance(value, torch.Tensor):
+            # Tied weights (shared embeddings) appear under several keys
+            if value.data_ptr() in seen:
+                return 0
+            seen.add(value.data_ptr())
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(nbytes(v) for v in value)
+        return 0
+    # state_dict() rather than parameters(): quantized Linear weights are not Parameters
+    return sum(nbytes(v) for v in model.state_dict(keep_vars=True).values())
+
+
+def load_pretrained(spec: ModelSpec, device: str, hf_token: Optional[str] = None):
+    """Load ``spec`` trying the local checkpoint, then the hub id, then the base model.
+
+    Returns ``(model, tokenizer, source, is_finetuned)``.
+    """
+    if spec.local_dir and os.path.isdir(spec.local_dir):
+        try:
+            model = AutoModelForSeq2SeqLM.from_pretrained(spec.local_dir)
+            tokenizer = AutoTokenizer.from_pretrained(spec.local_dir)
+            return model.to(device), tokenizer, spec.local_dir, True
+        except Exception as e:
+            print(f"Could not load {spec.direction} checkpoint from {spec.local_dir}: {e}")
+    if spec.hub_id:
+        try:
+            kw = {"token": hf_token} if hf_token else {}
+            model = AutoModelForSeq2SeqLM.from_pretrained(spec.hub_id, **kw)
+            tokenizer = AutoTokenizer.from_pretrained(spec.hub_id, **kw)
+            return model.to(device), tokenizer, spec.hub_id, True
+        except Exception as e:
+            print(f"Could not load {spec.direction} model {spec.hub_id}: {e}")
+    model = AutoModelForSeq2SeqLM.from_pretrained(spec.fallback)
+    tokenizer = AutoTokenizer.from_pretrained(spec.fallback)
+    return model.to(device), tokenizer, spec.fallback, False
+
+
+class ModelRegistry:
+    """Loads translation models on first use and keeps them within a RAM budget.
+
+    All four directions are served through :meth:`get`. When the resident
+    models exceed ``memory_budget_mb`` the least recently used ones are
+    dropped; models idle for longer than ``idle_unload_seconds`` are dropped
+    by :meth:`unload_idle`. Callers that still hold a dropped model can keep
+    using it, its memory is released once they let go.
+
+    A new checkpoint is deployed with :meth:`load_version` (which loads it
+    next to the serving model) followed by :meth:`swap`.
+    """
+
+    def __init__(
+        self,
+        specs: Dict[str, ModelSpec],
+        memory_budget_mb: float = 0,
+        idle_unload_seconds: float = 0,
+        device: Optional[str] = None,
+        hf_token: Optional[str] = None,
+        quantize: str = "none",
+        engine: str = "torch",
+        engine_options: Optional[dict] = None,
+        on_load: Optional[Callable[[LoadedModel], None]] = None,
+        on_unload: Optional[Callable[[LoadedModel], None]] = None,
+    ):
+        self.specs = dict(specs)
+        self.memory_budget_bytes = int(float(memory_budget_mb or 0) * 1024 * 1024)
+        self.idle_unload_seconds = float(idle_unload_seconds or 0)
+        self.quantize = quantize
+        self.engine = engine
+        self.engine_options = dict(engine_options or {})
+        # Dynamically quantized kernels, the ONNX engine and the fake model only run on CPU
+        self.device = "cpu" if quantize != "none" or engine in ("onnx", "fake") else (device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.hf_token = hf_token
+        self.on_load = on_load
+        self.on_unload = on_unload
+        self._loaded: Dict[str, LoadedModel] = {}
+        self._lock = threading.RLock()
+        self._load_locks = {direction: threading.Lock() for direction in self.specs}
+        self.loads = 0
+        self.evictions = 0
+        self.swaps = 0
+        # Models replaced by swap(), alive until their last in-flight caller lets go
+        self._retired: List[weakref.ref] = []
+        # Fingerprints of the checkpoints unloaded directions would load (stat-ing them is too slow per request)
+        self._expected_fingerprints: Dict[str, str] = {}
+
+    def __contains__(self, direction: str) -> bool:
+        return direction in self.specs
+
+    def directions(self) -> List[str]:
+        return list(self.specs)
+
+    def loaded_directions(self) -> List[str]:
+        with self._lock:
+            return list(self._loaded)
+
+    def peek(self, direction: str) -> Optional[LoadedModel]:
+        """Return the resident model for ``direction`` without loading or touching its LRU slot."""
+        with self._lock:
+            return self._loaded.get(direction)
+
+    def fingerprint(self, direction: str) -> str:
+        """Fingerprint of the loaded checkpoint, or of the one a load would pick.
+
+        The latter is computed once and refreshed when the direction is
+        unloaded or swapped, so this is cheap enough to call per request.
+        """
+        with self._lock:
+            entry = self._loaded.get(direction)
+            if entry is not None:
+                return entry.fingerprint
+            fingerprint = self._expected_fingerprints.get(direction)
+        if fingerprint is None:
+            fingerprint = self._expected_fingerprint(direction)
+            with self._lock:
+                self._expected_fingerprints[direction] = fingerprint
+        return fingerprint
+
+    def _expected_fingerprint(self, direction: str) -> str:
+        if self.engine == "fake":
+            return self._fingerprint(f"fake:{direction}")
+        return self._fingerprint(self.specs[direction].expected_source())
+
+    def _fingerprint(self, source: str, onnx: Optional[bool] = None) -> str:
+        fingerprint = checkpoint_fingerprint(source)
+        if onnx is None:
+            onnx = self.engine == "onnx" and has_onnx_export(source)
+        if onnx:
+            # The export's own files too, so re-exporting (new opset, merged decoders) changes it
+            return f"{fingerprint}+{checkpoint_fingerprint(onnx_dir_for(source))}"
+        return fingerprint if self.quantize == "none" else f"{fingerprint}+{self.quantize}"
+
+    def get(self, direction: str) -> LoadedModel:
+        """Return the model for ``direction``, loading it (and evicting others) if needed."""
+        if direction not in self.specs:
+            raise KeyError(f"Unknown direction '{direction}'")
+        self.unload_idle()
+        with self._lock:
+            entry = self._loaded.get(direction)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                return entry
+        # Loading can take seconds; only block other loads of the same direction
+        with self._load_locks[direction]:
+            with self._lock:
+                entry = self._loaded.get(direction)
+                if entry is not None:
+                    entry.last_used = time.monotonic()
+                    return entry
+            entry = self._load(direction)
+            with self._lock:
+                self._loaded[direction] = entry
+                self.loads += 1
+                self._enforce_budget(keep=direction)
+            return entry
+
+    def load_version(self, direction: str, local_dir: Optional[str] = None) -> LoadedModel:
+        """Load ``direction`` again, from ``local_dir`` if given, without serving it yet.
+
+        Unlike :meth:`get`, a checkpoint that fails to load raises instead of
+        falling back to the base model.
+        """
+        if direction not in self.specs:
+            raise KeyError(f"Unknown direction '{direction}'")
+        spec = self.specs[direction]
+        if local_dir is not None:
+            if not os.path.isdir(local_dir):
+                raise FileNotFoundError(f"Checkpoint directory {local_dir} not found")
+            spec = replace(spec, local_dir=local_dir, hub_id=None)
+        return self._load(direction, replace(spec, fallback=spec.expected_source()))
+
+    def swap(self, entry: LoadedModel, local_dir: Optional[str] = None) -> Optional[LoadedModel]:
+        """Serve ``entry`` for its direction from now on and return the model it replaced.
+
+        ``local_dir`` becomes the direction's checkpoint for later reloads.
+        Callers already holding the old model finish on it.
+        """
+        direction = entry.direction
+        with self._lock:
+            old = self._loaded.get(direction)
+            self._loaded[direction] = entry
+            if local_dir is not None:
+                self.specs[direction] = replace(self.specs[direction], local_dir=local_dir)
+            self._expected_fingerprints.pop(direction, None)
+            self.swaps += 1
+            self._retired = [ref for ref in self._retired if ref() is not None]
+            if old is not None:
+                self._retired.append(weakref.ref(old.model))
+            self._enforce_budget(keep=direction)
+        if old is not None and self.on_unload is not None:
+            self.on_unload(old)
+        print(f"Swapped {direction} model: now serving {entry.source}")
+        return old
+
+    def checkpoint_changed(self, direction: str) -> bool:
+        """Whether the resident model's local checkpoint has changed on disk since it was loaded."""
+        entry = self.peek(direction)
+        if entry is None or not os.path.isdir(entry.source):
+            return False
+        return self._fingerprint(entry.source, onnx=isinstance(entry.model, OnnxSeq2SeqEngine)) != entry.fingerprint
+
+    def retired_alive(self) -> int:
+        """Swapped-out models still held by in-flight requests."""
+        with self._lock:
+            self._retired = [ref for ref in self._retired if ref() is not None]
+            return len(self._retired)
+
+    def _load(self, direction: str, spec: Optional[ModelSpec] = None) -> LoadedModel:
+        spec = spec or self.specs[direction]
+        model = None
+        if self.engine == "fake":
+            # No checkpoint involved: a timing stand-in for scheduler and cache benchmarks
+            model, tokenizer = FakeSeq2SeqModel(**self.engine_options), FakeTokenizer()
+            source, is_finetuned = f"fake:{direction}", False
+        if self.engine == "onnx":
+            source = spec.expected_source()
+            if has_onnx_export(source):
+                try:
+                    model = OnnxSeq2SeqEngine(onnx_dir_for(source))
+                    tokenizer = AutoTokenizer.from_pretrained(source)
+                    is_finetuned = source != spec.fallback
+                except ImportError as e:
+                    print(f"{e}; serving {direction} with PyTorch")
+            else:
+                print(f"No ONNX export for {direction} in {onnx_dir_for(source)}, falling back to PyTorch (run scripts/export_onnx.py)")
+        if model is None and self.quantize != "none":
+            source = spec.expected_source()
+            model = load_cached(source, self.quantize, checkpoint_fingerprint(source))
+            if model is not None:
+                tokenizer = AutoTokenizer.from_pretrained(source)
+                is_finetuned = source != spec.fallback
+        if model is None:
+            model, tokenizer, source, is_finetuned = load_pretrained(spec, self.device, self.hf_token)
+            if self.quantize != "none":
+                model = quantize_model(model, self.quantize)
+                save_cached(model, source, self.quantize, checkpoint_fingerprint(source))
+        model.eval()
+        resident_bytes = model.resident_bytes() if hasattr(model, "resident_bytes") else model_resident_bytes(model)
+        if self.engine == "speculative":
+            # Same greedy output as the wrapped model, so the fingerprint (and cached results) stay valid
+            model = SpeculativeSeq2SeqEngine(model, tokenizer, **self.engine_options)
+        entry = LoadedModel(
+            direction=direction,
+            model=model,
+            tokenizer=tokenizer,
+            source=source,
+            is_finetuned=is_finetuned,
+            fingerprint=self._fingerprint(source, onnx=isinstance(model, OnnxSeq2SeqEngine)),
+            resident_bytes=resident_bytes,
+        )
+        if self.on_load is not None:
+            self.on_load(entry)
+        suffix = ", onnx" if isinstance(model, OnnxSeq2SeqEngine) else ", fake" if isinstance(model, FakeSeq2SeqModel) else (f", {self.quantize}" if self.quantize != "none" else "")
+        if isinstance(model, SpeculativeSeq2SeqEngine):
+            suffix += ", speculative"
+        print(f"Loaded {direction} model from {source} ({entry.resident_bytes / 2**20:.1f} MiB{suffix})")
+        return entry
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.resident_bytes for e in self._loaded.values())
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        if not self.memory_budget_bytes:
+            return
+        while self.resident_bytes() > self.memory_budget_bytes:
+            candidates = [e for d, e in self._loaded.items() if d != keep]
+            if not candidates:
+                break
+            victim = min(candidates, key=lambda e: e.last_used)
+            self._drop(victim.direction, reason="memory budget")
+
+    def _drop(self, direction: str, reason: str):
+        entry = self._loaded.pop(direction, None)
+        if entry is None:
+            return
+        # The checkpoint may have changed while it was loaded; a later get() reloads from whatever is there now
+        self._expected_fingerprints[direction] = self._expected_fingerprint(direction)
+        if reason in ("memory budget", "idle"):
+            self.evictions += 1
+        if self.on_unload is not None:
+            self.on_unload(entry)
+        print(f"Unloaded {direction} model ({reason})")
+        del entry
+        gc.collect()
+
+    def unload(self, direction: str):
+        with self._lock:
+            self._drop(direction, reason="requested")
+
+    def unload_idle(self) -> List[str]:
+        """Drop models not used for ``idle_unload_seconds``; returns the dropped directions."""
+        if not self.idle_unload_seconds:
+            return []
+        cutoff = time.monotonic() - self.idle_unload_seconds
+        with self._lock:
+            idle = [d for d, e in self._loaded.items() if e.last_used < cutoff]
+            for direction in idle:
+                self._drop(direction, reason="idle")
+        return idle
+
+    def clear(self):
+        with self._lock:
+            for direction in list(self._loaded):
+                self._drop(direction, reason="shutdown")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": {
+                    d: {
+                        "source": e.source, "resident_mb": round(e.resident_bytes / 2**20, 1), "finetuned": e.is_finetuned,
+                        **({"speculative": e.model.stats()} if isinstance(e.model, SpeculativeSeq2SeqEngine) else {}),
+                        **({"fake": e.model.stats()} if isinstance(e.model, FakeSeq2SeqModel) else {}),
+                    }
+                    for d, e in self._loaded.items()
+                },
+                "resident_mb": round(sum(e.resident_bytes for e in self._loaded.values()) / 2**20, 1),
+                "quantize": self.quantize,
+                "engine": self.engine,
+                "memory_budget_mb": round(self.memory_budget_bytes / 2**20, 1) if self.memory_budget_bytes else None,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "swaps": self.swaps,
+                "retired_alive": len([ref for ref in self._retired if ref() is not None]),
+            }
@@ -0,0 +1,291 @@
+import json
+import os
+from types import SimpleNamespace
+from typing import List, Optional
+
+import numpy as np
+import torch
+
+try:
+    import onnxruntime as ort
+except ImportError:  # optional dependency, only needed for engine: onnx
+    ort = None
+
+ENGINES = ("torch", "onnx", "speculative", "fake")
+ENGINE_CONFIG_NAME = "engine_config.json"
+ENCODER_FILE = "encoder.onnx"
+DECODER_INIT_FILE = "decoder_init.onnx"
+DECODER_WITH_PAST_FILE = "decoder_with_past.onnx"
+
+
+def past_names(prefix: str, num_layers: int, cross: bool) -> List[str]:
+    """Graph input/output names for the key/value cache, in the order the graphs use."""
+    names = []
+    for i in range(num_layers):
+        names += [f"{prefix}.{i}.self.key", f"{prefix}.{i}.self.value"]
+        if cross:
+            names += [f"{prefix}.{i}.cross.key", f"{prefix}.{i}.cross.value"]
+    return names
+
+
+def engine_mode(config: dict) -> str:
+    """Requested inference engine: the ENGINE env var wins over ``inference.engine`` in config.yaml."""
+    engine = os.environ.get("ENGINE") or (config.get("inference") or {}).get("engine") or "torch"
+    engine = str(engine).lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported inference engine '{engine}', expected one of {ENGINES}")
+    return engine
+
+
+def onnx_dir_for(checkpoint_dir: str) -> str:
+    return os.path.join(checkpoint_dir, "onnx")
+
+
+def has_onnx_export(checkpoint_dir: str) -> bool:
+    return os.path.isfile(os.path.join(onnx_dir_for(checkpoint_dir), ENGINE_CONFIG_NAME))
+
+
+def _log_softmax(x: np.ndarray) -> np.ndarray:
+    x = x - x.max(axis=-1, keepdims=True)
+    return x - np.log(np.exp(x).sum(axis=-1, keepdims=True))
+
+
+class _BeamHypotheses:
+    def __init__(self, num_beams: int, length_penalty: float):
+        self.num_beams = num_beams
+        self.length_penalty = length_penalty
+        self.beams = []
+
+    def add(self, tokens: List[int], sum_logprobs: float):
+        score = sum_logprobs / (max(1, len(tokens)) ** self.length_penalty)
+        self.beams.append((score, tokens))
+        self.beams.sort(key=lambda b: b[0], reverse=True)
+        del self.beams[self.num_beams:]
+
+    def __len__(self):
+        return len(self.beams)
+
+
+class OnnxSeq2SeqEngine:
+    """ONNX Runtime replacement for ``AutoModelForSeq2SeqLM.generate`` on exported T5 checkpoints.
+
+    Loads the three graphs written by ``scripts/export_onnx.py`` (encoder,
+    first decoder step, decoder step with past key/values) and implements
+    greedy and beam decoding on top of them. ``generate`` accepts the same
+    keyword arguments the call sites already pass and returns a LongTensor,
+    so it can stand in for the PyTorch model unchanged. Sampling is not
+    supported.
+    """
+
+    def __init__(self, onnx_dir: str, num_threads: Optional[int] = None):
+        if ort is None:
+            raise ImportError("onnxruntime is required for the ONNX engine (pip install onnxruntime)")
+        with open(os.path.join(onnx_dir, ENGINE_CONFIG_NAME), "r", encoding="utf-8") as f:
+            self.engine_config = json.load(f)
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+        providers = ["CPUExecutionProvider"]
+        self.encoder = ort.InferenceSession(os.path.join(onnx_dir, ENCODER_FILE), options, providers=providers)
+        self.decoder_init = ort.InferenceSession(os.path.join(onnx_dir, DECODER_INIT_FILE), options, providers=providers)
+        self.decoder_with_past = ort.InferenceSession(os.path.join(onnx_dir, DECODER_WITH_PAST_FILE), options, providers=providers)
+        self.onnx_dir = onnx_dir
+        self.num_layers = self.engine_config["num_layers"]
+        self.start_id = self.engine_config["decoder_start_token_id"]
+        self.eos_id = self.engine_config["eos_token_id"]
+        self.pad_id = self.engine_config["pad_token_id"]
+        self.device = torch.device("cpu")
+        self.config = SimpleNamespace(_name_or_path=self.engine_config.get("source", onnx_dir), is_encoder_decoder=True)
+        self._init_outputs = ["logits"] + past_names("present", self.num_layers, cross=True)
+        self._past_inputs = past_names("past", self.num_layers, cross=True)
+        self._past_outputs = ["logits"] + past_names("present", self.num_layers, cross=False)
+
+    # --- nn.Module-like surface used by the call sites ---
+    def to(self, device):
+        return self
+
+    def eval(self):
+        return self
+
+    def resident_bytes(self) -> int:
+        files = (ENCODER_FILE, DECODER_INIT_FILE, DECODER_WITH_PAST_FILE)
+        return sum(os.path.getsize(os.path.join(self.onnx_dir, name)) for name in files)
+
+    # --- graph calls ---
+    def encode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        return self.encoder.run(None, {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+
+    def _first_step(self, decoder_ids, hidden, mask):
+        outputs = self.decoder_init.run(self._init_outputs, {
+            "decoder_input_ids": decoder_ids, "encoder_hidden_states": hidden, "encoder_attention_mask": mask,
+        })
+        return outputs[0][:, -1, :], outputs[1:]
+
+    def _next_step(self, decoder_ids, mask, past):
+        feed = {"decoder_input_ids": decoder_ids, "encoder_attention_mask": mask}
+        feed.update(zip(self._past_inputs, past))
+        outputs = self.decoder_with_past.run(self._past_outputs, feed)
+        self_kv = outputs[1:]
+        merged = []
+        for i in range(self.num_layers):
+            # Cross-attention key/values never change after the first step
+            merged += [self_kv[2 * i], self_kv[2 * i + 1], past[4 * i + 2], past[4 * i + 3]]
+        return outputs[0][:, -1, :], merged
+
+    # --- logits processing (mirrors the HF processors the call sites enable) ---
+    @staticmethod
+    def _process(scores: np.ndarray, sequences: List[List[int]], repetition_penalty: float, no_repeat_ngram_size: int) -> np.ndarray:
+        if repetition_penalty and repetition_penalty != 1.0:
+            for row, seq in enumerate(sequences):
+                if not seq:
+                    continue
+                idx = np.unique(np.asarray(seq))
+                vals = scores[row, idx]
+                scores[row, idx] = np.where(vals < 0, vals * repetition_penalty, vals / repetition_penalty)
+        n = no_repeat_ngram_size or 0
+        if n > 0:
+            for row, seq in enumerate(sequences):
+                if len(seq) + 1 < n:
+                    continue
+                prefix = tuple(seq[len(seq) - n + 1:]) if n > 1 else ()
+                for i in range(len(seq) - n + 1):
+                    if tuple(seq[i:i + n - 1]) == prefix:
+                        scores[row, seq[i + n - 1]] = -np.inf
+        return scores
+
+    def generate(
+        self,
+        input_ids=None,
+        attention_mask=None,
+        max_length: int = 128,
+        max_new_tokens: Optional[int] = None,
+        num_beams: int = 1,
+        no_repeat_ngram_size: int = 0,
+        repetition_penalty: float = 1.0,
+        length_penalty: float = 1.0,
+        num_return_sequences: int = 1,
+        do_sample: bool = False,
+        streamer=None,
+        stopping_criteria=None,
+        **_ignored,
+    ) -> torch.Tensor:
+        if do_sample:
+            raise ValueError("Sampling is not supported by the ONNX engine; use greedy or beam search")
+        ids = input_ids.cpu().numpy() if isinstance(input_ids, torch.Tensor) else np.asarray(input_ids)
+        ids = ids.astype(np.int64)
+        if attention_mask is None:
+            mask = (ids != self.pad_id).astype(np.int64)
+        else:
+            mask = (attention_mask.cpu().numpy() if isinstance(attention_mask, torch.Tensor) else np.asarray(attention_mask)).astype(np.int64)
+        # Like HF, max_length counts the decoder start token
+        max_steps = max_new_tokens if max_new_tokens is not None else max(1, max_length - 1)
+        hidden = self.encode(ids, mask)
+        if num_beams <= 1:
+            sequences = self._greedy(hidden, mask, max_steps, no_repeat_ngram_size, repetition_penalty, streamer, stopping_criteria)
+        else:
+            sequences = self._beam(hidden, mask, max_steps, num_beams, no_repeat_ngram_size, repetition_penalty,
+                                   length_penalty, num_return_sequences)
+        width = max(len(s) for s in sequences) + 1
+        out = np.full((len(sequences), width), self.pad_id, dtype=np.int64)
+        for row, seq in enumerate(sequences):
+            out[row, 0] = self.start_id
+            out[row, 1:1 + len(seq)] = seq
+        return torch.from_numpy(out)
+
+    def _greedy(self, hidden, mask, max_steps, no_repeat_ngram_size, repetition_penalty, streamer, stopping_criteria):
+        batch = hidden.shape[0]
+        sequences: List[List[int]] = [[] for _ in range(batch)]
+        finished = np.zeros(batch, dtype=bool)
+        step_ids = np.full((batch, 1), self.start_id, dtype=np.int64)
+        if streamer is not None:
+            streamer.put(torch.from_numpy(step_ids[:, 0]))
+        scores, past = self._first_step(step_ids, hidden, mask)
+        for _ in range(max_steps):
+            scores = self._process(scores.astype(np.float32), sequences, repetition_penalty, no_repeat_ngram_size)
+            next_tokens = scores.argmax(axis=-1)
+            next_tokens = np.where(finished, self.pad_id, next_tokens)
+            for row in range(batch):
+                if not finished[row]:
+                    sequences[row].append(int(next_tokens[row]))
+            if streamer is not None:
+                streamer.put(torch.from_numpy(next_tokens.astype(np.int64)))
+            finished |= next_tokens == self.eos_id
+            if finished.all():
+                break
+            if stopping_criteria is not None:
+                current = torch.tensor([[self.start_id] + s for s in sequences]) if batch == 1 else None
+                if current is not None and any(bool(c(current, None)) for c in stopping_criteria):
+                    break
+            step_ids = next_tokens[:, None].astype(np.int64)
+            scores, past = self._next_step(step_ids, mask, past)
+        if streamer is not None:
+            streamer.end()
+        return sequences
+
+    def _beam(self, hidden, mask, max_steps, num_beams, no_repeat_ngram_size, repetition_penalty, length_penalty, num_return_sequences):
+        batch = hidden.shape[0]
+        hidden = np.repeat(hidden, num_beams, axis=0)
+        mask = np.repeat(mask, num_beams, axis=0)
+        beam_seqs: List[List[int]] = [[] for _ in range(batch * num_beams)]
+        beam_scores = np.zeros((batch, num_beams), dtype=np.float32)
+        beam_scores[:, 1:] = -1e9  # all beams start identical; only expand the first
+        beam_scores = beam_scores.reshape(-1)
+        hyps = [_BeamHypotheses(num_beams, length_penalty) for _ in range(batch)]
+        done = [False] * batch
+
+        step_ids = np.full((batch * num_beams, 1), self.start_id, dtype=np.int64)
+        scores, past = self._first_step(step_ids, hidden, mask)
+        for step in range(max_steps):
+            last_step = step == max_steps - 1
+            # Beam search runs the processors on log-probabilities, as HF does
+            logprobs = self._process(_log_softmax(scores.astype(np.float32)), beam_seqs, repetition_penalty, no_repeat_ngram_size)
+            logprobs = logprobs + beam_scores[:, None]
+            vocab = logprobs.shape[-1]
+            flat = logprobs.reshape(batch, num_beams * vocab)
+            top = np.argsort(-flat, axis=1)[:, :2 * num_beams]
+
+            next_scores = np.zeros((batch, num_beams), dtype=np.float32)
+            next_tokens = np.full((batch, num_beams), self.pad_id, dtype=np.int64)
+            next_beams = np.zeros((batch, num_beams), dtype=np.int64)
+            for b in range(batch):
+                if done[b]:
+                    next_beams[b] = b * num_beams
+                    continue
+                if last_step:
+                    # Hitting max_length finishes the top num_beams candidates, ended by EOS or not
+                    for idx in top[b][:num_beams]:
+                        beam, token = divmod(int(idx), vocab)
+                        hyps[b].add(beam_seqs[b * num_beams + beam] + [token], float(flat[b, idx]))
+                    done[b] = True
+                    continue
+                slot = 0
+                for rank, idx in enumerate(top[b]):
+                    beam, token = divmod(int(idx), vocab)
+                    global_beam = b * num_beams + beam
+                    score = float(flat[b, idx])
+                    if token == self.eos_id:
+                        if rank < num_beams:
+                            hyps[b].add(beam_seqs[global_beam] + [token], score)
+                        continue
+                    next_scores[b, slot] = score
+                    next_tokens[b, slot] = token
+                    next_beams[b, slot] = global_beam
+                    slot += 1
+                    if slot == num_beams:
+                        break
+                # early_stopping=True: stop once num_beams finished hypotheses exist
+                if len(hyps[b]) >= num_beams:
+                    done[b] = True
+            if all(done):
+                break
+            order = next_beams.reshape(-1)
+            beam_seqs = [beam_seqs[i] + [int(t)] for i, t in zip(order, next_tokens.reshape(-1))]
+            beam_scores = next_scores.reshape(-1)
+            past = [p[order] for p in past]
+            scores, past = self._next_step(next_tokens.reshape(-1, 1), mask, past)
+
+        results = []
+        for b in range(batch):
+            for _score, tokens in hyps[b].beams[:num_return_sequences]:
+                results.append(tokens)
+        return results
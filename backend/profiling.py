@@ -0,0 +1,150 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import shutil
+import time
+import uuid
+from typing import Any, Callable, Optional, Tuple
+
+import torch
+
+try:
+    from backend.admission import ClientRateLimiter
+except ImportError:  # imported as a top-level module from inside backend/
+    from admission import ClientRateLimiter
+
+TRACE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+META_FILE = "meta.json"
+
+
+class RequestProfiler:
+    """Runs single requests under ``torch.profiler`` and ``cProfile`` and keeps the traces on disk.
+
+    Each trace is a directory ``<directory>/<trace_id>/`` holding the Chrome
+    trace (``torch_trace.json``, open in chrome://tracing or Perfetto), the
+    torch operator table, the cProfile stats (``cprofile.prof`` for snakeviz,
+    plus a text summary) and ``meta.json``. At most ``max_per_minute`` traces
+    are recorded (a shared token bucket), and only the newest ``max_traces``
+    are kept.
+    """
+
+    def __init__(self, directory: str, max_per_minute: float = 6, burst: float = 2, max_traces: int = 200,
+                 record_shapes: bool = True, top: int = 40):
+        self.directory = directory
+        self.limiter = ClientRateLimiter(float(max_per_minute) / 60.0, burst)
+        self.max_traces = int(max_traces)
+        self.record_shapes = bool(record_shapes)
+        self.top = int(top)
+        self.recorded = 0
+        self.rate_limited = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def try_acquire(self) -> bool:
+        admitted, _ = self.limiter.try_acquire("profiles")
+        if not admitted:
+            self.rate_limited += 1
+        return admitted
+
+    def run(self, fn: Callable[..., Any], *args, meta: Optional[dict] = None) -> Tuple[Any, str]:
+        """Call ``fn(*args)`` under both profilers on the current thread; returns ``(result, trace_id)``.
+
+        The trace is written even if ``fn`` raises, so the slow path that failed can be inspected.
+        """
+        trace_id = uuid.uuid4().hex
+        trace_dir = os.path.join(self.directory, trace_id)
+        os.makedirs(trace_dir, exist_ok=True)
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        py_profile = cProfile.Profile()
+        error = None
+        started = time.perf_counter()
+        with torch.profiler.profile(activities=activities, record_shapes=self.record_shapes) as torch_profile:
+            py_profile.enable()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                error, result = e, None
+            finally:
+                py_profile.disable()
+        seconds = time.perf_counter() - started
+
+        torch_profile.export_chrome_trace(os.path.join(trace_dir, "torch_trace.json"))
+        with open(os.path.join(trace_dir, "torch_ops.txt"), "w", encoding="utf-8") as f:
+            f.write(torch_profile.key_averages().table(sort_by="self_cpu_time_total", row_limit=self.top))
+        py_profile.dump_stats(os.path.join(trace_dir, "cprofile.prof"))
+        summary = io.StringIO()
+        pstats.Stats(py_profile, stream=summary).sort_stats("cumulative").print_stats(self.top)
+        with open(os.path.join(trace_dir, "cprofile.txt"), "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        record = {
+            "trace_id": trace_id,
+            "created_at": time.time(),
+            "seconds": round(seconds, 4),
+            "error": str(error) if error is not None else None,
+            **(meta or {}),
+            "files": sorted(os.listdir(trace_dir)) + [META_FILE],
+        }
+        with open(os.path.join(trace_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2, ensure_ascii=False)
+        self.recorded += 1
+        self._prune()
+        if error is not None:
+            raise error
+        return result, trace_id
+
+    def update(self, trace_id: str, **fields):
+        """Add fields (e.g. the translated text) to a trace's meta.json."""
+        record = self.load(trace_id)
+        if record is None:
+            return
+        record.update(fields)
+        with open(os.path.join(self.directory, trace_id, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2, ensure_ascii=False)
+
+    def load(self, trace_id: str) -> Optional[dict]:
+        if not TRACE_ID_PATTERN.match(trace_id or ""):
+            return None
+        path = os.path.join(self.directory, trace_id, META_FILE)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _prune(self):
+        traces = [
+            entry for entry in os.scandir(self.directory)
+            if entry.is_dir() and TRACE_ID_PATTERN.match(entry.name)
+        ]
+        if len(traces) <= self.max_traces:
+            return
+        traces.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in traces[:len(traces) - self.max_traces]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def stats(self) -> dict:
+        return {"recorded": self.recorded, "rate_limited": self.rate_limited, "directory": self.directory}
+
+
+def open_profiler(config: dict, root: str = "") -> Optional[RequestProfiler]:
+    """Profiler for ``profiling`` in config.yaml, or None when profiling is disabled (the default)."""
+    prof_cfg = config.get("profiling") or {}
+    if not prof_cfg.get("enabled", False):
+        return None
+    directory = prof_cfg.get("dir", os.path.join("results", "profiles"))
+    if root and not os.path.isabs(directory):
+        directory = os.path.join(root, directory)
+    try:
+        return RequestProfiler(
+            directory,
+            max_per_minute=prof_cfg.get("max_per_minute", 6),
+            burst=prof_cfg.get("burst", 2),
+            max_traces=prof_cfg.get("max_traces", 200),
+            record_shapes=prof_cfg.get("record_shapes", True),
+        )
+    except OSError as e:
+        print(f"Request profiling disabled: {e}")
+        return None
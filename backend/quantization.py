@@ -0,0 +1,65 @@
+import json
+import os
+from typing import Optional
+
+import torch
+
+QUANTIZATION_MODES = ("none", "int8")
+ARTIFACT_DIR = "quantized"
+
+
+def quantization_mode(config: dict) -> str:
+    """Requested quantization: the QUANTIZE env var wins over ``inference.quantize`` in config.yaml."""
+    mode = os.environ.get("QUANTIZE") or (config.get("inference") or {}).get("quantize") or "none"
+    mode = str(mode).lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unsupported quantization mode '{mode}', expected one of {QUANTIZATION_MODES}")
+    return mode
+
+
+def quantize_model(model, mode: str):
+    """Apply dynamic int8 quantization to every ``nn.Linear`` (CPU inference only)."""
+    if mode == "none":
+        return model
+    model = model.to("cpu").eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _artifact_paths(checkpoint_dir: str, mode: str):
+    # Kept in a subdirectory so the checkpoint's own fingerprint (top-level files only) is unchanged
+    base = os.path.join(checkpoint_dir, ARTIFACT_DIR)
+    return os.path.join(base, f"{mode}-dynamic.pt"), os.path.join(base, f"{mode}-dynamic.json")
+
+
+def load_cached(checkpoint_dir: str, mode: str, fingerprint: str):
+    """Return the cached quantized model for ``checkpoint_dir``, or None if missing or stale."""
+    if mode == "none" or not os.path.isdir(checkpoint_dir):
+        return None
+    model_path, meta_path = _artifact_paths(checkpoint_dir, mode)
+    if not (os.path.isfile(model_path) and os.path.isfile(meta_path)):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("fingerprint") != fingerprint or meta.get("torch") != torch.__version__:
+            return None
+        return torch.load(model_path, map_location="cpu", weights_only=False).eval()
+    except Exception as e:
+        print(f"Ignoring unreadable quantized artifact {model_path}: {e}")
+        return None
+
+
+def save_cached(model, checkpoint_dir: str, mode: str, fingerprint: str) -> Optional[str]:
+    """Store a quantized model next to its checkpoint; returns the artifact path (None for hub models)."""
+    if mode == "none" or not os.path.isdir(checkpoint_dir):
+        return None
+    model_path, meta_path = _artifact_paths(checkpoint_dir, mode)
+    try:
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        torch.save(model, model_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "torch": torch.__version__, "mode": mode}, f, indent=2)
+        return model_path
+    except OSError as e:
+        print(f"Could not cache quantized model in {checkpoint_dir}: {e}")
+        return None
@@ -0,0 +1,232 @@
+from typing import List, Optional
+
+import torch
+from transformers import LogitsProcessorList, NoRepeatNGramLogitsProcessor, RepetitionPenaltyLogitsProcessor
+
+try:
+    from dataset.slang_emoji_dict import normalize_text
+except ImportError:  # repository root not on sys.path; draft from the input alone
+    normalize_text = None
+
+
+def find_draft(generated: List[int], sources: List[List[int]], ngram_size: int, num_draft_tokens: int) -> List[int]:
+    """Continuation of the longest n-gram suffix of ``generated`` found in ``sources`` (prompt lookup).
+
+    Tries suffixes of ``ngram_size`` tokens down to one and returns the tokens
+    that followed the first match, or an empty draft.
+    """
+    for n in range(min(ngram_size, len(generated)), 0, -1):
+        suffix = generated[-n:]
+        for source in sources:
+            for i in range(len(source) - n):
+                if source[i:i + n] == suffix:
+                    return source[i + n:i + n + num_draft_tokens]
+    return []
+
+
+def crop_cache(past, length: int):
+    """Drop decoder self-attention entries past ``length`` tokens from ``past_key_values``.
+
+    Handles both ``EncoderDecoderCache`` and the legacy per-layer tuples
+    ``(self_key, self_value, cross_key, cross_value)`` of older transformers;
+    the cross-attention entries cover the encoder output and are kept whole.
+    """
+    if hasattr(past, "crop"):
+        stale = past.get_seq_length() - length
+        if stale > 0:
+            past.crop(-stale)
+        return past
+    return tuple(
+        (layer[0][:, :, :length], layer[1][:, :, :length], *layer[2:])
+        for layer in past
+    )
+
+
+class SpeculativeSeq2SeqEngine:
+    """Greedy decoding for a seq2seq model with drafts copied from the input.
+
+    Slang -> standard translations reuse many source tokens, so at every step
+    the last few generated tokens are looked up in the input (and in its
+    ``normalize_text`` rewrite) and the tokens that followed there are
+    proposed as a draft. One decoder pass scores the whole draft; the longest
+    prefix matching the model's own greedy choice is kept, plus the model's
+    next token. The output is identical to ``generate(num_beams=1)`` with the
+    same repetition settings (the model's ``generation_config`` fills in the
+    ones left unset), only with fewer decoder passes.
+
+    Beam search and sampling are passed through to the wrapped model. There is
+    no ``get_encoder``, so callers hand over ``input_ids`` (the draft source)
+    rather than precomputed encoder outputs.
+    """
+
+    def __init__(self, model, tokenizer, ngram_size: int = 3, num_draft_tokens: int = 8, normalize: bool = True):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.ngram_size = ngram_size
+        self.num_draft_tokens = num_draft_tokens
+        self.normalize = normalize and normalize_text is not None
+        self.config = model.config
+        self.generation_config = model.generation_config
+        self.reset_stats()
+
+    # --- nn.Module-like surface used by the call sites ---
+    @property
+    def device(self):
+        return self.model.device
+
+    def to(self, device):
+        self.model.to(device)
+        return self
+
+    def eval(self):
+        self.model.eval()
+        return self
+
+    # --- statistics ---
+    def reset_stats(self):
+        self.drafted = 0
+        self.accepted = 0
+        self.decoder_passes = 0
+        self.generated = 0
+
+    def stats(self) -> dict:
+        return {
+            "drafted_tokens": self.drafted,
+            "accepted_tokens": self.accepted,
+            "acceptance_rate": round(self.accepted / self.drafted, 4) if self.drafted else None,
+            "decoder_passes": self.decoder_passes,
+            "generated_tokens": self.generated,
+            "tokens_per_pass": round(self.generated / self.decoder_passes, 3) if self.decoder_passes else None,
+        }
+
+    # --- decoding ---
+    def _draft_sources(self, input_ids: List[int]) -> List[List[int]]:
+        sources = [input_ids]
+        if self.normalize:
+            text = self.tokenizer.decode(input_ids, skip_special_tokens=True)
+            normalized = normalize_text(text)
+            if normalized and normalized != text:
+                sources.append(self.tokenizer(normalized, truncation=True)["input_ids"])
+        return sources
+
+    def generate(
+        self,
+        input_ids=None,
+        attention_mask=None,
+        encoder_outputs=None,
+        max_length: Optional[int] = None,
+        max_new_tokens: Optional[int] = None,
+        num_beams: int = 1,
+        do_sample: bool = False,
+        no_repeat_ngram_size: Optional[int] = None,
+        repetition_penalty: Optional[float] = None,
+        eos_token_id=None,
+        streamer=None,
+        stopping_criteria=None,
+        **kwargs,
+    ):
+        if num_beams > 1 or do_sample:
+            delegated = dict(
+                input_ids=input_ids, attention_mask=attention_mask, encoder_outputs=encoder_outputs,
+                max_length=max_length, max_new_tokens=max_new_tokens, num_beams=num_beams, do_sample=do_sample,
+                no_repeat_ngram_size=no_repeat_ngram_size, repetition_penalty=repetition_penalty,
+                eos_token_id=eos_token_id, streamer=streamer, stopping_criteria=stopping_criteria, **kwargs,
+            )
+            # generate() skips the encoder whenever the encoder_outputs key is present, even if it is None
+            return self.model.generate(**{k: v for k, v in delegated.items() if v is not None})
+        if input_ids is None and encoder_outputs is None:
+            raise ValueError("generate needs input_ids or encoder_outputs")
+        if attention_mask is None:
+            attention_mask = (input_ids != self.config.pad_token_id).long()
+        if encoder_outputs is None:
+            encoder_outputs = self.model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask, return_dict=True)
+        # Unset settings default to the model's generation_config, as in generate()
+        defaults = self.generation_config
+        if max_length is None:
+            max_length = defaults.max_length
+        if no_repeat_ngram_size is None:
+            no_repeat_ngram_size = defaults.no_repeat_ngram_size
+        if repetition_penalty is None:
+            repetition_penalty = defaults.repetition_penalty
+        if eos_token_id is None:
+            eos_token_id = defaults.eos_token_id if defaults.eos_token_id is not None else self.config.eos_token_id
+        eos_ids = set(eos_token_id) if isinstance(eos_token_id, (list, tuple)) else {eos_token_id}
+        limit = max_new_tokens + 1 if max_new_tokens is not None else max_length
+        processors = LogitsProcessorList()
+        if repetition_penalty and repetition_penalty != 1.0:
+            processors.append(RepetitionPenaltyLogitsProcessor(repetition_penalty))
+        if no_repeat_ngram_size:
+            processors.append(NoRepeatNGramLogitsProcessor(no_repeat_ngram_size))
+
+        hidden = encoder_outputs.last_hidden_state if hasattr(encoder_outputs, "last_hidden_state") else encoder_outputs[0]
+        rows = []
+        for row in range(hidden.shape[0]):
+            mask = attention_mask[row:row + 1]
+            if input_ids is not None:
+                sources = self._draft_sources(input_ids[row][mask[0].bool()].tolist())
+            else:
+                sources = []
+            rows.append(self._generate_one(
+                hidden[row:row + 1], mask, sources, limit, processors, eos_ids,
+                streamer if hidden.shape[0] == 1 else None, stopping_criteria,
+            ))
+        width = max(len(r) for r in rows)
+        pad_id = self.config.pad_token_id
+        return torch.tensor([r + [pad_id] * (width - len(r)) for r in rows], device=hidden.device)
+
+    def _generate_one(self, hidden, mask, sources, limit, processors, eos_ids, streamer, stopping_criteria) -> List[int]:
+        generated = [self.config.decoder_start_token_id]
+        pending = list(generated)
+        past = None
+        if streamer is not None:
+            streamer.put(torch.tensor(generated))
+        while len(generated) < limit:
+            draft = find_draft(generated, sources, self.ngram_size, self.num_draft_tokens)
+            # Leave room for the model's own token after the draft
+            draft = draft[:max(0, limit - len(generated) - 1)]
+            out = self.model(
+                encoder_outputs=(hidden,),
+                attention_mask=mask,
+                decoder_input_ids=torch.tensor([pending + draft], device=hidden.device),
+                past_key_values=past,
+                use_cache=True,
+                return_dict=True,
+            )
+            past = out.past_key_values
+            self.decoder_passes += 1
+            self.drafted += len(draft)
+            logits = out.logits[0, len(pending) - 1:]
+            new_tokens = []
+            for j in range(len(draft) + 1):
+                scores = processors(torch.tensor([generated + new_tokens], device=hidden.device), logits[j:j + 1].float())
+                token = int(scores.argmax(-1))
+                new_tokens.append(token)
+                if token in eos_ids or len(generated) + len(new_tokens) >= limit:
+                    break
+                if j == len(draft) or token != draft[j]:
+                    break
+                self.accepted += 1
+            generated += new_tokens
+            self.generated += len(new_tokens)
+            if streamer is not None:
+                streamer.put(torch.tensor(new_tokens))
+            # The cache keeps every token but the last, which is fed on the next pass
+            past = crop_cache(past, len(generated) - 1)
+            pending = generated[-1:]
+            if generated[-1] in eos_ids:
+                break
+            if stopping_criteria is not None and torch.as_tensor(stopping_criteria(torch.tensor([generated]), None)).all():
+                break
+        if streamer is not None:
+            streamer.end()
+        return generated
+
+
+def speculative_options(config: dict) -> dict:
+    """Constructor arguments for ``SpeculativeSeq2SeqEngine`` from ``inference.speculative`` in config.yaml."""
+    spec_cfg = (config.get("inference") or {}).get("speculative") or {}
+    return {
+        "ngram_size": spec_cfg.get("ngram_size", 3),
+        "num_draft_tokens": spec_cfg.get("num_draft_tokens", 8),
+        "normalize": spec_cfg.get("normalize", True),
+    }
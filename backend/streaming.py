@@ -0,0 +1,96 @@
+import queue
+import threading
+from typing import Callable, Iterator
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+
+STREAM_MODES = ("greedy", "sampling")
+
+
+class CallbackTextStreamer(TextStreamer):
+    """TextStreamer that hands every finalized chunk of text to ``on_text``.
+
+    ``on_text(text, stream_end)`` is called from the thread running ``generate``.
+    """
+
+    def __init__(self, tokenizer, on_text: Callable[[str, bool], None], **decode_kwargs):
+        super().__init__(tokenizer, skip_prompt=False, **decode_kwargs)
+        self.on_text = on_text
+
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        self.on_text(text, stream_end)
+
+
+class CancelCriteria(StoppingCriteria):
+    """Stops generation once ``event`` is set, e.g. when the consumer goes away."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.event.is_set()
+
+
+def streaming_generation_kwargs(gen_cfg: dict, mode: str, max_length: int) -> dict:
+    """Generate arguments for a streamable (single-beam) decode in ``mode``."""
+    if mode not in STREAM_MODES:
+        raise ValueError(f"Streaming supports {STREAM_MODES}, got '{mode}'")
+    kwargs = {
+        "max_length": max_length,
+        "num_beams": 1,
+        "no_repeat_ngram_size": gen_cfg.get("no_repeat_ngram_size", 3),
+        "repetition_penalty": gen_cfg.get("repetition_penalty", 1.1),
+        "do_sample": mode == "sampling",
+    }
+    if mode == "sampling":
+        kwargs["temperature"] = gen_cfg.get("temperature", 0.9)
+        kwargs["top_p"] = gen_cfg.get("top_p", 0.95)
+    return kwargs
+
+
+def attach_streamer(gen_kwargs: dict, tokenizer, on_text: Callable[[str, bool], None], cancel: threading.Event) -> dict:
+    """Return a copy of ``gen_kwargs`` wired to stream text to ``on_text`` and stop on ``cancel``."""
+    kwargs = dict(gen_kwargs)
+    kwargs["streamer"] = CallbackTextStreamer(tokenizer, on_text, skip_special_tokens=True)
+    kwargs["stopping_criteria"] = StoppingCriteriaList([CancelCriteria(cancel)])
+    return kwargs
+
+
+def iter_generate(model, tokenizer, inputs, gen_kwargs: dict) -> Iterator[str]:
+    """Run ``generate`` on a background thread and yield text chunks as tokens arrive.
+
+    ``inputs`` is a tokenized batch of size one. Closing the iterator early
+    stops the decode at the next token.
+    """
+    chunks: "queue.Queue" = queue.Queue()
+    cancel = threading.Event()
+    done = object()
+    errors = []
+
+    def on_text(text, _stream_end):
+        if text:
+            chunks.put(text)
+
+    def run():
+        try:
+            with torch.no_grad():
+                model.generate(**inputs.to(model.device), **attach_streamer(gen_kwargs, tokenizer, on_text, cancel))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            chunks.put(done)
+
+    worker = threading.Thread(target=run, name="stream-generate", daemon=True)
+    worker.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        cancel.set()
+        worker.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,63 @@
+import json
+import os
+from typing import Optional
+
+import torch
+
+DEFAULT_PROFILE_PATH = os.path.join("outputs", "perf", "thread_profile.json")
+
+
+def load_thread_profile(path: str) -> Optional[dict]:
+    """Read a profile written by scripts/tune_threads.py (None if missing or unreadable)."""
+    if not path or not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("best")
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Ignoring unreadable thread profile {path}: {e}")
+        return None
+
+
+def resolve_thread_settings(config: dict, root: str = "") -> dict:
+    """Thread counts for this process: env vars, then ``threads:`` in config.yaml, then the tuned profile.
+
+    Without any of those, the cores are split evenly across the uvicorn
+    workers (``WEB_CONCURRENCY``) so several workers do not oversubscribe
+    the machine.
+    """
+    threads_cfg = config.get("threads") or {}
+    path = threads_cfg.get("profile", DEFAULT_PROFILE_PATH)
+    if path and root and not os.path.isabs(path):
+        path = os.path.join(root, path)
+    profile = load_thread_profile(path) or {}
+    workers = int(os.environ.get("WEB_CONCURRENCY") or profile.get("workers") or 1)
+    cores = os.cpu_count() or 1
+    intra = (
+        os.environ.get("TORCH_NUM_THREADS")
+        or threads_cfg.get("intra_op_threads")
+        or profile.get("intra_op_threads")
+        or max(1, cores // max(1, workers))
+    )
+    inter = os.environ.get("TORCH_NUM_INTEROP_THREADS") or threads_cfg.get("inter_op_threads") or profile.get("inter_op_threads")
+    return {
+        "workers": workers,
+        "intra_op_threads": int(intra),
+        "inter_op_threads": int(inter) if inter else None,
+        "max_batch_size": profile.get("batch_size"),
+        "profile": path if profile else None,
+    }
+
+
+def apply_thread_settings(settings: dict) -> dict:
+    """Apply ``resolve_thread_settings`` output to torch; call before the first inference."""
+    torch.set_num_threads(settings["intra_op_threads"])
+    if settings["inter_op_threads"]:
+        try:
+            torch.set_num_interop_threads(settings["inter_op_threads"])
+        except RuntimeError as e:
+            # Only allowed before any inter-op parallel work has started
+            print(f"Could not set inter-op threads: {e}")
+    source = f"profile {settings['profile']}" if settings["profile"] else "defaults"
+    print(f"Torch threads: intra-op {torch.get_num_threads()}, inter-op {torch.get_num_interop_threads()} ({source})")
+    return settings
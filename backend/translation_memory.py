@@ -0,0 +1,91 @@
+import csv
+import os
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from backend.cache import canonicalize_text
+except ImportError:  # imported as a top-level module from inside backend/
+    from cache import canonicalize_text
+
+SOURCE_COLUMN = "Slang/Meme Text"
+TARGET_COLUMN = "Standard Translation"
+
+# direction -> (Language value, reversed pair)
+DIRECTION_PAIRS = {
+    "forward": ("English", False),
+    "reverse": ("English", True),
+    "hinglish_forward": ("Hinglish", False),
+    "hinglish_reverse": ("Hinglish", True),
+}
+
+
+def tm_key(text: str) -> str:
+    """Canonicalized, case-folded source text: the translation memory's lookup key."""
+    return canonicalize_text(text).casefold()
+
+
+class TranslationMemory:
+    """Exact-match lookup of curated translations from the parallel corpus.
+
+    Built once from the processed CSVs; when a source text maps to several
+    references the most frequent one wins (ties go to the first seen).
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, str]]] = None, sources: Iterable[str] = ()):
+        self.entries: Dict[str, Dict[str, str]] = entries or {}
+        self.sources = list(sources)
+        self.hits = 0
+        self.lookups = 0
+
+    @classmethod
+    def from_csv(cls, paths: Iterable[str]) -> "TranslationMemory":
+        votes = {d: defaultdict(Counter) for d in DIRECTION_PAIRS}
+        loaded = []
+        for path in paths:
+            if not os.path.isfile(path):
+                print(f"Translation memory source {path} not found, skipping")
+                continue
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    src = (row.get(SOURCE_COLUMN) or "").strip()
+                    tgt = (row.get(TARGET_COLUMN) or "").strip()
+                    if not src or not tgt:
+                        continue
+                    for direction, (language, reverse) in DIRECTION_PAIRS.items():
+                        if row.get("Language", language) != language:
+                            continue
+                        key, value = (tm_key(tgt), src) if reverse else (tm_key(src), tgt)
+                        votes[direction][key][value] += 1
+            loaded.append(path)
+        # Counter.most_common keeps insertion order among equal counts
+        entries = {
+            direction: {key: counts.most_common(1)[0][0] for key, counts in by_key.items()}
+            for direction, by_key in votes.items()
+        }
+        return cls(entries, loaded)
+
+    def lookup(self, text: str, direction: str) -> Optional[str]:
+        self.lookups += 1
+        hit = self.entries.get(direction, {}).get(tm_key(text))
+        if hit is not None:
+            self.hits += 1
+        return hit
+
+    def __len__(self):
+        return sum(len(e) for e in self.entries.values())
+
+    def stats(self) -> dict:
+        return {
+            "entries": {d: len(e) for d, e in self.entries.items()},
+            "sources": self.sources,
+            "lookups": self.lookups,
+            "hits": self.hits,
+        }
+
+
+def build_translation_memory(paths: List[str], root: str = "") -> TranslationMemory:
+    resolved = [p if os.path.isabs(p) or not root else os.path.join(root, p) for p in paths]
+    memory = TranslationMemory.from_csv(resolved)
+    print(f"Translation memory: {len(memory)} entries from {len(memory.sources)} file(s)")
+    return memory
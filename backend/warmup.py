@@ -0,0 +1,49 @@
+import csv
+import os
+from typing import Dict, List
+
+# direction -> (source column, Language value) in dataset/processed/*.csv
+DIRECTION_COLUMNS = {
+    "forward": ("Slang/Meme Text", "English"),
+    "reverse": ("Standard Translation", "English"),
+    "hinglish_forward": ("Slang/Meme Text", "Hinglish"),
+    "hinglish_reverse": ("Standard Translation", "Hinglish"),
+}
+
+# Used when the dataset is missing, so warmup still exercises short and long inputs
+FALLBACK_SAMPLES = [
+    "ok",
+    "no cap that was fire",
+    "bro really said that with his whole chest 💀",
+    "lowkey this meeting could have been an email and everyone in the chat knows it fr fr no cap 😭",
+]
+
+
+def spread_by_length(texts: List[str], count: int) -> List[str]:
+    """Pick ``count`` texts at evenly spaced length quantiles, shortest and longest included."""
+    unique = sorted(set(texts), key=len)
+    if len(unique) <= count:
+        return unique
+    if count == 1:
+        return [unique[len(unique) // 2]]
+    step = (len(unique) - 1) / (count - 1)
+    return [unique[round(i * step)] for i in range(count)]
+
+
+def load_warmup_samples(path: str, directions: List[str], count: int = 8) -> Dict[str, List[str]]:
+    """Representative inputs per direction from a processed split (e.g. dataset/processed/test.csv)."""
+    by_direction = {d: [] for d in directions}
+    if os.path.isfile(path):
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    for direction in directions:
+                        column, language = DIRECTION_COLUMNS.get(direction, ("Slang/Meme Text", None))
+                        text = (row.get(column) or "").strip()
+                        if text and (language is None or row.get("Language", language) == language):
+                            by_direction[direction].append(text)
+        except (OSError, csv.Error) as e:
+            print(f"Could not read warmup samples from {path}: {e}")
+    else:
+        print(f"Warmup data {path} not found, using built-in samples")
+    return {d: spread_by_length(texts or FALLBACK_SAMPLES, count) for d, texts in by_direction.items()}
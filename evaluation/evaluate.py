@@ -2,6 +2,7 @@ import os
 import sys
 import json
 import argparse
+import time
 import pandas as pd
 import torch
 import evaluate
@@ -11,24 +12,69 @@ from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 # Add the parent directory to sys.path so we can import from backend
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from backend.config_loader import load_config
+from backend.model_registry import checkpoint_fingerprint
+from backend.quantization import QUANTIZATION_MODES, load_cached, quantize_model, save_cached
+from backend.onnx_engine import ENGINES, OnnxSeq2SeqEngine, has_onnx_export, onnx_dir_for
+from backend.speculative import SpeculativeSeq2SeqEngine, speculative_options
+from backend.length_limits import fit_length_limit
 
 # Constants
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DEFAULT_CONFIG_PATH = os.path.join(ROOT, "config.yaml")
 DEFAULT_DATA_PATH = os.path.join(ROOT, "outputs", "datasets", "test.csv")
+DEFAULT_TRAIN_PATH = os.path.join(ROOT, "outputs", "datasets", "train.csv")
 DEFAULT_MODEL_PATH = os.path.join(ROOT, "outputs", "translation_model")
 DEFAULT_OUT_PATH = os.path.join(ROOT, "results", "metrics.json")
 
-def load_model_and_tokenizer(model_path: str):
-    """Load the fine-tuned model and tokenizer."""
-    print(f"Loading model from {model_path}...")
+def load_model_and_tokenizer(model_path: str, quantize: str = "none", engine: str = "torch", engine_options: dict = None):
+    """Load the fine-tuned model and tokenizer, optionally dynamically quantized, on ONNX Runtime or with speculative decoding."""
+    variant = engine if engine != "torch" else quantize
+    print(f"Loading model from {model_path}{f' ({variant})' if variant != 'none' else ''}...")
     tokenizer = AutoTokenizer.from_pretrained(model_path)
-    model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model.to(device)
+    if engine == "onnx":
+        if not has_onnx_export(model_path):
+            raise FileNotFoundError(f"No ONNX export in {onnx_dir_for(model_path)}; run scripts/export_onnx.py --model_dir {model_path}")
+        return OnnxSeq2SeqEngine(onnx_dir_for(model_path)), tokenizer, "cpu"
+    if quantize != "none":
+        # Same cached artifact the backend and Streamlit app use
+        fingerprint = checkpoint_fingerprint(model_path)
+        model = load_cached(model_path, quantize, fingerprint)
+        if model is None:
+            model = quantize_model(AutoModelForSeq2SeqLM.from_pretrained(model_path), quantize)
+            save_cached(model, model_path, quantize, fingerprint)
+        device = "cpu"
+    else:
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        model.to(device)
+    if engine == "speculative":
+        model = SpeculativeSeq2SeqEngine(model.eval(), tokenizer, **(engine_options or {}))
     return model, tokenizer, device
 
-def generate_translations(model, tokenizer, device, inputs, config):
+def load_length_limit(tokenizer, train_path, config):
+    """Fit the input-length-aware generation cap on the train split, like the backend does (None if unavailable)."""
+    limits_cfg = config["generation"].get("length_limits") or {}
+    if not limits_cfg.get("enabled", True) or not train_path or not os.path.isfile(train_path):
+        print("Generating up to max_target_length (no length limit fitted)")
+        return None
+    train = pd.read_csv(train_path)
+    limit = fit_length_limit(
+        tokenizer,
+        train["input_text"].astype(str).tolist(),
+        train["target_text"].astype(str).tolist(),
+        quantile=limits_cfg.get("quantile", 0.99),
+        margin=limits_cfg.get("margin", 2),
+        floor=limits_cfg.get("min_length", 8),
+        cap=config["model"]["max_target_length"],
+        max_source_length=config["model"]["max_source_length"],
+    )
+    if limit is None:
+        print(f"No training pairs in {train_path}, generating up to max_target_length")
+        return None
+    print(f"Length limit: {limit.ratio} x source tokens + {limit.margin} (covers {100 * limit.coverage:.1f}% of {train_path})")
+    return limit
+
+def generate_translations(model, tokenizer, device, inputs, config, length_limit=None):
     """Generate translations for a list of input texts."""
     gen_cfg = config["generation"]
     model_cfg = config["model"]
@@ -36,11 +82,11 @@ def generate_translations(model, tokenizer, device, inputs, config):
     translations = []
     print("Generating translations...")
     for text in tqdm(inputs):
-        input_ids = tokenizer(text, return_tensors="pt", truncation=True).input_ids.to(device)
+        input_ids = tokenizer(text, return_tensors="pt", truncation=True, max_length=model_cfg["max_source_length"]).input_ids.to(device)
         with torch.no_grad():
             output_ids = model.generate(
                 input_ids,
-                max_length=model_cfg["max_target_length"],
+                max_length=length_limit.max_length(input_ids.shape[1]) if length_limit else model_cfg["max_target_length"],
                 num_beams=gen_cfg["num_beams"],
                 no_repeat_ngram_size=gen_cfg["no_repeat_ngram_size"],
                 length_penalty=gen_cfg["length_penalty"],
@@ -78,30 +124,54 @@ def calculate_metrics(predictions, references):
     
     return results
 
+def evaluate_model(model_path, quantize, inputs, references, config, engine="torch", train_path=DEFAULT_TRAIN_PATH):
+    """Generate with one model variant and score it; also records per-item latency."""
+    model, tokenizer, device = load_model_and_tokenizer(model_path, quantize, engine, speculative_options(config))
+    length_limit = load_length_limit(tokenizer, train_path, config)
+    start = time.perf_counter()
+    predictions = generate_translations(model, tokenizer, device, inputs, config, length_limit)
+    elapsed = time.perf_counter() - start
+    metrics = calculate_metrics(predictions, references)
+    metrics["latency_ms_per_item"] = 1000.0 * elapsed / max(1, len(inputs))
+    if isinstance(model, SpeculativeSeq2SeqEngine):
+        spec = model.stats()
+        metrics["draft_acceptance_rate"] = spec["acceptance_rate"] or 0.0
+        metrics["tokens_per_decoder_pass"] = spec["tokens_per_pass"] or 0.0
+    return metrics
+
 def main():
     parser = argparse.ArgumentParser(description="Evaluation Script for Slang Translator")
     parser.add_argument("--config", type=str, default=DEFAULT_CONFIG_PATH, help="Path to config.yaml")
     parser.add_argument("--model", type=str, default=DEFAULT_MODEL_PATH, help="Path to the trained model")
     parser.add_argument("--data", type=str, default=DEFAULT_DATA_PATH, help="Path to the test CSV file")
+    parser.add_argument("--train_data", type=str, default=DEFAULT_TRAIN_PATH, help="Train split the input-length-aware generation limit is fitted on")
     parser.add_argument("--output", type=str, default=DEFAULT_OUT_PATH, help="Path to save metrics.json")
+    parser.add_argument("--quantize", type=str, default="none", choices=QUANTIZATION_MODES, help="Evaluate a dynamically quantized copy of the model")
+    parser.add_argument("--engine", type=str, default="torch", choices=[e for e in ENGINES if e != "fake"], help="Generate with PyTorch, the ONNX Runtime export of the model, or PyTorch with prompt-lookup speculative decoding")
+    parser.add_argument("--num_beams", type=int, default=None, help="Override generation.num_beams (speculative decoding only speeds up --num_beams 1)")
+    parser.add_argument("--compare_baseline", action="store_true", help="With --quantize or --engine onnx/speculative, also evaluate the fp32 PyTorch model and record the metric deltas")
     args = parser.parse_args()
 
     # 1. Load config
     config = load_config(args.config)
+    if args.num_beams is not None:
+        config["generation"]["num_beams"] = args.num_beams
     
-    # 2. Load model
-    model, tokenizer, device = load_model_and_tokenizer(args.model)
-    
-    # 3. Load test data
+    # 2. Load test data
     df = pd.read_csv(args.data)
     inputs = df["input_text"].astype(str).tolist()
     references = df["target_text"].astype(str).tolist()
     
-    # 4. Generate
-    predictions = generate_translations(model, tokenizer, device, inputs, config)
-    
-    # 5. Calculate metrics
-    metrics = calculate_metrics(predictions, references)
+    # 3-5. Load model, generate and calculate metrics
+    metrics = evaluate_model(args.model, args.quantize, inputs, references, config, args.engine, args.train_data)
+    variant = args.engine if args.engine != "torch" else args.quantize
+    if variant != "none" and args.compare_baseline:
+        baseline = evaluate_model(args.model, "none", inputs, references, config, train_path=args.train_data)
+        metrics = {
+            "fp32": baseline,
+            variant: metrics,
+            "delta": {k: metrics[k] - baseline[k] for k in baseline},
+        }
     
     # 6. Save results
     os.makedirs(os.path.dirname(args.output), exist_ok=True)
@@ -110,7 +180,12 @@ def main():
     
     print(f"\nEvaluation Results saved to {args.output}:")
     for k, v in metrics.items():
-        print(f"  {k}: {v:.4f}")
+        if isinstance(v, dict):
+            print(f"  {k}:")
+            for name, value in v.items():
+                print(f"    {name}: {value:.4f}")
+        else:
+            print(f"  {k}: {v:.4f}")
 
 if __name__ == "__main__":
     main()
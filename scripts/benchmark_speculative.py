@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import argparse
+import pandas as pd
+import torch
+from tqdm import tqdm
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+from backend.config_loader import load_config
+from backend.model_registry import DEFAULT_DIRECTIONS
+from backend.speculative import SpeculativeSeq2SeqEngine, speculative_options
+from backend.warmup import DIRECTION_COLUMNS
+
+DEFAULT_DATA = os.path.join(PROJECT_ROOT, "dataset", "processed", "test.csv")
+DEFAULT_OUTPUT = os.path.join(PROJECT_ROOT, "outputs", "perf", "speculative_benchmark.json")
+
+def parse_ints(value: str):
+    return sorted({int(v) for v in value.split(",") if v.strip()})
+
+def greedy_kwargs(config: dict) -> dict:
+    """The backend's greedy decoding settings, the only mode speculative decoding speeds up."""
+    gen_cfg = config["generation"]
+    return {
+        "max_length": config["model"]["max_target_length"],
+        "num_beams": 1,
+        "no_repeat_ngram_size": gen_cfg["no_repeat_ngram_size"],
+        "repetition_penalty": gen_cfg["repetition_penalty"],
+    }
+
+def read_texts(path: str, direction: str, samples: int):
+    column, language = DIRECTION_COLUMNS[direction]
+    df = pd.read_csv(path)
+    if language and "Language" in df.columns:
+        df = df[df["Language"] == language]
+    texts = df[column].dropna().astype(str)
+    return texts.sample(n=min(samples, len(texts)), random_state=42).tolist() if samples else texts.tolist()
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * (len(values) - 1) + 0.5))]
+
+def run(model, tokenizer, texts, gen_kwargs, desc):
+    """Decode one text at a time (the latency-bound case); returns outputs and per-text seconds."""
+    outputs, latencies = [], []
+    with torch.no_grad():
+        for text in tqdm(texts, desc=desc):
+            inputs = tokenizer(text, return_tensors="pt", truncation=True)
+            started = time.perf_counter()
+            output_ids = model.generate(**inputs, **gen_kwargs)
+            latencies.append(time.perf_counter() - started)
+            outputs.append(tokenizer.decode(output_ids[0], skip_special_tokens=True).strip())
+    return outputs, latencies
+
+def check_delegation(model, engine, tokenizer, texts, config):
+    """Share of texts where beam search and seeded sampling through the engine match ``model.generate``.
+
+    The engine hands both straight to the wrapped model, so anything but 1.0 is a bug.
+    """
+    gen_cfg = config["generation"]
+    modes = {
+        "beam": {**greedy_kwargs(config), "num_beams": gen_cfg["num_beams"], "length_penalty": gen_cfg["length_penalty"], "early_stopping": True},
+        "sampling": {**greedy_kwargs(config), "do_sample": True, "temperature": gen_cfg["temperature"], "top_p": gen_cfg["top_p"]},
+    }
+    results = {}
+    with torch.no_grad():
+        for mode, gen_kwargs in modes.items():
+            same = 0
+            for i, text in enumerate(texts):
+                inputs = tokenizer(text, return_tensors="pt", truncation=True)
+                torch.manual_seed(i)
+                expected = model.generate(**inputs, **gen_kwargs)
+                torch.manual_seed(i)
+                actual = engine.generate(**inputs, **gen_kwargs)
+                same += expected.shape == actual.shape and bool((expected == actual).all())
+            results[mode] = round(same / len(texts), 4)
+    return results
+
+def summarize(latencies):
+    return {
+        "mean_ms": round(1000.0 * sum(latencies) / len(latencies), 2),
+        "p95_ms": round(1000.0 * percentile(latencies, 0.95), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure prompt-lookup speculative decoding against plain greedy decoding on the test split")
+    parser.add_argument("--config", type=str, default=os.path.join(PROJECT_ROOT, "config.yaml"))
+    parser.add_argument("--direction", type=str, default="forward", choices=list(DIRECTION_COLUMNS))
+    parser.add_argument("--model_dir", type=str, default=None, help="Defaults to the direction's checkpoint under outputs/checkpoints")
+    parser.add_argument("--data", type=str, default=DEFAULT_DATA)
+    parser.add_argument("--samples", type=int, default=200, help="Texts sampled from --data (0 = all)")
+    parser.add_argument("--num_draft_tokens", type=str, default=None, help="Comma-separated values to sweep; defaults to inference.speculative")
+    parser.add_argument("--ngram_size", type=str, default=None, help="Comma-separated values to sweep; defaults to inference.speculative")
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    options = speculative_options(config)
+    model_dir = args.model_dir or os.path.join(PROJECT_ROOT, DEFAULT_DIRECTIONS[args.direction][1])
+    texts = read_texts(args.data, args.direction, args.samples)
+    gen_kwargs = greedy_kwargs(config)
+    print(f"Benchmarking {model_dir} ({args.direction}) on {len(texts)} texts from {args.data}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_dir).eval()
+    reference, base_latencies = run(model, tokenizer, texts, gen_kwargs, "greedy")
+    baseline = summarize(base_latencies)
+
+    rows = []
+    draft_sizes = parse_ints(args.num_draft_tokens) if args.num_draft_tokens else [options["num_draft_tokens"]]
+    ngram_sizes = parse_ints(args.ngram_size) if args.ngram_size else [options["ngram_size"]]
+    for ngram_size in ngram_sizes:
+        for num_draft_tokens in draft_sizes:
+            engine = SpeculativeSeq2SeqEngine(
+                model, tokenizer, ngram_size=ngram_size, num_draft_tokens=num_draft_tokens, normalize=options["normalize"]
+            )
+            outputs, latencies = run(engine, tokenizer, texts, gen_kwargs, f"speculative n={ngram_size} k={num_draft_tokens}")
+            row = {
+                "ngram_size": ngram_size,
+                "num_draft_tokens": num_draft_tokens,
+                **engine.stats(),
+                **summarize(latencies),
+                "speedup": round(sum(base_latencies) / sum(latencies), 3),
+                # Verification is exact, so anything but 1.0 is a bug
+                "identical_outputs": round(sum(a == b for a, b in zip(reference, outputs)) / len(texts), 4),
+            }
+            rows.append(row)
+            print(f"  n={ngram_size} k={num_draft_tokens}: accepted {row['accepted_tokens']}/{row['drafted_tokens']} drafted tokens "
+                  f"({row['acceptance_rate']}), {row['tokens_per_pass']} tokens/pass, {row['mean_ms']} ms vs {baseline['mean_ms']} ms "
+                  f"(x{row['speedup']})")
+
+    delegation = check_delegation(model, engine, tokenizer, texts[:20], config)
+    print(f"Beam search / sampling through the engine identical to the model: {delegation}")
+
+    report = {
+        "model_dir": os.path.abspath(model_dir),
+        "direction": args.direction,
+        "data": args.data,
+        "samples": len(texts),
+        "generation": gen_kwargs,
+        "greedy": baseline,
+        "speculative": rows,
+        "delegation_identical": delegation,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 import os
+import json
 import argparse
-from typing import List, Dict
+from typing import List, Dict, Optional
 import torch
+from tqdm import tqdm
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from transformers.modeling_outputs import BaseModelOutput
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
@@ -11,23 +14,31 @@ def load(model_dir: str):
     mdl = AutoModelForSeq2SeqLM.from_pretrained(model_dir)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     mdl.to(device)
+    mdl.eval()
     return mdl, tok, device
 
-def greedy_decode(texts: List[str], model, tokenizer, device, max_length: int):
-    outs = []
-    for t in texts:
-        ids = tokenizer(t, return_tensors="pt", truncation=True).to(device)
-        gen = model.generate(**ids, max_length=max_length)
-        outs.append(tokenizer.decode(gen[0], skip_special_tokens=True))
-    return outs
+def encode(texts: List[str], model, tokenizer, device):
+    """Tokenize a batch and run the encoder once; the result is shared by every decoding strategy."""
+    ids = tokenizer(texts, return_tensors="pt", padding=True, truncation=True).to(device)
+    with torch.no_grad():
+        hidden = model.get_encoder()(input_ids=ids.input_ids, attention_mask=ids.attention_mask, return_dict=True).last_hidden_state
+    return {"attention_mask": ids.attention_mask, "encoder_hidden_states": hidden}
 
-def beam_decode(texts: List[str], model, tokenizer, device, max_length: int, num_beams: int, no_repeat_ngram_size: int, length_penalty: float, n_best: int):
-    outs = []
-    scores = []
-    for t in texts:
-        ids = tokenizer(t, return_tensors="pt", truncation=True).to(device)
+def _encoder_kwargs(encoded: Dict[str, torch.Tensor]):
+    # generate() expands encoder_outputs in place for beams/return sequences, so hand it a fresh wrapper each call
+    return {"attention_mask": encoded["attention_mask"], "encoder_outputs": BaseModelOutput(last_hidden_state=encoded["encoder_hidden_states"])}
+
+def greedy_decode(texts: List[str], model, tokenizer, device, max_length: int, encoded: Optional[Dict] = None):
+    encoded = encoded or encode(texts, model, tokenizer, device)
+    with torch.no_grad():
+        gen = model.generate(**_encoder_kwargs(encoded), max_length=max_length)
+    return tokenizer.batch_decode(gen, skip_special_tokens=True)
+
+def beam_decode(texts: List[str], model, tokenizer, device, max_length: int, num_beams: int, no_repeat_ngram_size: int, length_penalty: float, n_best: int, encoded: Optional[Dict] = None):
+    encoded = encoded or encode(texts, model, tokenizer, device)
+    with torch.no_grad():
         gen = model.generate(
-            **ids,
+            **_encoder_kwargs(encoded),
             max_length=max_length,
             num_beams=num_beams,
             no_repeat_ngram_size=no_repeat_ngram_size,
@@ -36,17 +47,18 @@ def beam_decode(texts: List[str], model, tokenizer, device, max_length: int, num
             return_dict_in_generate=True,
             output_scores=True,
         )
-        seqs = [tokenizer.decode(s, skip_special_tokens=True) for s in gen.sequences]
-        outs.append(seqs)
-        scores.append(gen.sequences_scores.tolist() if gen.sequences_scores is not None else [])
+    seqs = tokenizer.batch_decode(gen.sequences, skip_special_tokens=True)
+    flat_scores = gen.sequences_scores.tolist() if gen.sequences_scores is not None else []
+    # Return sequences come back grouped per input, n_best at a time
+    outs = [seqs[i * n_best:(i + 1) * n_best] for i in range(len(texts))]
+    scores = [flat_scores[i * n_best:(i + 1) * n_best] for i in range(len(texts))]
     return outs, scores
 
-def sampling_decode(texts: List[str], model, tokenizer, device, max_length: int, top_k: int, top_p: float, temperature: float, n_best: int):
-    outs = []
-    for t in texts:
-        ids = tokenizer(t, return_tensors="pt", truncation=True).to(device)
+def sampling_decode(texts: List[str], model, tokenizer, device, max_length: int, top_k: int, top_p: float, temperature: float, n_best: int, encoded: Optional[Dict] = None):
+    encoded = encoded or encode(texts, model, tokenizer, device)
+    with torch.no_grad():
         gen = model.generate(
-            **ids,
+            **_encoder_kwargs(encoded),
             max_length=max_length,
             do_sample=True,
             top_k=top_k,
@@ -54,21 +66,52 @@ def sampling_decode(texts: List[str], model, tokenizer, device, max_length: int,
             temperature=temperature,
             num_return_sequences=n_best,
         )
-        seqs = [tokenizer.decode(s, skip_special_tokens=True) for s in gen]
-        outs.append(seqs)
-    return outs
+    seqs = tokenizer.batch_decode(gen, skip_special_tokens=True)
+    return [seqs[i * n_best:(i + 1) * n_best] for i in range(len(texts))]
+
+def compare_batch(texts: List[str], model, tokenizer, device, max_length: int = 128, num_beams: int = 6, no_repeat_ngram_size: int = 3, length_penalty: float = 1.0, n_best: int = 3, top_k: int = 50, top_p: float = 0.95, temperature: float = 1.0) -> List[Dict[str, object]]:
+    """Run greedy, beam and sampling decoding over one batch, encoding it only once."""
+    encoded = encode(texts, model, tokenizer, device)
+    greedy = greedy_decode(texts, model, tokenizer, device, max_length, encoded=encoded)
+    beams, scores = beam_decode(texts, model, tokenizer, device, max_length, num_beams, no_repeat_ngram_size, length_penalty, n_best, encoded=encoded)
+    samples = sampling_decode(texts, model, tokenizer, device, max_length, top_k, top_p, temperature, n_best, encoded=encoded)
+    return [
+        {"input": t, "greedy": g, "beam": {"outputs": b, "scores": s}, "sampling": smp}
+        for t, g, b, s, smp in zip(texts, greedy, beams, scores, samples)
+    ]
+
+def compare_many(texts: List[str], model, tokenizer, device, batch_size: int = 16, **decode_kwargs) -> List[Dict[str, object]]:
+    """compare_batch over a whole list, in length-sorted batches to keep padding low; results keep input order."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    results: List[Optional[Dict[str, object]]] = [None] * len(texts)
+    for start in tqdm(range(0, len(order), batch_size), desc="Decoding", disable=len(order) <= batch_size):
+        idx = order[start:start + batch_size]
+        for i, res in zip(idx, compare_batch([texts[i] for i in idx], model, tokenizer, device, **decode_kwargs)):
+            results[i] = res
+    return results
 
 def compare_strategies(text: str, model_dir: str, max_length: int = 128, num_beams: int = 6, no_repeat_ngram_size: int = 3, length_penalty: float = 1.0, n_best: int = 3, top_k: int = 50, top_p: float = 0.95, temperature: float = 1.0) -> Dict[str, object]:
     mdl, tok, dev = load(model_dir)
-    greedy = greedy_decode([text], mdl, tok, dev, max_length)[0]
-    beams, scores = beam_decode([text], mdl, tok, dev, max_length, num_beams, no_repeat_ngram_size, length_penalty, n_best)
-    samples = sampling_decode([text], mdl, tok, dev, max_length, top_k, top_p, temperature, n_best)
-    return {"greedy": greedy, "beam": {"outputs": beams[0], "scores": scores[0]}, "sampling": samples[0]}
+    res = compare_batch([text], mdl, tok, dev, max_length, num_beams, no_repeat_ngram_size, length_penalty, n_best, top_k, top_p, temperature)[0]
+    return {"greedy": res["greedy"], "beam": res["beam"], "sampling": res["sampling"]}
+
+def read_inputs(path: str, column: str) -> List[str]:
+    """Inputs from a CSV column (e.g. dataset/processed/test.csv) or a text file with one input per line."""
+    if path.lower().endswith(".csv"):
+        import pandas as pd
+        return pd.read_csv(path)[column].dropna().astype(str).tolist()
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--model_dir", type=str, required=True)
-    parser.add_argument("--text", type=str, required=True)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--text", type=str)
+    source.add_argument("--input_file", type=str, help="CSV (see --column) or text file with one input per line")
+    parser.add_argument("--column", type=str, default="Slang/Meme Text", help="Input column when --input_file is a CSV")
+    parser.add_argument("--output", type=str, default=None, help="With --input_file, write one JSON result per line here instead of printing")
+    parser.add_argument("--batch_size", type=int, default=16)
     parser.add_argument("--max_length", type=int, default=128)
     parser.add_argument("--num_beams", type=int, default=6)
     parser.add_argument("--no_repeat_ngram_size", type=int, default=3)
@@ -78,8 +121,26 @@ def main():
     parser.add_argument("--top_p", type=float, default=0.95)
     parser.add_argument("--temperature", type=float, default=1.0)
     args = parser.parse_args()
-    res = compare_strategies(args.text, args.model_dir, args.max_length, args.num_beams, args.no_repeat_ngram_size, args.length_penalty, args.n_best, args.top_k, args.top_p, args.temperature)
-    print(res)
+    if args.text is not None:
+        res = compare_strategies(args.text, args.model_dir, args.max_length, args.num_beams, args.no_repeat_ngram_size, args.length_penalty, args.n_best, args.top_k, args.top_p, args.temperature)
+        print(res)
+        return
+    texts = read_inputs(args.input_file, args.column)
+    mdl, tok, dev = load(args.model_dir)
+    results = compare_many(
+        texts, mdl, tok, dev, batch_size=args.batch_size,
+        max_length=args.max_length, num_beams=args.num_beams, no_repeat_ngram_size=args.no_repeat_ngram_size,
+        length_penalty=args.length_penalty, n_best=args.n_best, top_k=args.top_k, top_p=args.top_p, temperature=args.temperature,
+    )
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            for res in results:
+                f.write(json.dumps(res, ensure_ascii=False) + "\n")
+        print(f"Wrote {len(results)} comparisons to {args.output}")
+    else:
+        for res in results:
+            print(res)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
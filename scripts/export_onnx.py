@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import inspect
+import argparse
+import torch
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+from backend.onnx_engine import ENGINE_CONFIG_NAME, ENCODER_FILE, DECODER_INIT_FILE, DECODER_WITH_PAST_FILE, past_names
+
+def build_cache(flat, num_layers: int):
+    """Turn flat (self k, self v, cross k, cross v) * layers tensors into what this transformers version expects."""
+    legacy = tuple(tuple(flat[4 * i:4 * i + 4]) for i in range(num_layers))
+    try:
+        from transformers.cache_utils import DynamicCache, EncoderDecoderCache
+    except ImportError:
+        return legacy
+    if hasattr(EncoderDecoderCache, "from_legacy_cache"):
+        return EncoderDecoderCache.from_legacy_cache(legacy)
+    self_cache, cross_cache = DynamicCache(), DynamicCache()
+    for i, (sk, sv, ck, cv) in enumerate(legacy):
+        self_cache.update(sk, sv, i)
+        cross_cache.update(ck, cv, i)
+    return EncoderDecoderCache(self_cache, cross_cache)
+
+def flatten_cache(cache):
+    """Inverse of build_cache: per-layer (self k, self v, cross k, cross v) tuples."""
+    if isinstance(cache, (tuple, list)):
+        return cache
+    if hasattr(cache, "to_legacy_cache"):
+        return cache.to_legacy_cache()
+    self_layers = cache.self_attention_cache.layers
+    cross_layers = cache.cross_attention_cache.layers
+    return tuple((s.keys, s.values, c.keys, c.values) for s, c in zip(self_layers, cross_layers))
+
+class EncoderWrapper(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.get_encoder()
+
+    def forward(self, input_ids, attention_mask):
+        return self.encoder(input_ids=input_ids, attention_mask=attention_mask, return_dict=True).last_hidden_state
+
+class DecoderInitWrapper(torch.nn.Module):
+    """First decoder step: no past; returns logits plus self- and cross-attention key/values."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, decoder_input_ids, encoder_hidden_states, encoder_attention_mask):
+        out = self.model(
+            encoder_outputs=(encoder_hidden_states,),
+            attention_mask=encoder_attention_mask,
+            decoder_input_ids=decoder_input_ids,
+            use_cache=True,
+            return_dict=True,
+        )
+        flat = [t for layer in flatten_cache(out.past_key_values) for t in layer[:4]]
+        return (out.logits, *flat)
+
+class DecoderWithPastWrapper(torch.nn.Module):
+    """Later decoder steps: consumes the cache, returns logits plus the grown self-attention key/values."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.num_layers = model.config.num_decoder_layers
+
+    def forward(self, decoder_input_ids, encoder_attention_mask, *past):
+        # The encoder output is only needed for the cross-attention cache, which is already in ``past``
+        batch = decoder_input_ids.shape[0]
+        dummy_hidden = past[2].new_zeros((batch, encoder_attention_mask.shape[1], self.model.config.d_model))
+        out = self.model(
+            encoder_outputs=(dummy_hidden,),
+            attention_mask=encoder_attention_mask,
+            decoder_input_ids=decoder_input_ids,
+            past_key_values=build_cache(list(past), self.num_layers),
+            use_cache=True,
+            return_dict=True,
+        )
+        flat = [t for layer in flatten_cache(out.past_key_values) for t in layer[:2]]
+        return (out.logits, *flat)
+
+def _export(module, args, path, input_names, output_names, dynamic_axes, opset):
+    kwargs = dict(input_names=input_names, output_names=output_names, dynamic_axes=dynamic_axes, opset_version=opset, do_constant_folding=True)
+    # Newer torch defaults to the dynamo exporter; the dynamic_axes graphs here are built for the TorchScript one
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+    torch.onnx.export(module, args, path, **kwargs)
+    print(f"Wrote {path}")
+
+def export(model_dir: str, output_dir: str, opset: int = 17):
+    tok = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_dir).eval()
+    cfg = model.config
+    num_layers = cfg.num_decoder_layers
+    os.makedirs(output_dir, exist_ok=True)
+
+    sample = tok(["no cap that was fire", "ok"], return_tensors="pt", padding=True)
+    ids, mask = sample.input_ids, sample.attention_mask
+    start = torch.full((ids.shape[0], 1), cfg.decoder_start_token_id, dtype=torch.long)
+
+    with torch.no_grad():
+        _export(
+            EncoderWrapper(model), (ids, mask), os.path.join(output_dir, ENCODER_FILE),
+            ["input_ids", "attention_mask"], ["last_hidden_state"],
+            {"input_ids": {0: "batch", 1: "src_len"}, "attention_mask": {0: "batch", 1: "src_len"}, "last_hidden_state": {0: "batch", 1: "src_len"}},
+            opset,
+        )
+        hidden = EncoderWrapper(model)(ids, mask)
+
+        init_outputs = past_names("present", num_layers, cross=True)
+        init_axes = {"decoder_input_ids": {0: "batch"}, "encoder_hidden_states": {0: "batch", 1: "src_len"},
+                     "encoder_attention_mask": {0: "batch", 1: "src_len"}, "logits": {0: "batch"}}
+        for name in init_outputs:
+            init_axes[name] = {0: "batch", 2: "src_len" if ".cross." in name else "tgt_len"}
+        _export(
+            DecoderInitWrapper(model), (start, hidden, mask), os.path.join(output_dir, DECODER_INIT_FILE),
+            ["decoder_input_ids", "encoder_hidden_states", "encoder_attention_mask"], ["logits"] + init_outputs,
+            init_axes, opset,
+        )
+        first = DecoderInitWrapper(model)(start, hidden, mask)
+
+        past_inputs = past_names("past", num_layers, cross=True)
+        past_outputs = past_names("present", num_layers, cross=False)
+        past_axes = {"decoder_input_ids": {0: "batch"}, "encoder_attention_mask": {0: "batch", 1: "src_len"}, "logits": {0: "batch"}}
+        for name in past_inputs:
+            past_axes[name] = {0: "batch", 2: "src_len" if ".cross." in name else "past_len"}
+        for name in past_outputs:
+            past_axes[name] = {0: "batch", 2: "tgt_len"}
+        _export(
+            DecoderWithPastWrapper(model), (start, mask, *first[1:]), os.path.join(output_dir, DECODER_WITH_PAST_FILE),
+            ["decoder_input_ids", "encoder_attention_mask"] + past_inputs, ["logits"] + past_outputs,
+            past_axes, opset,
+        )
+
+    engine_cfg = {
+        "source": os.path.abspath(model_dir),
+        "num_layers": num_layers,
+        "vocab_size": cfg.vocab_size,
+        "decoder_start_token_id": cfg.decoder_start_token_id,
+        "eos_token_id": cfg.eos_token_id,
+        "pad_token_id": cfg.pad_token_id,
+        "opset": opset,
+    }
+    with open(os.path.join(output_dir, ENGINE_CONFIG_NAME), "w", encoding="utf-8") as f:
+        json.dump(engine_cfg, f, indent=2)
+    print(f"ONNX engine files saved to {output_dir}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a fine-tuned T5 checkpoint to encoder/decoder ONNX graphs with past key/values")
+    parser.add_argument("--model_dir", type=str, required=True, help="Checkpoint directory, e.g. outputs/checkpoints/t5-small-forward-ep5-lr3e4-64")
+    parser.add_argument("--output_dir", type=str, default=None, help="Defaults to <model_dir>/onnx, where the backend looks for it")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export(args.model_dir, args.output_dir or os.path.join(args.model_dir, "onnx"), args.opset)
+
+if __name__ == "__main__":
+    main()
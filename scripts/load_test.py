@@ -0,0 +1,309 @@
+import os
+import sys
+import glob
+import json
+import time
+import random
+import asyncio
+import argparse
+import uuid
+from collections import Counter
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+from backend.warmup import DIRECTION_COLUMNS
+
+DEFAULT_DATA = os.path.join(PROJECT_ROOT, "dataset", "processed", "*.csv")
+DEFAULT_OUTPUT = os.path.join(PROJECT_ROOT, "outputs", "perf", "load_test.json")
+
+def parse_floats(value: str):
+    return sorted({float(v) for v in value.split(",") if v.strip()})
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * (len(values) - 1) + 0.5))]
+
+def load_input_mix(pattern: str, directions):
+    """Every (direction, text) pair in the matching processed CSVs; uniform draws keep the real length distribution."""
+    pool = []
+    paths = sorted(glob.glob(pattern))
+    for path in paths:
+        df = pd.read_csv(path)
+        for direction in directions:
+            column, language = DIRECTION_COLUMNS[direction]
+            if column not in df.columns:
+                continue
+            rows = df[df["Language"] == language] if language and "Language" in df.columns else df
+            pool.extend((direction, text) for text in rows[column].dropna().astype(str).str.strip() if text)
+    if not pool:
+        raise SystemExit(f"No inputs for {', '.join(directions)} in {pattern}")
+    print(f"Input mix: {len(pool)} texts from {len(paths)} file(s)")
+    return pool
+
+def arrival_offsets(rate: float, duration: float, arrival: str, rng: random.Random):
+    """Send times (seconds from the start) of an open-loop schedule at ``rate`` requests per second."""
+    offsets, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+        if t >= duration:
+            return offsets
+        offsets.append(t)
+
+async def send(client, endpoint: str, direction: str, text: str, timeout: float):
+    started = time.perf_counter()
+    try:
+        r = await client.post(endpoint, json={"text": text, "direction": direction}, timeout=timeout)
+        latency = time.perf_counter() - started
+        if r.status_code != 200:
+            return {"ok": False, "status": r.status_code, "latency": latency}
+        body = r.json()
+        return {"ok": True, "status": 200, "latency": latency, "source": "coalesced" if body.get("coalesced") else body.get("source", "model")}
+    except Exception as e:
+        return {"ok": False, "status": type(e).__name__, "latency": time.perf_counter() - started}
+
+async def run_rate(client, endpoint, pool, rate, duration, args, rng):
+    """Fire requests on schedule whether or not earlier ones have finished (open loop), then wait for all of them."""
+    offsets = arrival_offsets(rate, duration, args.arrival, rng)
+    tasks, lags = [], []
+    started = time.perf_counter()
+    for i, offset in enumerate(offsets):
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # How late the generator itself sends; large values mean the client, not the server, is saturated
+        lags.append(max(0.0, -delay))
+        direction, text = rng.choice(pool)
+        if args.unique:
+            # The run id keeps texts unique across runs too, so a persisted result cache cannot answer them
+            text = f"{text} #{args.run_id}-{int(rate * 1000)}-{i}"
+        tasks.append(asyncio.create_task(send(client, endpoint, direction, text, args.timeout)))
+    results = await asyncio.gather(*tasks)
+    # A schedule that ends early still covers the whole window
+    elapsed = max(duration, time.perf_counter() - started)
+    latencies = [r["latency"] for r in results if r["ok"]]
+    row = {
+        "offered_rps": rate,
+        "sent": len(results),
+        "ok": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "errors": dict(Counter(str(r["status"]) for r in results if not r["ok"])),
+        "sources": dict(Counter(r["source"] for r in results if r["ok"])),
+        "max_send_lag_ms": round(1000.0 * max(lags), 2) if lags else 0.0,
+    }
+    if latencies:
+        row.update({
+            "mean_ms": round(1000.0 * sum(latencies) / len(latencies), 2),
+            "p50_ms": round(1000.0 * percentile(latencies, 0.50), 2),
+            "p95_ms": round(1000.0 * percentile(latencies, 0.95), 2),
+            "p99_ms": round(1000.0 * percentile(latencies, 0.99), 2),
+        })
+    return row
+
+async def wait_ready(client, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"API not ready after {timeout:.0f}s")
+
+async def drive(args, pool):
+    import httpx
+    rng = random.Random(args.seed)
+    rows = []
+
+    async def sweep(client):
+        await wait_ready(client, args.ready_timeout)
+        if args.warmup:
+            print(f"Warming up for {args.warmup:.0f}s at {args.rates[0]} req/s")
+            await run_rate(client, args.endpoint, pool, args.rates[0], args.warmup, args, rng)
+        for rate in args.rates:
+            row = await run_rate(client, args.endpoint, pool, rate, args.duration, args, rng)
+            rows.append(row)
+            print(f"  {rate:>7.2f} req/s offered -> {row['throughput_rps']:>7.2f} req/s, "
+                  f"p50 {row.get('p50_ms', '-')} ms, p95 {row.get('p95_ms', '-')} ms, p99 {row.get('p99_ms', '-')} ms, "
+                  f"errors {row['errors'] or 0}")
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+            await sweep(client)
+    else:
+        # In-process: the app and the load generator share one event loop, so keep rates modest
+        import backend.main as api
+        from backend.main import app
+        if args.no_memory:
+            api.translation_memory = api.fuzzy_index = None
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits) as client:
+                await sweep(client)
+    return rows
+
+def plot(reports, path: str):
+    """Latency percentiles against achieved throughput, one line style per run."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed, skipping the chart")
+        return
+    colors = {"p50_ms": "#4c78a8", "p95_ms": "#f58518", "p99_ms": "#e45756"}
+    styles = ["-", "--", ":", "-."]
+    plt.figure(figsize=(7, 4.5))
+    for i, report in enumerate(reports):
+        rows = [r for r in report["results"] if "p50_ms" in r]
+        for key, color in colors.items():
+            plt.plot([r["throughput_rps"] for r in rows], [r[key] for r in rows], styles[i % len(styles)],
+                     marker="o", color=color, label=f"{report['label']} {key[:3]}")
+    plt.xlabel("Throughput (req/s)")
+    plt.ylabel("Latency (ms)")
+    plt.yscale("log")
+    plt.title("Latency vs throughput")
+    plt.legend(fontsize=8)
+    plt.grid(alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(path, dpi=200)
+    plt.close()
+    print(f"Chart saved to {path}")
+
+def compare(baseline: dict, candidate: dict):
+    """Per offered rate, the candidate's throughput and tail latency relative to the baseline."""
+    base = {r["offered_rps"]: r for r in baseline["results"]}
+    rows = []
+    for r in candidate["results"]:
+        b = base.get(r["offered_rps"])
+        if b is None:
+            continue
+        row = {"offered_rps": r["offered_rps"]}
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if key in r and key in b:
+                row[key] = {"baseline": b[key], "candidate": r[key], "change": round(r[key] / b[key] - 1.0, 4) if b[key] else None}
+        rows.append(row)
+    print(f"{'req/s':>8} {'throughput':>20} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22}")
+    for row in rows:
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            cell = row.get(key)
+            cells.append(f"{cell['baseline']}->{cell['candidate']} ({100 * cell['change']:+.0f}%)" if cell and cell["change"] is not None else "-")
+        print(f"{row['offered_rps']:>8.2f} {cells[0]:>20} {cells[1]:>22} {cells[2]:>22} {cells[3]:>22}")
+    return rows
+
+def check_results(results, args, baseline=None):
+    """Regression gate: the failures of each rate against the thresholds (and the baseline report, if given)."""
+    base = {r["offered_rps"]: r for r in baseline["results"]} if baseline else {}
+    failures = []
+    for row in results:
+        rate = row["offered_rps"]
+        error_rate = 1.0 - row["ok"] / row["sent"] if row["sent"] else 0.0
+        if error_rate > args.max_error_rate:
+            failures.append(f"{rate} req/s: error rate {error_rate:.1%} > {args.max_error_rate:.1%} ({row['errors']})")
+        if row["throughput_rps"] < args.min_throughput_ratio * rate:
+            failures.append(f"{rate} req/s: throughput {row['throughput_rps']} req/s < {args.min_throughput_ratio:.0%} of offered")
+        if args.max_p95_ms is not None and row.get("p95_ms", float("inf")) > args.max_p95_ms:
+            failures.append(f"{rate} req/s: p95 {row.get('p95_ms', '-')} ms > {args.max_p95_ms} ms")
+        b = base.get(rate)
+        if b is not None and "p95_ms" in b and row.get("p95_ms", float("inf")) > b["p95_ms"] * (1.0 + args.max_regression):
+            failures.append(f"{rate} req/s: p95 {row.get('p95_ms', '-')} ms is more than {args.max_regression:.0%} above the baseline's {b['p95_ms']} ms")
+        if b is not None and row["throughput_rps"] < b["throughput_rps"] * (1.0 - args.max_regression):
+            failures.append(f"{rate} req/s: throughput {row['throughput_rps']} req/s is more than {args.max_regression:.0%} below the baseline's {b['throughput_rps']}")
+    return failures
+
+def load_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test of the translation API: latency percentiles vs throughput at fixed request rates")
+    parser.add_argument("--url", type=str, default=None, help="Base URL of a running server (e.g. http://127.0.0.1:8000); default drives backend/main.py in-process over ASGI")
+    parser.add_argument("--endpoint", type=str, default="/translate")
+    parser.add_argument("--data", type=str, default=DEFAULT_DATA, help="Glob of processed CSVs the inputs are sampled from")
+    parser.add_argument("--directions", type=str, default="forward,reverse", help="Comma-separated directions in the mix")
+    parser.add_argument("--rates", type=str, default="1,2,4,8,16", help="Comma-separated offered rates in requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per rate")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds at the lowest rate before measuring (0 to skip)")
+    parser.add_argument("--arrival", type=str, default="poisson", choices=["poisson", "uniform"])
+    parser.add_argument("--unique", action="store_true", help="Make every text unique so the cache, translation memory and coalescing are bypassed (measures the model path)")
+    parser.add_argument("--no_memory", action="store_true", help="In-process only: disable the translation memory, whose fuzzy matches would otherwise answer most dataset inputs (for --url, set translation_memory.enabled: false on the server)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max_connections", type=int, default=1000)
+    parser.add_argument("--ready_timeout", type=float, default=300.0, help="Seconds to wait for /ready")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", type=str, default=None, help="Name of this run in reports and charts")
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT, help="JSON report; the chart is written next to it as .png")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), help="Compare two saved reports instead of running a test")
+    parser.add_argument("--fake", action="store_true", help="In-process only: serve with the fake model engine (ENGINE=fake), so the run measures the serving stack in seconds")
+    parser.add_argument("--check", action="store_true", help="Regression gate: exit with status 1 if any rate misses the thresholds below")
+    parser.add_argument("--max_error_rate", type=float, default=0.01, help="--check: highest tolerated share of failed requests (429s included)")
+    parser.add_argument("--min_throughput_ratio", type=float, default=0.9, help="--check: lowest tolerated throughput as a share of the offered rate")
+    parser.add_argument("--max_p95_ms", type=float, default=None, help="--check: highest tolerated p95 latency in ms")
+    parser.add_argument("--baseline", type=str, default=None, help="--check: saved report to compare p95 and throughput against, rate by rate")
+    parser.add_argument("--max_regression", type=float, default=0.25, help="--check: tolerated p95 increase / throughput drop against --baseline")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, candidate = (load_report(p) for p in args.compare)
+        report = {"baseline": args.compare[0], "candidate": args.compare[1], "comparison": compare(baseline, candidate)}
+        output = args.output if args.output != DEFAULT_OUTPUT else os.path.join(PROJECT_ROOT, "outputs", "perf", "load_test_comparison.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        plot([baseline, candidate], os.path.splitext(output)[0] + ".png")
+        print(f"Comparison saved to {output}")
+        return
+
+    if args.no_memory and args.url:
+        parser.error("--no_memory only applies in-process; disable translation_memory in the server's config.yaml instead")
+    if args.fake:
+        if args.url:
+            parser.error("--fake only applies in-process; start the server with ENGINE=fake instead")
+        # Read by backend/main.py when it is imported in drive()
+        os.environ["ENGINE"] = "fake"
+    baseline = load_report(args.baseline) if args.baseline else None
+    args.run_id = uuid.uuid4().hex[:8]
+    args.rates = parse_floats(args.rates)
+    directions = [d.strip() for d in args.directions.split(",") if d.strip()]
+    unknown = [d for d in directions if d not in DIRECTION_COLUMNS]
+    if unknown:
+        parser.error(f"Unknown direction(s): {', '.join(unknown)}")
+    pool = load_input_mix(args.data, directions)
+    target = args.url or "in-process ASGI"
+    print(f"Load testing {args.endpoint} on {target}: {len(args.rates)} rate(s), {args.duration:.0f}s each, {args.arrival} arrivals")
+    results = asyncio.run(drive(args, pool))
+
+    report = {
+        "label": args.label or os.path.splitext(os.path.basename(args.output))[0],
+        "target": target,
+        "endpoint": args.endpoint,
+        "data": args.data,
+        "directions": directions,
+        "arrival": args.arrival,
+        "unique": args.unique,
+        "no_memory": args.no_memory,
+        "fake": args.fake,
+        "duration_seconds": args.duration,
+        "results": results,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    failures = check_results(results, args, baseline) if args.check else []
+    if args.check:
+        report["check"] = {"passed": not failures, "failures": failures}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {args.output}")
+    plot([report], os.path.splitext(args.output)[0] + ".png")
+    if args.check:
+        for failure in failures:
+            print(f"FAIL {failure}")
+        if failures:
+            raise SystemExit(1)
+        print(f"Regression check passed at {len(results)} rate(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import multiprocessing as mp
+import pandas as pd
+import torch
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+from backend.config_loader import load_config
+from backend.model_registry import DEFAULT_DIRECTIONS
+from backend.thread_profile import DEFAULT_PROFILE_PATH
+
+DEFAULT_DATA = os.path.join(PROJECT_ROOT, "dataset", "processed", "test.csv")
+DEFAULT_MODEL = os.path.join(PROJECT_ROOT, DEFAULT_DIRECTIONS["forward"][1])
+
+def parse_ints(value: str):
+    return sorted({int(v) for v in value.split(",") if v.strip()})
+
+def generation_kwargs(config: dict) -> dict:
+    """Same decoding settings the backend uses at its top tier."""
+    gen_cfg = config["generation"]
+    return {
+        "max_length": config["model"]["max_target_length"],
+        "num_beams": gen_cfg["num_beams"],
+        "no_repeat_ngram_size": gen_cfg["no_repeat_ngram_size"],
+        "length_penalty": gen_cfg["length_penalty"],
+        "repetition_penalty": gen_cfg["repetition_penalty"],
+        "early_stopping": True,
+    }
+
+def _worker(rank, model_dir, texts, combos, gen_kwargs, barrier, results):
+    """One simulated uvicorn worker: runs every (intra threads, batch size) combo in lockstep with its peers."""
+    torch.set_num_interop_threads(1)
+    tok = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_dir).eval()
+    with torch.no_grad():
+        model.generate(**tok(texts[:2], return_tensors="pt", padding=True), **gen_kwargs)
+    for intra, batch_size in combos:
+        torch.set_num_threads(intra)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        barrier.wait()
+        latencies = []
+        started = time.perf_counter()
+        with torch.no_grad():
+            for batch in batches:
+                t0 = time.perf_counter()
+                model.generate(**tok(batch, return_tensors="pt", padding=True, truncation=True), **gen_kwargs)
+                latencies.append(time.perf_counter() - t0)
+        results.put((rank, intra, batch_size, time.perf_counter() - started, latencies))
+        # Nobody starts the next combo until every worker has finished this one
+        barrier.wait()
+
+def run_sweep(model_dir, texts, workers, intra_threads, batch_sizes, gen_kwargs, cores, allow_oversubscribe=False):
+    ctx = mp.get_context("spawn")
+    rows = []
+    for n_workers in workers:
+        combos = [(t, b) for t in intra_threads for b in batch_sizes if allow_oversubscribe or n_workers * t <= cores]
+        if not combos:
+            continue
+        print(f"Workers={n_workers}: {len(combos)} configurations")
+        barrier = ctx.Barrier(n_workers)
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(r, model_dir, texts, combos, gen_kwargs, barrier, results)) for r in range(n_workers)]
+        for p in procs:
+            p.start()
+        by_combo = {}
+        for _ in range(n_workers * len(combos)):
+            _rank, intra, batch_size, elapsed, latencies = results.get()
+            by_combo.setdefault((intra, batch_size), []).append((elapsed, latencies))
+        for p in procs:
+            p.join()
+        for (intra, batch_size), runs in sorted(by_combo.items()):
+            wall = max(elapsed for elapsed, _ in runs)
+            latencies = sorted(l for _, lats in runs for l in lats)
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * (len(latencies) - 1) + 0.5))]
+            row = {
+                "workers": n_workers,
+                "intra_op_threads": intra,
+                "batch_size": batch_size,
+                "throughput_per_s": round(n_workers * len(texts) / wall, 3),
+                "p95_batch_ms": round(1000.0 * p95, 1),
+            }
+            rows.append(row)
+            print(f"  intra={intra:<2} batch={batch_size:<3} {row['throughput_per_s']:>8.2f} texts/s  p95 batch {row['p95_batch_ms']:.1f} ms")
+    return rows
+
+def pick_best(rows, max_p95_ms=None):
+    """Highest throughput, among configurations meeting the latency cap when one is given."""
+    eligible = [r for r in rows if max_p95_ms is None or r["p95_batch_ms"] <= max_p95_ms] or rows
+    return max(eligible, key=lambda r: r["throughput_per_s"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep workers x intra-op threads x batch size and write the best CPU thread profile")
+    parser.add_argument("--config", type=str, default=os.path.join(PROJECT_ROOT, "config.yaml"))
+    parser.add_argument("--model_dir", type=str, default=DEFAULT_MODEL)
+    parser.add_argument("--data", type=str, default=DEFAULT_DATA)
+    parser.add_argument("--column", type=str, default="Slang/Meme Text")
+    parser.add_argument("--samples", type=int, default=48, help="Texts from --data decoded per configuration and worker")
+    parser.add_argument("--workers", type=str, default="1,2,4")
+    parser.add_argument("--intra_threads", type=str, default="1,2,4,8")
+    parser.add_argument("--batch_sizes", type=str, default="1,4,8,16")
+    parser.add_argument("--max_p95_ms", type=float, default=None, help="Only consider configurations whose p95 batch latency stays under this")
+    parser.add_argument("--allow_oversubscribe", action="store_true", help="Also try workers x threads above the core count")
+    parser.add_argument("--output", type=str, default=os.path.join(PROJECT_ROOT, DEFAULT_PROFILE_PATH))
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    df = pd.read_csv(args.data)
+    texts = df[args.column].dropna().astype(str)
+    texts = texts.sample(n=min(args.samples, len(texts)), random_state=42).tolist()
+    cores = os.cpu_count() or 1
+    print(f"Tuning on {cores} cores with {len(texts)} texts from {args.data}")
+
+    rows = run_sweep(
+        args.model_dir, texts, parse_ints(args.workers), parse_ints(args.intra_threads), parse_ints(args.batch_sizes),
+        generation_kwargs(config), cores, args.allow_oversubscribe,
+    )
+    if not rows:
+        raise SystemExit("No configuration fits the core count; pass --allow_oversubscribe or smaller values")
+    best = dict(pick_best(rows, args.max_p95_ms), inter_op_threads=1)
+
+    profile = {
+        "best": best,
+        "machine": {"cpu_count": cores, "platform": platform.platform(), "torch": torch.__version__},
+        "model_dir": os.path.abspath(args.model_dir),
+        "samples": len(texts),
+        "max_p95_ms": args.max_p95_ms,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": rows,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    print(f"Best: {best['workers']} worker(s) x {best['intra_op_threads']} thread(s), batch {best['batch_size']} "
+          f"({best['throughput_per_s']} texts/s). Profile saved to {args.output}")
+
+if __name__ == "__main__":
+    main()